@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 2B: Probe Sustainable Throughput
+Ramps request rate and concurrency per model until 429s set in, reports the
+maximum sustainable RPM/TPM with latency percentiles, and records the findings
+in the model limits registry the pilot runner paces to at startup.
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.api.adaptive_rate import ModelLimitsRegistry
+from src.api.fake_backend import FakeGeminiBackend
+from src.api.openai_backend import OpenAICompatibleBackend
+from src.api.throughput_probe import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_REQUESTS,
+    DEFAULT_RAMP_FACTOR,
+    DEFAULT_STEP_SECONDS,
+    ProbeStep,
+    ThroughputProbe,
+)
+from src.cli.arguments import DEFAULT_MODEL_NAME, DEFAULT_DATASET
+from src.pipeline.pilot_runner import PilotRunner
+from src.utils.common import load_env_file, print_section_header
+
+# Without published limits (local servers), ramp over this range unless told otherwise
+UNPUBLISHED_START_RPM = 30.0
+UNPUBLISHED_MAX_RPM = 3000.0
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse probe arguments."""
+    parser = argparse.ArgumentParser(
+        description="Measure the sustainable request rate of each model",
+        epilog="""
+Examples:
+  python scripts/02b_probe_throughput.py
+  python scripts/02b_probe_throughput.py --model models/gemini-2.5-flash-lite,models/gemini-1.5-flash-latest
+  python scripts/02b_probe_throughput.py --fake-backend "rpm=60,latency_mean=0.3" --step-seconds 60
+  python scripts/02b_probe_throughput.py --openai-base-url http://localhost:8000/v1 --model Qwen/Qwen2.5-7B-Instruct
+
+Probing the live API spends real quota: at most --max-requests requests per model.
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL_NAME,
+                        help="Comma-separated models to probe")
+    parser.add_argument("--dataset", "-d", default=DEFAULT_DATASET,
+                        help="Dataset whose samples provide realistic prompts")
+    parser.add_argument("--samples", type=int, default=20, help="Distinct prompts to cycle through")
+    parser.add_argument("--start-rpm", type=float, default=None,
+                        help="Rate of the first step (default: half the published RPM)")
+    parser.add_argument("--max-rpm", type=float, default=None,
+                        help="Highest rate to try (default: 8x the published RPM)")
+    parser.add_argument("--ramp-factor", type=float, default=DEFAULT_RAMP_FACTOR,
+                        help="Rate multiplier between steps")
+    parser.add_argument("--step-seconds", type=float, default=DEFAULT_STEP_SECONDS,
+                        help="Duration of each step (per-minute quotas need about 60s to show)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Upper bound of requests in flight")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
+                        help="Requests the probe may send per model")
+    parser.add_argument("--request-timeout", type=float, default=None, metavar="SECONDS",
+                        help="Count calls running longer than this as errors")
+    parser.add_argument("--fake-backend", nargs="?", const="", default=None, metavar="SPEC",
+                        help="Probe the offline fake API instead (see FakeBackendConfig)")
+    parser.add_argument("--openai-base-url", default=None, metavar="URL",
+                        help="Probe an OpenAI-compatible server instead of the Gemini API")
+    parser.add_argument("--model-limits-path", default=None,
+                        help="Registry to record the findings in (default: data/output/cache/model_limits.json)")
+    parser.add_argument("--no-save", action="store_true", help="Only report, do not update the registry")
+    return parser.parse_args()
+
+
+def print_step(step: ProbeStep) -> None:
+    """Print one row of the step table."""
+    p50, p95 = step.percentile(0.5), step.percentile(0.95)
+    print(f"{step.target_rpm:>10.1f} {step.concurrency:>5} {step.sent:>6} {step.succeeded:>6} "
+          f"{step.rate_limited:>6} {step.errors:>6} {step.achieved_rpm:>9.1f} {step.achieved_tpm:>10,.0f} "
+          f"{(f'{p50:.2f}s' if p50 is not None else '-'):>7} {(f'{p95:.2f}s' if p95 is not None else '-'):>7}"
+          f"  {'✅' if step.clean else '❌'}")
+
+
+def main():
+    """Probe every requested model and record the results."""
+    args = parse_arguments()
+    load_env_file()
+    if args.fake_backend is not None and args.openai_base_url:
+        print("❌ --fake-backend and --openai-base-url cannot be combined")
+        return False
+
+    backend = None
+    if args.fake_backend is not None:
+        backend = FakeGeminiBackend.from_spec(args.fake_backend)
+    elif args.openai_base_url:
+        backend = OpenAICompatibleBackend(args.openai_base_url, api_key=os.getenv('OPENAI_API_KEY'),
+                                          max_connections=args.max_concurrency)
+        args.start_rpm = args.start_rpm or UNPUBLISHED_START_RPM
+        args.max_rpm = args.max_rpm or UNPUBLISHED_MAX_RPM
+
+    runner = PilotRunner()
+    runner.initialize_api(backend=backend, request_timeout=args.request_timeout,
+                          model_limits_path=args.model_limits_path)
+    client = runner.gemini_client
+    registry = ModelLimitsRegistry(args.model_limits_path or str(runner.default_model_limits_path))
+
+    # Real pilot prompts, so token counts and latencies match production
+    codebook = runner.data_loader.load_codebook_index(str(runner.codebook_path))
+    test_data = runner.data_loader.load_test_data(args.dataset).head(args.samples)
+    template, _ = runner.load_prompt_templates('inline')
+    prompts = [prompt for prompt in (runner.build_prompt_for_sample(template, sample, codebook)
+                                     for _, sample in test_data.iterrows()) if prompt]
+    if not prompts:
+        print(f"❌ No prompts could be built from {args.dataset}")
+        return False
+
+    models = [model.strip() for model in args.model.split(",") if model.strip()]
+    for model_name in models:
+        print_section_header(f"Throughput probe: {model_name} ({client.backend.name})")
+        probe = ThroughputProbe(
+            client, model_name, prompts, start_rpm=args.start_rpm, max_rpm=args.max_rpm,
+            ramp_factor=args.ramp_factor, step_seconds=args.step_seconds,
+            max_concurrency=args.max_concurrency, max_requests=args.max_requests
+        )
+        print(f"Ramping {probe.start_rpm:g} → {probe.max_rpm:g} RPM, x{args.ramp_factor:g} every "
+              f"{args.step_seconds:g}s, at most {args.max_requests} requests\n")
+        print(f"{'Target RPM':>10} {'Conc':>5} {'Sent':>6} {'OK':>6} {'429s':>6} {'Errors':>6} "
+              f"{'RPM':>9} {'TPM':>10} {'p50':>7} {'p95':>7}")
+        result = asyncio.run(probe.run(report=print_step))
+
+        entry = result.registry_entry()
+        print()
+        if result.sustainable is None:
+            print(f"❌ {model_name} did not sustain even {probe.start_rpm:g} RPM; nothing recorded")
+            continue
+        print(f"📈 Sustainable: {entry['rpm']:g} RPM, {entry['tpm']:,} TPM "
+              f"at concurrency {entry['concurrency']} (p50 {entry['p50_latency']:.2f}s, "
+              f"p95 {entry['p95_latency']:.2f}s, {entry['success_rate']:.1%} success)")
+        if result.onset is not None:
+            reason = f"{result.limited_by.upper()} 429s" if result.limited_by else "failures"
+            print(f"🚧 {reason} set in at {entry['rate_limited_at_rpm']:g} RPM")
+        else:
+            print(f"💡 No limit reached up to {result.steps[-1].target_rpm:g} RPM "
+                  f"(a lower bound: published limits are never lowered by it)")
+
+        if not args.no_save:
+            registry.set(result.backend_name, model_name, entry)
+            registry.save()
+            print(f"💾 Recorded in {registry.path}")
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -6,6 +6,7 @@ This script runs the pilot study using consolidated modules from src/.
 This is now a thin CLI wrapper that imports functionality from src/ modules.
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -15,7 +16,13 @@ sys.path.insert(0, str(current_path))
 
 from src.cli.arguments import create_pilot_study_parser
 from src.api.gemini_client import GeminiClient
+from src.pipeline.adaptive_runs import AdaptiveRunPolicy
+from src.pipeline.cascade import TERSE_STAGE_SUFFIX, parse_stage
 from src.pipeline.pilot_runner import PilotRunner
+from src.pipeline.run_estimator import print_estimate
+from src.api.cassette import CassetteBackend
+from src.api.fake_backend import FakeGeminiBackend
+from src.api.openai_backend import DEFAULT_MAX_CONNECTIONS, DEFAULT_TIMEOUT, OpenAICompatibleBackend
 from src.utils.common import load_env_file
 
 
@@ -32,18 +39,123 @@ def main():
     if args.list_models:
         GeminiClient.list_available_models()
         return
+    if sum([args.fake_backend is not None, bool(args.openai_base_url), bool(args.replay_cassette)]) > 1:
+        parser.error("--fake-backend, --openai-base-url and --replay-cassette cannot be combined")
+    if args.record_cassette and args.replay_cassette:
+        parser.error("--record-cassette and --replay-cassette cannot be combined")
+    cascade_models = [model.strip() for model in (args.cascade or "").split(",") if model.strip()]
+    if cascade_models and args.response_format == 'terse':
+        parser.error("--response-format applies to single-model runs; append :terse to --cascade models")
+    if args.explain_on_demand:
+        if args.response_format == 'terse':
+            parser.error("--explain-on-demand already answers tersely first; drop --response-format")
+        # Every model answers tersely; only what the last one leaves unsettled is explained
+        models = [parse_stage(model)[0] for model in cascade_models] or [args.model]
+        cascade_models = [model + TERSE_STAGE_SUFFIX for model in models] + models[-1:]
+    if cascade_models and args.dry_run:
+        parser.error("--dry-run estimates a single model; run it per --cascade model")
+    adaptive_runs = None
+    if args.adaptive_runs:
+        if args.batch_size > 1 or args.multi_candidate:
+            parser.error("--adaptive-runs sends one request per run; drop --batch-size and --multi-candidate")
+        if args.min_runs < 1 or (args.max_runs is not None and args.max_runs < args.min_runs):
+            parser.error("--min-runs must be at least 1 and no more than --max-runs")
+        adaptive_runs = AdaptiveRunPolicy(
+            min_runs=args.min_runs,
+            max_runs=args.max_runs,
+            confidence_threshold=args.confidence_threshold
+        )
     
     try:
         # Create pilot runner and execute
         runner = PilotRunner()
+        if args.no_prompt_cache:
+            runner.prompt_compiler.cache_dir = None
+        
+        backend = None
+        if args.fake_backend is not None:
+            backend = FakeGeminiBackend.from_spec(args.fake_backend)
+        elif args.openai_base_url:
+            backend = OpenAICompatibleBackend(
+                args.openai_base_url,
+                api_key=os.getenv('OPENAI_API_KEY'),
+                rpm=args.openai_rpm,
+                timeout=args.request_timeout or DEFAULT_TIMEOUT,
+                max_connections=max(DEFAULT_MAX_CONNECTIONS, args.concurrency)
+            )
+        elif args.replay_cassette:
+            backend = CassetteBackend(args.replay_cassette, timing=args.replay_timing)
+        
+        if args.dry_run:
+            if backend is not None:
+                runner.initialize_api(backend=backend)
+            estimate = runner.estimate_pilot_study(
+                model_name=args.model,
+                dataset_filename=args.dataset,
+                n_runs=args.runs,
+                output_dir=args.output_dir,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                multi_candidate=args.multi_candidate,
+                prompt_layout=args.prompt_layout,
+                use_tokenizer=not args.offline_estimate,
+                response_format=args.response_format
+            )
+            print_estimate(estimate)
+            return
+        
+        # Fake and replayed responses must never end up in the real response cache,
+        # and a recording needs every response to come from the model
+        use_cache = (not args.no_cache and not args.record_cassette
+                     and not isinstance(backend, (FakeGeminiBackend, CassetteBackend)))
+        cache_path = (args.cache_path or str(runner.default_cache_path)) if use_cache else None
+        shared_rate_path = None
+        if args.shared_rate_limits is not None:
+            shared_rate_path = args.shared_rate_limits or str(runner.default_shared_rate_path)
+        runner.initialize_api(
+            cache_path=cache_path,
+            adaptive_rate=args.adaptive_rate,
+            rate_limits_path=args.rate_limits_path,
+            backend=backend,
+            request_timeout=args.request_timeout,
+            hedge=args.hedge,
+            record_path=args.record_cassette,
+            shared_rate_path=shared_rate_path,
+            model_limits_path=args.model_limits_path
+        )
         
-        stats = runner.run_pilot_study(
-            model_name=args.model,
-            dataset_filename=args.dataset,
-            n_runs=args.runs,
+        run_options = dict(
             temperature=args.temperature,
-            output_dir=args.output_dir
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            multi_candidate=args.multi_candidate,
+            prompt_layout=args.prompt_layout,
+            cache_hierarchy=args.cache_hierarchy,
+            on_daily_quota=args.on_daily_quota,
+            structured_output=args.structured_output,
+            task_priorities=args.task_priorities,
+            adaptive_runs=adaptive_runs
         )
+        if cascade_models:
+            stats = runner.run_cascade(
+                models=cascade_models,
+                dataset_filename=args.dataset,
+                n_runs=args.runs,
+                confidence_threshold=args.confidence_threshold,
+                output_dir=args.output_dir,
+                max_samples=args.max_samples,
+                **run_options
+            )
+        else:
+            stats = runner.run_pilot_study(
+                model_name=args.model,
+                dataset_filename=args.dataset,
+                n_runs=args.runs,
+                output_dir=args.output_dir,
+                max_samples=args.max_samples,
+                response_format=args.response_format,
+                **run_options
+            )
         
         print(f"\n📊 Execution completed successfully!")
         print(f"Statistics: {stats}")
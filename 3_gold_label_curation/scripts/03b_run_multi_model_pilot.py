@@ -7,9 +7,11 @@ This is now a thin CLI wrapper that imports functionality from src/ modules.
 """
 
 import sys
+import argparse
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from typing import List
 
 # Add current directory to path for imports
 current_path = Path(__file__).parent.parent
@@ -19,12 +21,60 @@ from src.utils.common import load_env_file, print_section_header
 from src.api.gemini_client import GeminiClient
 
 
-def run_pilot_for_model(model_name: str) -> bool:
+# Models to test (can be configured)
+DEFAULT_MODELS = [
+    "models/gemini-1.5-flash-latest",
+    "models/gemini-1.5-pro-latest", 
+    "models/gemini-2.5-flash-lite"
+]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse arguments; anything unrecognized is passed on to every pilot run."""
+    parser = argparse.ArgumentParser(
+        description="Run the pilot study for several models",
+        epilog="""
+Examples:
+  python scripts/03b_run_multi_model_pilot.py
+  python scripts/03b_run_multi_model_pilot.py --parallel --dataset valid.csv -c 4
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS),
+                        help="Comma-separated models to run")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Run all models at the same time (output goes to per-model log files)")
+    args, pilot_args = parser.parse_known_args()
+    args.pilot_args = pilot_args
+    return args
+
+
+def pilot_command(model_name: str, pilot_args: List[str]) -> List[str]:
+    """
+    Command line of one pilot run.
+    
+    Every run shares the host-wide rate-limit state, so pilots running at the
+    same time (here, in notebooks or in other scripts) split one budget per
+    key and model instead of each pacing itself to the full quota.
+    """
+    script_path = Path(__file__).parent / "03a_run_pilot_study.py"
+    return [
+        sys.executable,
+        str(script_path),
+        "--model", model_name,
+        "--shared-rate-limits",
+        "--verbose",
+        *pilot_args
+    ]
+
+
+def run_pilot_for_model(model_name: str, pilot_args: List[str]) -> bool:
     """
     Run pilot study for a specific model.
     
     Args:
         model_name: Name of the model to test
+        pilot_args: Extra arguments for the pilot script
         
     Returns:
         True if successful, False otherwise
@@ -33,16 +83,8 @@ def run_pilot_for_model(model_name: str) -> bool:
     print("-" * 50)
     
     try:
-        # Get the path to the pilot script
-        script_path = Path(__file__).parent / "03a_run_pilot_study_refactored.py"
-        
         # Run the pilot script with the specific model
-        result = subprocess.run([
-            sys.executable, 
-            str(script_path),
-            "--model", model_name,
-            "--verbose"
-        ], capture_output=True, text=True)
+        result = subprocess.run(pilot_command(model_name, pilot_args), capture_output=True, text=True)
         
         if result.returncode == 0:
             print(f"✅ {model_name}: Pilot completed successfully")
@@ -57,8 +99,44 @@ def run_pilot_for_model(model_name: str) -> bool:
         return False
 
 
+def run_pilots_in_parallel(models: List[str], pilot_args: List[str]) -> dict:
+    """
+    Run the pilot of every model at the same time.
+    
+    Args:
+        models: Models to run
+        pilot_args: Extra arguments for the pilot script
+        
+    Returns:
+        Dictionary of model -> {"success", "duration"}
+    """
+    log_dir = Path(__file__).parent.parent / "data" / "output" / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    
+    running = {}
+    for model in models:
+        log_path = log_dir / f"pilot_{model.split('/')[-1]}.log"
+        log_file = open(log_path, 'w', encoding='utf-8')
+        process = subprocess.Popen(pilot_command(model, pilot_args), stdout=log_file,
+                                   stderr=subprocess.STDOUT, text=True)
+        running[model] = (process, log_file, datetime.now())
+        print(f"🚀 Started {model} (pid {process.pid}, log: {log_path})")
+    
+    results = {}
+    for model, (process, log_file, started_at) in running.items():
+        returncode = process.wait()
+        log_file.close()
+        results[model] = {
+            "success": returncode == 0,
+            "duration": datetime.now() - started_at
+        }
+        print(f"{'✅' if returncode == 0 else '❌'} {model}: exited with status {returncode}")
+    return results
+
+
 def main():
     """Main execution function using consolidated modules."""
+    args = parse_arguments()
     print_section_header("ACSES Pilot Study - Multi-Model Comparison")
     
     # Load environment variables
@@ -67,16 +145,9 @@ def main():
     print(f"📅 Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
-        # Initialize Gemini client to check available models
-        client = GeminiClient()
-        available_models = client.list_available_models()
-        
-        # Models to test (can be configured)
-        models_to_test = [
-            "models/gemini-1.5-flash-latest",
-            "models/gemini-1.5-pro-latest", 
-            "models/gemini-2.5-flash-lite"
-        ]
+        # Check the requested models against the known ones
+        available_models = GeminiClient.get_available_models()
+        models_to_test = [model.strip() for model in args.models.split(",") if model.strip()]
         
         # Filter to only test available models
         valid_models = [m for m in models_to_test if m in available_models]
@@ -89,7 +160,7 @@ def main():
         
         # Check prerequisites
         required_files = [
-            Path(__file__).parent.parent / "data" / "input" / "kbli_codebook_hierarchical.csv",
+            Path(__file__).parent.parent / "data" / "output" / "kbli_codebook_hierarchical.csv",
             Path(__file__).parent.parent / "data" / "input" / "mini_test_with_ids.csv",
             Path(__file__).parent.parent / "prompts" / "master_prompt.txt"
         ]
@@ -109,15 +180,18 @@ def main():
         results = {}
         total_time_start = datetime.now()
         
-        for model in valid_models:
-            model_start = datetime.now()
-            success = run_pilot_for_model(model)
-            model_end = datetime.now()
-            
-            results[model] = {
-                "success": success,
-                "duration": model_end - model_start
-            }
+        if args.parallel:
+            results = run_pilots_in_parallel(valid_models, args.pilot_args)
+        else:
+            for model in valid_models:
+                model_start = datetime.now()
+                success = run_pilot_for_model(model, args.pilot_args)
+                model_end = datetime.now()
+                
+                results[model] = {
+                    "success": success,
+                    "duration": model_end - model_start
+                }
         
         total_time_end = datetime.now()
         
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 5A: Benchmark Pilot Throughput
+Runs the pilot study against the offline fake backend (or a recorded cassette)
+for several concurrency settings and reports throughput, so settings can be
+tuned without the live API.
+"""
+
+import io
+import sys
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.api.cassette import CassetteBackend
+from src.api.fake_backend import FakeGeminiBackend
+from src.cli.arguments import DEFAULT_MODEL_NAME, DEFAULT_DATASET
+from src.pipeline.pilot_runner import PilotRunner
+from src.utils.common import format_duration, print_section_header
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse benchmark arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark PilotRunner throughput against the offline fake backend or a cassette",
+        epilog="""
+Examples:
+  python scripts/05a_benchmark_pilot_throughput.py
+  python scripts/05a_benchmark_pilot_throughput.py --concurrency 1,4,16 --max-samples 100
+  python scripts/05a_benchmark_pilot_throughput.py --fake-backend "rpm=60,truncated_rate=0.05"
+  python scripts/05a_benchmark_pilot_throughput.py --replay-cassette data/output/cassettes/mini.jsonl.gz
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--dataset", "-d", default=DEFAULT_DATASET)
+    parser.add_argument("--runs", "-r", type=int, default=3, help="Runs per sample")
+    parser.add_argument("--max-samples", type=int, default=50, help="Samples per benchmark run")
+    parser.add_argument("--concurrency", default="1,2,4,8",
+                        help="Comma-separated concurrency levels to compare")
+    parser.add_argument("--batch-size", "-b", type=int, default=1)
+    parser.add_argument("--multi-candidate", action="store_true")
+    parser.add_argument("--fake-backend", default="latency_mean=0.5,latency_sigma=0.4",
+                        help="Fake backend settings (see FakeBackendConfig)")
+    parser.add_argument("--replay-cassette", default=None, metavar="PATH",
+                        help="Replay recorded responses instead of using the fake backend")
+    parser.add_argument("--replay-timing", action="store_true",
+                        help="With --replay-cassette, reproduce the recorded latencies")
+    parser.add_argument("--client-rpm", type=float, default=None,
+                        help="RPM the client paces itself to (default: the fake backend's rpm, "
+                             "or unlimited pacing when it has none)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show the pilot runner output")
+    return parser.parse_args()
+
+
+def run_benchmark(args: argparse.Namespace, concurrency: int) -> dict:
+    """Run one pilot study against a fresh backend and measure it."""
+    runner = PilotRunner()
+    if args.replay_cassette:
+        with redirect_stdout(io.StringIO()):
+            backend = CassetteBackend(args.replay_cassette, timing=args.replay_timing)
+            runner.initialize_api(backend=backend)
+    else:
+        # The client paces to the fake backend's own rpm (unlimited when it has none)
+        backend = FakeGeminiBackend.from_spec(args.fake_backend)
+        with redirect_stdout(io.StringIO()):
+            runner.initialize_api(backend=backend)
+    if args.client_rpm:
+        runner.gemini_client.get_model_config(args.model)['rpm'] = args.client_rpm
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start_time = time.time()
+        output = io.StringIO()
+        with redirect_stdout(sys.stdout if args.verbose else output):
+            stats = runner.run_pilot_study(
+                model_name=args.model,
+                dataset_filename=args.dataset,
+                n_runs=args.runs,
+                output_dir=output_dir,
+                concurrency=concurrency,
+                batch_size=args.batch_size,
+                multi_candidate=args.multi_candidate,
+                max_samples=args.max_samples
+            )
+        elapsed = time.time() - start_time
+
+    backend_stats = backend.stats()
+    return {
+        'concurrency': concurrency,
+        'elapsed': elapsed,
+        'results': stats['new_results_generated'],
+        'success_rate': stats['success_rate'],
+        'requests': backend_stats['requests'],
+        'rate_limited': backend_stats.get('rate_limited', 0),
+    }
+
+
+def main():
+    """Run the benchmark grid and print a summary table."""
+    args = parse_arguments()
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    source = f"cassette {args.replay_cassette}" if args.replay_cassette else "offline fake backend"
+    print_section_header(f"ACSES Pilot Throughput Benchmark ({source})")
+    print(f"Model: {args.model}")
+    print(f"Dataset: {args.dataset} (first {args.max_samples} samples, {args.runs} runs each)")
+    if args.replay_cassette:
+        print(f"Replay timing: {'recorded latencies' if args.replay_timing else 'none (full local speed)'}")
+    else:
+        print(f"Fake backend: {args.fake_backend or 'defaults'}")
+
+    rows = []
+    for concurrency in levels:
+        print(f"\n⏱️  Concurrency {concurrency}...")
+        row = run_benchmark(args, concurrency)
+        rows.append(row)
+        print(f"   {row['results']} results in {format_duration(row['elapsed'])}")
+
+    print_section_header("📊 Results")
+    print(f"{'Concurrency':>11} {'Time':>8} {'Results':>8} {'Results/s':>10} "
+          f"{'Requests':>9} {'429s':>6} {'Success':>8}")
+    for row in rows:
+        throughput = row['results'] / row['elapsed'] if row['elapsed'] else 0.0
+        print(f"{row['concurrency']:>11} {format_duration(row['elapsed']):>8} {row['results']:>8} "
+              f"{throughput:>10.2f} {row['requests']:>9} {row['rate_limited']:>6} "
+              f"{row['success_rate']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
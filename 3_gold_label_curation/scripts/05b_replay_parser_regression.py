@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 5B: Parser Regression Against Recorded Responses
+Runs the JSON parsers over every response in a recorded cassette, so parser
+changes can be checked against real model output without calling the API.
+"""
+
+import sys
+import time
+import argparse
+from collections import Counter
+from pathlib import Path
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.api.cassette import read_cassette
+from src.utils.common import print_section_header
+from src.utils.json_parser import (
+    extract_json_from_response,
+    extract_json_array_from_response,
+    parse_json_response,
+    parse_json_array_response,
+    is_valid_result,
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse regression arguments."""
+    parser = argparse.ArgumentParser(
+        description="Check the response parsers against a recorded cassette",
+        epilog="""
+Examples:
+  python scripts/05b_replay_parser_regression.py data/output/cassettes/mini.jsonl.gz
+  python scripts/05b_replay_parser_regression.py batch.jsonl.gz --batch --repeat 20
+  python scripts/05b_replay_parser_regression.py mini.jsonl.gz --min-valid-rate 0.98
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("cassette", help="Recorded cassette (.jsonl.gz)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Responses answer batched prompts (JSON arrays of verdicts)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Parse every response this many times for a stable timing")
+    parser.add_argument("--min-valid-rate", type=float, default=None,
+                        help="Exit with status 1 if fewer responses yield valid verdicts")
+    parser.add_argument("--show-failures", type=int, default=5,
+                        help="Number of failing responses to print")
+    return parser.parse_args()
+
+
+def check_response(text: str, structured: bool, batch: bool) -> str:
+    """
+    Parse one response text the way the pilot runner would.
+
+    Args:
+        text: Recorded response text
+        structured: Whether it was produced in structured output mode
+        batch: Whether it answers a batched prompt
+
+    Returns:
+        'valid', 'invalid' (parsed, but a verdict misses fields) or 'unparsable'
+    """
+    try:
+        if batch:
+            parser = parse_json_array_response if structured else extract_json_array_from_response
+            verdicts = parser(text)
+        else:
+            parser = parse_json_response if structured else extract_json_from_response
+            verdicts = [parser(text)]
+    except ValueError:
+        return 'unparsable'
+    return 'valid' if verdicts and all(is_valid_result(v) for v in verdicts) else 'invalid'
+
+
+def main():
+    """Parse every recorded response and report the outcome and speed."""
+    args = parse_arguments()
+
+    responses = []
+    for entry in read_cassette(args.cassette):
+        structured = entry.get('config', {}).get('response_mime_type') == 'application/json'
+        for candidate in entry['candidates']:
+            responses.append((candidate['text'], structured))
+    if not responses:
+        print(f"❌ No recorded responses in {args.cassette}")
+        sys.exit(1)
+
+    print_section_header("ACSES Parser Regression (recorded responses)")
+    print(f"Cassette: {args.cassette}")
+    print(f"Responses: {len(responses)} ({'batched' if args.batch else 'one verdict each'})")
+
+    outcomes = Counter()
+    failures = []
+    for text, structured in responses:
+        outcome = check_response(text, structured, args.batch)
+        outcomes[outcome] += 1
+        if outcome != 'valid' and len(failures) < args.show_failures:
+            failures.append((outcome, text))
+
+    start_time = time.perf_counter()
+    for _ in range(args.repeat):
+        for text, structured in responses:
+            check_response(text, structured, args.batch)
+    elapsed = time.perf_counter() - start_time
+
+    valid_rate = outcomes['valid'] / len(responses)
+    print_section_header("📊 Results")
+    print(f"Valid verdicts: {outcomes['valid']} ({valid_rate:.1%})")
+    print(f"Parsed but invalid: {outcomes['invalid']}")
+    print(f"Unparsable: {outcomes['unparsable']}")
+    print(f"⏱️  {len(responses) * args.repeat / elapsed:,.0f} responses/s "
+          f"({elapsed / (len(responses) * args.repeat) * 1e6:.1f} µs each)")
+
+    for outcome, text in failures:
+        print(f"\n❌ {outcome}: {text[:300]!r}")
+
+    if args.min_valid_rate is not None and valid_rate < args.min_valid_rate:
+        print(f"\n❌ Valid rate {valid_rate:.1%} is below the required {args.min_valid_rate:.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 5C: Measure Terse-Response Savings
+Labels the same samples with the full and the terse response format for each
+model and reports how many output tokens and how much latency terse saves.
+"""
+
+import os
+import io
+import sys
+import argparse
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.api.fake_backend import FakeGeminiBackend
+from src.api.gemini_client import AVAILABLE_MODELS
+from src.api.openai_backend import OpenAICompatibleBackend
+from src.cli.arguments import DEFAULT_MODEL_NAME, DEFAULT_DATASET
+from src.pipeline.pilot_runner import PilotRunner, RESPONSE_FORMATS
+from src.pipeline.run_estimator import response_format_savings
+from src.utils.common import load_env_file, print_section_header
+from src.utils.json_parser import load_existing_results
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse measurement arguments."""
+    parser = argparse.ArgumentParser(
+        description="Measure output-token and latency savings of terse verdicts per model",
+        epilog="""
+Examples:
+  python scripts/05c_measure_terse_savings.py --max-samples 20
+  python scripts/05c_measure_terse_savings.py --models models/gemini-2.5-flash-lite,models/gemini-1.5-pro-latest
+  python scripts/05c_measure_terse_savings.py --fake-backend "latency_mean=0.3,latency_per_output_token=0.01"
+  python scripts/05c_measure_terse_savings.py --openai-base-url http://localhost:8000/v1 --models Qwen/Qwen2.5-7B-Instruct
+
+Results are kept in --output-dir, so a rerun resumes and measures over everything labelled so far.
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--models", "-m", default=DEFAULT_MODEL_NAME, help="Comma-separated models to measure")
+    parser.add_argument("--dataset", "-d", default=DEFAULT_DATASET)
+    parser.add_argument("--max-samples", type=int, default=20, help="Samples labelled in each format")
+    parser.add_argument("--runs", "-r", type=int, default=1, help="Runs per sample")
+    parser.add_argument("--concurrency", "-c", type=int, default=1,
+                        help="Requests in flight (1 keeps latencies free of queueing)")
+    parser.add_argument("--prompt-layout", choices=["inline", "split"], default="inline")
+    parser.add_argument("--structured-output", action="store_true")
+    parser.add_argument("--output-dir", default=None,
+                        help="Where both formats' results go (default: data/output/terse_savings)")
+    parser.add_argument("--fake-backend", nargs="?", const="", default=None, metavar="SPEC",
+                        help="Measure against the offline fake API (see FakeBackendConfig)")
+    parser.add_argument("--openai-base-url", default=None, metavar="URL",
+                        help="Measure an OpenAI-compatible server instead of the Gemini API")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show the pilot runner output")
+    return parser.parse_args()
+
+
+def format_value(value, pattern: str) -> str:
+    """Format a measurement, or '-' when there is none."""
+    return pattern.format(value) if value is not None else "-"
+
+
+def main():
+    """Label the samples in both formats for every model and compare them."""
+    args = parse_arguments()
+    load_env_file()
+    if args.fake_backend is not None and args.openai_base_url:
+        print("❌ --fake-backend and --openai-base-url cannot be combined")
+        return False
+
+    backend = None
+    if args.fake_backend is not None:
+        backend = FakeGeminiBackend.from_spec(args.fake_backend)
+    elif args.openai_base_url:
+        backend = OpenAICompatibleBackend(args.openai_base_url, api_key=os.getenv('OPENAI_API_KEY'))
+
+    runner = PilotRunner()
+    runner.initialize_api(backend=backend)
+    if isinstance(backend, FakeGeminiBackend):
+        # Pace the client to the emulated service, not to the published limits
+        client_rpm = backend.config.rpm or 60_000
+        runner.gemini_client.key_pool.model_limits = {
+            name: {**limits, 'rpm': client_rpm} for name, limits in AVAILABLE_MODELS.items()
+        }
+    output_dir = args.output_dir or str(runner.project_root / "data" / "output" / "terse_savings")
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+
+    print_section_header(f"ACSES Terse-Response Savings ({runner.gemini_client.backend.name})")
+    print(f"Dataset: {args.dataset} (first {args.max_samples} samples, {args.runs} runs each)")
+    print(f"Prompt layout: {args.prompt_layout}"
+          + (", structured output" if args.structured_output else ""))
+
+    rows = []
+    for model_name in models:
+        results = {}
+        for response_format in RESPONSE_FORMATS:
+            print(f"\n⏱️  {model_name}: {response_format} verdicts...")
+            with redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                stats = runner.run_pilot_study(
+                    model_name=model_name,
+                    dataset_filename=args.dataset,
+                    n_runs=args.runs,
+                    output_dir=output_dir,
+                    concurrency=args.concurrency,
+                    prompt_layout=args.prompt_layout,
+                    structured_output=args.structured_output,
+                    max_samples=args.max_samples,
+                    response_format=response_format
+                )
+                results[response_format], _ = load_existing_results(stats['output_path'])
+            print(f"   {stats['new_results_generated']} new results, "
+                  f"{stats['success_rate']:.1%} success")
+        rows.append((model_name, response_format_savings(results['full'], results['terse'])))
+
+    print_section_header("📊 Per-result averages")
+    print(f"{'Model':<36} {'Format':<6} {'Results':>7} {'Prompt tok':>10} {'Output tok':>10} {'Latency':>8}")
+    for model_name, savings in rows:
+        for response_format in RESPONSE_FORMATS:
+            averages = savings[response_format]
+            print(f"{model_name:<36} {response_format:<6} {averages['results']:>7} "
+                  f"{format_value(averages['prompt_tokens'], '{:.0f}'):>10} "
+                  f"{format_value(averages['output_tokens'], '{:.0f}'):>10} "
+                  f"{format_value(averages['latency_seconds'], '{:.2f}s'):>8}")
+
+    print()
+    for model_name, savings in rows:
+        print(f"💡 {model_name}: terse saves "
+              f"{format_value(savings['output_tokens_saved'], '{:.0%}')} of output tokens and "
+              f"{format_value(savings['latency_saved'], '{:.0%}')} of latency per result")
+    print(f"\nResults kept in: {output_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
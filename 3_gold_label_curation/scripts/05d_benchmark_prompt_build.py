@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 5D: Benchmark Prompt Building
+Measures how many prompts per second the pilot runner builds with the
+codebook index, against the former boolean scan of the codebook per sample.
+"""
+
+import sys
+import time
+import argparse
+import itertools
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.cli.arguments import DEFAULT_DATASET
+from src.data.codebook_index import format_hierarchy
+from src.pipeline.pilot_runner import PilotRunner
+from src.utils.common import format_duration, print_section_header
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse benchmark arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark prompt building with the codebook index against a full codebook scan",
+        epilog="""
+Examples:
+  python scripts/05d_benchmark_prompt_build.py
+  python scripts/05d_benchmark_prompt_build.py --samples 100000 --scan-samples 5000
+  python scripts/05d_benchmark_prompt_build.py --prompt-layout split --response-format terse
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dataset", "-d", default=DEFAULT_DATASET,
+                        help="Dataset whose samples are cycled to reach --samples")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Prompts built with the index")
+    parser.add_argument("--scan-samples", type=int, default=20_000,
+                        help="Prompts built with the scan (its rate is extrapolated to --samples)")
+    parser.add_argument("--prompt-layout", choices=["inline", "split"], default="inline")
+    parser.add_argument("--response-format", choices=["full", "terse"], default="full")
+    return parser.parse_args()
+
+
+def build_prompt_by_scan(template: str, sample: Dict[str, Any], codebook: pd.DataFrame) -> Optional[str]:
+    """The former prompt builder: scan the codebook and format the hierarchy per sample."""
+    code_to_check = str(sample['kbli_code'])
+    rule_rows = codebook[codebook['code_5'] == code_to_check]
+    if rule_rows.empty:
+        return None
+    hierarchy_context = format_hierarchy(rule_rows.iloc[0])
+
+    final_prompt = template.replace("{job_description}", str(sample['text']))
+    final_prompt = final_prompt.replace("{code_to_check}", code_to_check)
+    return final_prompt.replace("{hierarchy_context}", hierarchy_context)
+
+
+def main():
+    """Build prompts both ways and report throughput."""
+    args = parse_arguments()
+    runner = PilotRunner()
+
+    print_section_header("ACSES Prompt Build Benchmark")
+    codebook = runner.data_loader.load_hierarchical_codebook(str(runner.codebook_path))
+    test_data = runner.data_loader.load_test_data(args.dataset)
+    template, _ = runner.load_prompt_templates(args.prompt_layout, args.response_format)
+    # Samples as plain dicts: this measures prompt building, not DataFrame iteration
+    samples = test_data[['kbli_code', 'text']].to_dict('records')
+
+    start_time = time.perf_counter()
+    index = runner.data_loader.codebook_index(codebook)
+    index_seconds = time.perf_counter() - start_time
+    print(f"Codebook: {len(codebook)} rows, indexed in {index_seconds * 1000:.1f} ms")
+    print(f"Samples: {args.samples:,} (cycling {len(samples):,} from {args.dataset})")
+    print(f"Prompt: {args.prompt_layout} layout, {args.response_format} format")
+
+    # Both builders must produce the same prompts
+    for sample in samples:
+        if runner.build_prompt_for_sample(template, sample, index) != build_prompt_by_scan(template, sample, codebook):
+            print(f"❌ Prompts differ for code {sample['kbli_code']}")
+            sys.exit(1)
+    print(f"✅ Index and scan build identical prompts for all {len(samples):,} dataset samples")
+
+    print(f"\n⏱️  Scan: {args.scan_samples:,} prompts...")
+    start_time = time.perf_counter()
+    for sample in itertools.islice(itertools.cycle(samples), args.scan_samples):
+        build_prompt_by_scan(template, sample, codebook)
+    scan_seconds = time.perf_counter() - start_time
+
+    print(f"⏱️  Index: {args.samples:,} prompts...")
+    built = 0
+    prompt_chars = 0
+    start_time = time.perf_counter()
+    for sample in itertools.islice(itertools.cycle(samples), args.samples):
+        prompt = runner.build_prompt_for_sample(template, sample, index)
+        if prompt is not None:
+            built += 1
+            prompt_chars += len(prompt)
+    index_build_seconds = time.perf_counter() - start_time
+
+    scan_rate = args.scan_samples / scan_seconds
+    index_rate = args.samples / index_build_seconds
+    print_section_header("📊 Results")
+    print(f"{'Lookup':<8} {'Prompts':>10} {'Time':>9} {'Prompts/s':>11} {'µs each':>8}")
+    print(f"{'scan':<8} {args.scan_samples:>10,} {format_duration(scan_seconds):>9} "
+          f"{scan_rate:>11,.0f} {1e6 / scan_rate:>8.1f}")
+    print(f"{'index':<8} {args.samples:>10,} {format_duration(index_build_seconds):>9} "
+          f"{index_rate:>11,.0f} {1e6 / index_rate:>8.1f}")
+    print(f"\n🚀 {index_rate / scan_rate:.1f}x faster: {args.samples:,} prompts take "
+          f"{format_duration(index_build_seconds)} instead of ~{format_duration(args.samples / scan_rate)}")
+    print(f"Prompts built: {built:,} (avg {prompt_chars / max(1, built):,.0f} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ACSES Pilot Study - Phase 5E: Benchmark Resume Startup
+Writes a synthetic results file with many existing records and measures how
+long a resume takes to find the missing runs of every sample with the resume
+index, against the former scan of all completed runs per sample.
+"""
+
+import io
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import List, Set, Tuple
+
+# Add current directory to path for imports
+current_path = Path(__file__).parent.parent
+sys.path.insert(0, str(current_path))
+
+from src.pipeline.pilot_runner import PilotRunner
+from src.utils.common import format_duration, print_section_header
+from src.utils.json_parser import load_existing_results
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse benchmark arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark resume startup with the resume index against a per-sample scan",
+        epilog="""
+Examples:
+  python scripts/05e_benchmark_resume.py
+  python scripts/05e_benchmark_resume.py --records 100000 --scan-samples 500
+""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=1_000_000, help="Existing records in the results file")
+    parser.add_argument("--runs", "-r", type=int, default=3, help="Runs per sample")
+    parser.add_argument("--failure-rate", type=float, default=0.05,
+                        help="Share of records that are failed runs (retried on resume)")
+    parser.add_argument("--text-chars", type=int, default=120, help="Length of each record's original_text")
+    parser.add_argument("--scan-samples", type=int, default=20,
+                        help="Samples resumed with the scan (its rate is extrapolated to all samples)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def write_results(path: Path, n_records: int, n_runs: int, failure_rate: float,
+                  text_chars: int, seed: int) -> List[str]:
+    """Write a results file shaped like the pilot's and return its sample ids."""
+    rng = random.Random(seed)
+    text = "x" * text_chars
+    sample_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(-(-n_records // n_runs))]
+    with open(path, 'w', encoding='utf-8') as f:
+        for record_index in range(n_records):
+            success = rng.random() >= failure_rate
+            f.write(json.dumps({
+                'sample_id': sample_ids[record_index // n_runs],
+                'run_number': record_index % n_runs + 1,
+                'original_text': text,
+                'model_name': 'models/gemini-2.5-flash-lite',
+                'success': success,
+                'is_correct': True if success else None,
+                'confidence_score': 0.9 if success else None,
+            }) + '\n')
+    return sample_ids
+
+
+def remaining_by_scan(sample_id: str, completed_runs: Set[Tuple[str, int]], n_runs: int) -> List[int]:
+    """The former lookup: scan every completed run for the sample's run numbers."""
+    sample_completed_runs = {run_num for (sid, run_num) in completed_runs if sid == sample_id}
+    return [run_num for run_num in range(1, n_runs + 1) if run_num not in sample_completed_runs]
+
+
+def main():
+    """Resume a synthetic results file both ways and report startup time."""
+    args = parse_arguments()
+    print_section_header("ACSES Resume Startup Benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results_path = Path(tmp_dir) / "results.jsonl"
+        print(f"📝 Writing {args.records:,} records ({args.runs} runs per sample, "
+              f"{args.failure_rate:.0%} failed)...")
+        sample_ids = write_results(results_path, args.records, args.runs, args.failure_rate,
+                                   args.text_chars, args.seed)
+        size_mb = results_path.stat().st_size / 1024 / 1024
+        print(f"   {len(sample_ids):,} samples, {size_mb:,.0f} MB")
+
+        start_time = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            existing_results, completed_runs = load_existing_results(str(results_path))
+        load_seconds = time.perf_counter() - start_time
+        del existing_results
+
+    start_time = time.perf_counter()
+    pending_runs = sum(len(PilotRunner._get_remaining_runs(sample_id, completed_runs, args.runs))
+                       for sample_id in sample_ids)
+    index_seconds = time.perf_counter() - start_time
+
+    completed_set = set(completed_runs)
+    scan_ids = sample_ids[:args.scan_samples]
+    start_time = time.perf_counter()
+    scanned = [remaining_by_scan(sample_id, completed_set, args.runs) for sample_id in scan_ids]
+    scan_seconds = time.perf_counter() - start_time
+
+    # Both lookups must find the same missing runs
+    for sample_id, remaining in zip(scan_ids, scanned):
+        if PilotRunner._get_remaining_runs(sample_id, completed_runs, args.runs) != remaining:
+            print(f"❌ Remaining runs differ for sample {sample_id}")
+            sys.exit(1)
+    print(f"✅ Index and scan agree on the remaining runs of {len(scan_ids):,} samples")
+
+    scan_total = scan_seconds / max(1, len(scan_ids)) * len(sample_ids)
+    print_section_header("📊 Results")
+    print(f"Load results and build resume index: {format_duration(load_seconds)} "
+          f"({len(completed_runs):,} completed runs)")
+    print(f"{'Lookup':<8} {'Samples':>10} {'Time':>10} {'µs per sample':>14}")
+    print(f"{'scan':<8} {len(scan_ids):>10,} {format_duration(scan_seconds):>10} "
+          f"{scan_seconds / max(1, len(scan_ids)) * 1e6:>14,.0f}")
+    print(f"{'index':<8} {len(sample_ids):>10,} {format_duration(index_seconds):>10} "
+          f"{index_seconds / len(sample_ids) * 1e6:>14,.2f}")
+    print(f"\n🚀 Finding the {pending_runs:,} pending runs of {len(sample_ids):,} samples takes "
+          f"{format_duration(index_seconds)} instead of ~{format_duration(scan_total)}")
+    print(f"   Resume startup: {format_duration(load_seconds + index_seconds)} "
+          f"instead of ~{format_duration(load_seconds + scan_total)}")
+
+
+if __name__ == "__main__":
+    main()
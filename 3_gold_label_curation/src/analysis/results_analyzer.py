@@ -7,9 +7,11 @@ import json
 import os
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
-from collections import defaultdict
+from collections import Counter, defaultdict
 import pandas as pd
 
+from ..pipeline.adaptive_runs import AdaptiveRunPolicy
+
 
 class ResultsAnalyzer:
     """Analyzes pilot study results from JSONL files."""
@@ -74,12 +76,18 @@ class ResultsAnalyzer:
             
         return results
     
-    def analyze_model_results(self, model_name: str) -> Dict[str, Any]:
+    def analyze_model_results(self, model_name: str, n_runs: int = 3) -> Dict[str, Any]:
         """
         Comprehensive analysis of results for a specific model.
         
+        Samples of an adaptive-runs study have as many runs as their
+        agreement needed: such a sample is complete once the policy stamped
+        on its records settles it, or once it has the runs of a full study.
+        
         Args:
             model_name: Name of the model to analyze
+            n_runs: Runs per sample of a full study (used for records
+                without adaptive-runs metadata)
             
         Returns:
             Dictionary containing analysis results
@@ -100,7 +108,7 @@ class ResultsAnalyzer:
         # Sample and run coverage
         samples = set(r.get('sample_id', 'unknown') for r in results)
         sample_runs = defaultdict(set)
-        successful_sample_runs = defaultdict(set)
+        successful_sample_runs = defaultdict(dict)
         
         for result in results:
             sample_id = result.get('sample_id', 'unknown')
@@ -108,21 +116,33 @@ class ResultsAnalyzer:
             sample_runs[sample_id].add(run_num)
             
             if result.get('success', False):
-                successful_sample_runs[sample_id].add(run_num)
+                successful_sample_runs[sample_id][run_num] = result
         
         # Completeness analysis
-        expected_runs = {1, 2, 3}
         complete_samples = []
         incomplete_samples = []
+        adaptive_samples = 0
         
         for sample_id in samples:
-            successful_runs = successful_sample_runs.get(sample_id, set())
-            if successful_runs == expected_runs:
+            successful_runs = successful_sample_runs.get(sample_id, {})
+            adaptive = next((r['adaptive_runs'] for r in successful_runs.values() if r.get('adaptive_runs')), None)
+            sample_n_runs = adaptive.get('n_runs', n_runs) if adaptive else n_runs
+            expected_runs = set(range(1, sample_n_runs + 1))
+            if adaptive:
+                adaptive_samples += 1
+                policy = AdaptiveRunPolicy.from_metadata(adaptive)
+                complete = policy.complete(list(successful_runs.values()), sample_n_runs)
+            else:
+                complete = expected_runs <= set(successful_runs)
+            if complete:
                 complete_samples.append(sample_id)
             else:
-                missing_runs = expected_runs - successful_runs
+                missing_runs = expected_runs - set(successful_runs)
                 incomplete_samples.append((sample_id, missing_runs))
         
+        # Successful runs per sample vary with adaptive runs
+        run_counts = Counter(len(successful_sample_runs.get(sample_id, {})) for sample_id in samples)
+        
         # Error analysis
         error_analysis = {}
         if failed:
@@ -143,7 +163,10 @@ class ResultsAnalyzer:
             "incomplete_samples": len(incomplete_samples),
             "incomplete_details": incomplete_samples[:10],  # First 10 for brevity
             "error_analysis": error_analysis,
-            "sample_coverage": len(sample_runs)
+            "sample_coverage": len(sample_runs),
+            "adaptive_samples": adaptive_samples,
+            "run_count_distribution": dict(sorted(run_counts.items())),
+            "mean_runs_per_sample": len(successful) / len(samples) if samples else 0
         }
     
     def print_analysis_report(self, analysis: Dict[str, Any]) -> None:
@@ -165,6 +188,11 @@ class ResultsAnalyzer:
         print(f"\n🆔 Unique samples processed: {analysis['unique_samples']}")
         print(f"✅ Complete samples: {analysis['complete_samples']}")
         print(f"⚠️  Incomplete samples: {analysis['incomplete_samples']}")
+        if analysis.get('adaptive_samples'):
+            distribution = ", ".join(f"{count} with {runs}"
+                                     for runs, count in analysis['run_count_distribution'].items())
+            print(f"🎯 Adaptive runs: {analysis['mean_runs_per_sample']:.2f} successful runs per sample "
+                  f"({distribution})")
         
         # Error breakdown
         if analysis.get('error_analysis'):
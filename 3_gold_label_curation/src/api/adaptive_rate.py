@@ -0,0 +1,240 @@
+"""
+Adaptive Rate Control
+AIMD controller that learns the sustainable request rate of a model from 429s.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .rate_limiter import RateLimiter
+
+ADDITIVE_INCREASE_RPM = 1.0  # RPM added per minute of clean traffic
+MULTIPLICATIVE_DECREASE = 0.5  # Factor applied to the rate on a 429
+MIN_RPM = 0.5
+MAX_RATE_FACTOR = 4.0  # Never probe above this multiple of the published RPM
+
+
+class RateLimitRegistry:
+    """
+    JSON file of learned sustainable rates per model and API key.
+
+    Keys are stored by fingerprint only, so the file is safe to keep next to
+    other run artifacts. Writes go through a temporary file and a rename, so
+    an interrupted run never leaves a truncated registry behind.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load (or start) a registry.
+
+        Args:
+            path: Path to the JSON file
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  Ignoring unreadable rate limit registry {self.path}: {e}")
+
+    def get(self, model_name: str, fingerprint: str) -> Optional[float]:
+        """Learned RPM of a model on a key, or None if nothing was learned yet."""
+        with self._lock:
+            entry = self._data.get(model_name, {}).get(fingerprint)
+            return entry['rpm'] if entry else None
+
+    def set(self, model_name: str, fingerprint: str, rpm: float,
+            rate_limited_at: Optional[float] = None) -> None:
+        """Record the sustainable RPM of a model on a key (call save() to persist)."""
+        with self._lock:
+            entry = self._data.setdefault(model_name, {}).setdefault(fingerprint, {})
+            entry['rpm'] = round(rpm, 3)
+            if rate_limited_at is not None:
+                entry['rate_limited_at_rpm'] = round(rate_limited_at, 3)
+            entry['updated_at'] = datetime.now().isoformat()
+
+    def save(self) -> None:
+        """Write the registry to disk."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class ModelLimitsRegistry:
+    """
+    JSON file of measured model limits, per backend and model.
+
+    Written by the throughput probe (scripts/02b_probe_throughput.py) and
+    read by the pilot runner at startup, so runs pace to the rate a model
+    was measured to sustain instead of the published one. Entries are kept
+    per backend name, so probing the offline fake never changes the limits
+    used against the live API.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load (or start) a registry.
+
+        Args:
+            path: Path to the JSON file
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  Ignoring unreadable model limits registry {self.path}: {e}")
+
+    def get(self, backend_name: str, model_name: str) -> Optional[Dict[str, Any]]:
+        """Measured limits of a model on a backend, or None if it was never probed."""
+        with self._lock:
+            entry = self._data.get(backend_name, {}).get(model_name)
+            return dict(entry) if entry else None
+
+    def models(self, backend_name: str) -> Dict[str, Dict[str, Any]]:
+        """Every probed model of a backend."""
+        with self._lock:
+            return {model: dict(entry) for model, entry in self._data.get(backend_name, {}).items()}
+
+    def set(self, backend_name: str, model_name: str, entry: Dict[str, Any]) -> None:
+        """Record the measured limits of a model (call save() to persist)."""
+        with self._lock:
+            self._data.setdefault(backend_name, {})[model_name] = {
+                **entry, 'updated_at': datetime.now().isoformat()
+            }
+
+    def effective_limits(self, backend_name: str, model_name: str,
+                         config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Published limits of a model with the measured ones applied.
+
+        A probe that ran into 429s found the real ceiling, so its rate
+        replaces the published RPM (and TPM, when the 429s were about
+        tokens). A probe that never got rate limited only found a lower
+        bound, so it can raise the published RPM but never lower it.
+
+        Args:
+            backend_name: Name of the backend the limits apply to
+            model_name: The model
+            config: Published limits ('rpm', 'tpm', ...)
+
+        Returns:
+            The limits to pace to
+        """
+        entry = self.get(backend_name, model_name)
+        if not entry or not entry.get('rpm'):
+            return config
+
+        limits = dict(config)
+        if entry.get('limited_by'):
+            limits['rpm'] = entry['rpm']
+        else:
+            limits['rpm'] = max(config.get('rpm', 0), entry['rpm'])
+        if entry.get('limited_by') == 'tpm' and entry.get('tpm'):
+            limits['tpm'] = entry['tpm']
+        return limits
+
+    def save(self) -> None:
+        """Write the registry to disk."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease control of a RateLimiter.
+
+    While calls succeed the rate grows by `additive_increase` RPM per
+    minute of traffic; a 429 multiplies it by `decrease_factor` and pauses
+    the limiter for the API's suggested retry delay. Several requests in
+    flight often hit the same 429 burst, so only the first 429 within one
+    request interval cuts the rate.
+    """
+
+    def __init__(self, limiter: RateLimiter, min_rpm: float = MIN_RPM,
+                 max_rpm: Optional[float] = None,
+                 additive_increase: float = ADDITIVE_INCREASE_RPM,
+                 decrease_factor: float = MULTIPLICATIVE_DECREASE):
+        """
+        Initialize the controller.
+
+        Args:
+            limiter: The limiter whose rate is adjusted
+            min_rpm: Lower bound of the rate
+            max_rpm: Upper bound of the rate (None = unbounded)
+            additive_increase: RPM gained per minute of successful calls
+            decrease_factor: Multiplier applied to the rate on a 429
+        """
+        self.limiter = limiter
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.last_rate_limited_rpm: Optional[float] = None
+        self._last_decrease: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def rpm(self) -> float:
+        """Current request rate."""
+        return self.limiter.requests_per_minute
+
+    def on_success(self) -> float:
+        """
+        Grow the rate after a successful call.
+
+        Each success adds `additive_increase / rpm`, so a minute of traffic at
+        the current rate adds `additive_increase` RPM.
+
+        Returns:
+            The new rate
+        """
+        with self._lock:
+            rpm = self.rpm + self.additive_increase / self.rpm
+            if self.max_rpm is not None:
+                rpm = min(rpm, self.max_rpm)
+            self.limiter.set_rate(rpm)
+            return rpm
+
+    def on_rate_limited(self, retry_delay: float = 0.0) -> bool:
+        """
+        Cut the rate after a 429 and pause for the suggested delay.
+
+        Args:
+            retry_delay: Seconds the API asked us to wait
+
+        Returns:
+            True if the rate was reduced, False if the 429 belonged to a burst
+            that was already accounted for
+        """
+        with self._lock:
+            now = time.monotonic()
+            if retry_delay > 0:
+                self.limiter.pause(retry_delay)
+            if self._last_decrease is not None and now - self._last_decrease < 60.0 / self.rpm + retry_delay:
+                return False
+
+            self.last_rate_limited_rpm = self.rpm
+            self.limiter.set_rate(max(self.min_rpm, self.rpm * self.decrease_factor))
+            self._last_decrease = now
+            return True
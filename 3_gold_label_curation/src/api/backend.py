@@ -0,0 +1,100 @@
+"""
+LLM Backend Interface
+Protocol for the transports GeminiClient can send requests through, plus the
+response types non-SDK backends return.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class LLMModel(Protocol):
+    """A model bound to one API key, shaped like genai.GenerativeModel."""
+
+    def generate_content(self, prompt: str, generation_config: Any = None, **kwargs: Any) -> Any:
+        """Generate a response; it must offer .text, .candidates and .usage_metadata."""
+        ...
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None,
+                                     **kwargs: Any) -> Any:
+        """Async variant of generate_content."""
+        ...
+
+    def count_tokens(self, prompt: str) -> Any:
+        """Count input tokens; the result must offer .total_tokens."""
+        ...
+
+
+@runtime_checkable
+class LLMBackend(Protocol):
+    """
+    Transport behind GeminiClient.
+
+    GeminiClient keeps the retries, key pool pacing, response cache and
+    hedging; a backend only turns a model name and key into an LLMModel and
+    tells the client which models it serves and at what limits.
+    """
+
+    name: str
+
+    def model(self, model_name: str, api_key: str,
+              system_instruction: Optional[str] = None) -> LLMModel:
+        """Get a model bound to an API key."""
+        ...
+
+    def limits(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Limits and prices of a model ('rpm', 'tpm', 'rpd', 'input_price',
+        'output_price', 'description'), or None if it is not served.
+        """
+        ...
+
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        """Models known up front, with their limits (for listings)."""
+        ...
+
+
+@dataclass
+class TextPart:
+    text: str
+
+
+@dataclass
+class TextContent:
+    parts: List[TextPart]
+
+
+@dataclass
+class TextCandidate:
+    content: TextContent
+    finish_reason: str = "STOP"
+
+
+@dataclass
+class UsageMetadata:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+
+
+@dataclass
+class TokenCount:
+    total_tokens: int
+
+
+@dataclass
+class TextResponse:
+    """Mirrors the parts of GenerateContentResponse the client reads."""
+    candidates: List[TextCandidate]
+    usage_metadata: UsageMetadata
+
+    @property
+    def text(self) -> str:
+        # Like the SDK, the quick accessor only works for one candidate with parts
+        if len(self.candidates) != 1 or not self.candidates[0].content.parts:
+            raise ValueError(
+                "The `response.text` quick accessor requires the response to contain "
+                "exactly one candidate with at least one part."
+            )
+        return "".join(part.text for part in self.candidates[0].content.parts)
@@ -0,0 +1,324 @@
+"""
+Response Cassettes
+Records raw prompt/response pairs with their latency and usage into an
+append-only gzip JSONL archive, and replays them through an offline backend.
+"""
+
+import gzip
+import json
+import time
+import zlib
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .backend import TextCandidate, TextContent, TextPart, TextResponse, TokenCount, UsageMetadata
+from .key_pool import estimate_tokens
+from .openai_backend import UNLIMITED_RPD, UNLIMITED_RPM, UNLIMITED_TPM
+
+CASSETTE_VERSION = 1
+
+# Generation settings that change the response and therefore tell recordings apart
+KEY_CONFIG_FIELDS = ('temperature', 'top_p', 'top_k', 'max_output_tokens',
+                     'candidate_count', 'response_mime_type')
+
+
+class RecordingNotFound(LookupError):
+    """A replayed request has no recording (never retried: the name reads as NotFound)."""
+
+
+def config_fields(generation_config: Any) -> Dict[str, Any]:
+    """The generation settings of a call that are part of its cassette key."""
+    fields = {}
+    for attribute in KEY_CONFIG_FIELDS:
+        value = getattr(generation_config, attribute, None)
+        if value is not None:
+            fields[attribute] = value
+    return fields
+
+
+def cassette_key(model_name: str, prompt: str, config: Dict[str, Any]) -> str:
+    """
+    Key of a request in a cassette.
+
+    The system instruction is left out: it is the same static prompt for
+    every call, so 'split' and 'cached' runs replay each other's recordings.
+
+    Args:
+        model_name: Name of the model
+        prompt: Prompt text
+        config: Generation settings (see config_fields)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps([model_name, prompt, config], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def serialize_response(response: Any) -> Dict[str, Any]:
+    """Candidates and token usage of an SDK or backend response as plain JSON."""
+    candidates = []
+    for candidate in getattr(response, 'candidates', None) or []:
+        parts = getattr(getattr(candidate, 'content', None), 'parts', None) or []
+        finish_reason = getattr(candidate, 'finish_reason', None)
+        candidates.append({
+            'text': "".join(getattr(part, 'text', '') for part in parts),
+            'finish_reason': getattr(finish_reason, 'name', None) or str(finish_reason or "STOP"),
+        })
+
+    metadata = getattr(response, 'usage_metadata', None)
+    return {
+        'candidates': candidates,
+        'usage': {
+            'prompt_tokens': getattr(metadata, 'prompt_token_count', 0) or 0,
+            'output_tokens': getattr(metadata, 'candidates_token_count', 0) or 0,
+            'total_tokens': getattr(metadata, 'total_token_count', 0) or 0,
+        },
+    }
+
+
+def deserialize_response(entry: Dict[str, Any]) -> TextResponse:
+    """Rebuild a response GeminiClient can read from a recorded entry."""
+    candidates = [
+        TextCandidate(TextContent([TextPart(c['text'])] if c['text'] else []), c['finish_reason'])
+        for c in entry['candidates']
+    ]
+    usage = entry['usage']
+    return TextResponse(candidates, UsageMetadata(
+        usage['prompt_tokens'], usage['output_tokens'], usage['total_tokens']
+    ))
+
+
+def read_cassette(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the entries of a cassette.
+
+    A recording interrupted mid-write leaves a gzip member without its
+    trailer; everything before the cut is still returned.
+
+    Args:
+        path: Path of the .jsonl.gz archive
+
+    Yields:
+        Recorded entries in recording order
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"⚠️  Warning: Invalid cassette entry on line {line_num}: {e}")
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            print(f"⚠️  Warning: {path} ends in an incomplete write; using the entries before it")
+
+
+class CassetteRecorder:
+    """
+    Appends every successful API response to a cassette.
+
+    The archive is opened in append mode and every run adds a new gzip
+    member, so earlier recordings are never rewritten. Entries are flushed
+    as they are written, so an interrupted run keeps what it recorded.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the recorder.
+
+        Args:
+            path: Path of the .jsonl.gz archive (created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+        self._file: Optional[gzip.GzipFile] = None
+        self._lock = threading.Lock()
+
+    def wrap(self, model: Any, model_name: str) -> "RecordingModel":
+        """Wrap a model so its responses are recorded."""
+        return RecordingModel(model, model_name, self)
+
+    def record(self, model_name: str, prompt: str, generation_config: Any,
+               response: Any, latency: float) -> None:
+        """
+        Append one call to the archive.
+
+        Args:
+            model_name: Name of the model that answered
+            prompt: Prompt text sent
+            generation_config: Generation settings of the call
+            response: The raw response
+            latency: Seconds the call took
+        """
+        config = config_fields(generation_config)
+        entry = {
+            'version': CASSETTE_VERSION,
+            'key': cassette_key(model_name, prompt, config),
+            'model_name': model_name,
+            'prompt': prompt,
+            'config': config,
+            **serialize_response(response),
+            'latency': round(latency, 4),
+            'recorded_at': datetime.now().isoformat(),
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                self._file = gzip.open(self.path, 'ab')
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self) -> None:
+        """Finish the current gzip member; the next record starts a new one."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecordingModel:
+    """Model wrapper that times each successful call and records it."""
+
+    def __init__(self, model: Any, model_name: str, recorder: CassetteRecorder):
+        self.model = model
+        self.model_name = model_name
+        self.recorder = recorder
+
+    def generate_content(self, prompt: str, generation_config: Any = None, **kwargs: Any) -> Any:
+        start_time = time.monotonic()
+        response = self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        self.recorder.record(self.model_name, prompt, generation_config, response,
+                             time.monotonic() - start_time)
+        return response
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None,
+                                     **kwargs: Any) -> Any:
+        start_time = time.monotonic()
+        response = await self.model.generate_content_async(
+            prompt, generation_config=generation_config, **kwargs
+        )
+        self.recorder.record(self.model_name, prompt, generation_config, response,
+                             time.monotonic() - start_time)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class CassetteBackend:
+    """
+    LLMBackend serving recorded responses instead of calling a model.
+
+    Requests are matched on model, prompt and generation settings. Runs
+    at temperature > 0 send the same prompt several times; repeats are
+    answered with the recordings of that prompt in order, wrapping around
+    when a prompt is asked more often than it was recorded.
+
+    By default responses come back immediately and the client is not
+    paced; with `timing=True` each response takes as long as it did when
+    it was recorded.
+    """
+
+    name = "cassette replay"
+
+    def __init__(self, path: str, timing: bool = False):
+        """
+        Load a cassette.
+
+        Args:
+            path: Path of the .jsonl.gz archive
+            timing: Reproduce the recorded latency of every response
+        """
+        self.path = path
+        self.timing = timing
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.recorded_models: set = set()
+        for entry in read_cassette(path):
+            self.entries.setdefault(entry['key'], []).append(entry)
+            self.recorded_models.add(entry['model_name'])
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.missing = 0
+        print(f"🎞️  Loaded {sum(len(e) for e in self.entries.values())} recorded responses "
+              f"({len(self.entries)} distinct requests) from {path}")
+
+    def limits(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Unpaced limits for recorded models; other models are not served."""
+        if model_name not in self.recorded_models:
+            return None
+        return {
+            'rpm': UNLIMITED_RPM,
+            'tpm': UNLIMITED_TPM,
+            'rpd': UNLIMITED_RPD,
+            'input_price': 0.0,
+            'output_price': 0.0,
+            'description': f"{model_name} replayed from {Path(self.path).name}",
+        }
+
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        """Models that have recordings."""
+        return {model_name: self.limits(model_name) for model_name in sorted(self.recorded_models)}
+
+    def model(self, model_name: str, api_key: str = "",
+              system_instruction: Optional[str] = None) -> "ReplayModel":
+        """Get a model; keys and the system instruction play no part in matching."""
+        return ReplayModel(self, model_name)
+
+    def lookup(self, model_name: str, prompt: str, generation_config: Any) -> Dict[str, Any]:
+        """
+        Next recorded entry of a request.
+
+        Raises:
+            RecordingNotFound: If the cassette has no recording of the request
+        """
+        key = cassette_key(model_name, prompt, config_fields(generation_config))
+        recordings = self.entries.get(key)
+        with self._lock:
+            if not recordings:
+                self.missing += 1
+                raise RecordingNotFound(
+                    f"No recording of this {model_name} request in {self.path} "
+                    f"(prompt starts: {prompt[:80]!r})"
+                )
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.replayed += 1
+        return recordings[cursor % len(recordings)]
+
+    def stats(self) -> Dict[str, int]:
+        """Replay counters."""
+        return {'requests': self.replayed + self.missing, 'replayed': self.replayed,
+                'missing': self.missing}
+
+
+class ReplayModel:
+    """Drop-in for genai.GenerativeModel backed by a CassetteBackend."""
+
+    def __init__(self, backend: CassetteBackend, model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, generation_config: Any = None, **kwargs: Any) -> TextResponse:
+        entry = self.backend.lookup(self.model_name, prompt, generation_config)
+        if self.backend.timing:
+            time.sleep(entry['latency'])
+        return deserialize_response(entry)
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None,
+                                     **kwargs: Any) -> TextResponse:
+        entry = self.backend.lookup(self.model_name, prompt, generation_config)
+        if self.backend.timing:
+            await asyncio.sleep(entry['latency'])
+        return deserialize_response(entry)
+
+    def count_tokens(self, prompt: str) -> TokenCount:
+        return TokenCount(estimate_tokens(prompt))
@@ -0,0 +1,303 @@
+"""
+Fake Gemini Backend
+In-process stand-in for the Gemini API for load tests and offline benchmarks.
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from .backend import TextCandidate, TextContent, TextPart, TextResponse, TokenCount, UsageMetadata
+from .openai_backend import UNLIMITED_RPD, UNLIMITED_RPM, UNLIMITED_TPM
+
+try:
+    from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+except ImportError:  # google-api-core ships with google-generativeai
+    class ResourceExhausted(Exception):
+        """Stand-in for google.api_core.exceptions.ResourceExhausted."""
+
+        code = 429
+
+        def __init__(self, message: str):
+            super().__init__(f"429 {message}")
+
+    class DeadlineExceeded(Exception):
+        """Stand-in for google.api_core.exceptions.DeadlineExceeded."""
+
+        code = 504
+
+        def __init__(self, message: str):
+            super().__init__(f"504 {message}")
+
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeBackendConfig:
+    """Behaviour of the fake service (rates are probabilities per candidate)."""
+    latency_mean: float = 0.8  # Seconds per request
+    latency_sigma: float = 0.3  # Log-normal shape (0 = fixed latency)
+    latency_per_output_token: float = 0.0  # Seconds added per generated token (decode time)
+    stall_rate: float = 0.0  # Share of requests that hang for stall_seconds
+    stall_seconds: float = 120.0
+    rpm: Optional[float] = None  # Requests per minute per key (None = unlimited)
+    rpd: Optional[int] = None  # Requests per day per key (None = unlimited)
+    malformed_rate: float = 0.0
+    truncated_rate: float = 0.0
+    empty_rate: float = 0.0
+    correct_rate: float = 0.7  # Share of verdicts with is_correct = true
+    seed: int = 0
+
+
+class FakeGeminiBackend:
+    """
+    Emulates the Gemini generate endpoint in-process.
+
+    Models handed out by `model()` behave like genai.GenerativeModel for
+    everything GeminiClient uses: sync and async generate calls (including
+    candidate_count), usage metadata and count_tokens. Each API key gets its
+    own RPM window and daily counter, and exceeding them raises a real
+    ResourceExhausted with the `retry_delay` hint the live API sends.
+
+    Verdicts are schema-valid and derived from a hash of the seed and
+    prompt, so the same workload gives the same answers regardless of
+    concurrency. Prompts that do not ask for "reasoning" (the terse
+    templates) get verdicts without the explanation fields.
+    """
+
+    name = "offline fake"
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None, **overrides: Any):
+        """
+        Initialize the backend.
+
+        Args:
+            config: Behaviour of the service
+            **overrides: Individual FakeBackendConfig fields to override
+        """
+        self.config = config or FakeBackendConfig()
+        for name, value in overrides.items():
+            if not hasattr(self.config, name):
+                raise ValueError(f"Unknown fake backend setting: {name}")
+            setattr(self.config, name, value)
+
+        self.requests = 0
+        self.rate_limited = 0
+        self._windows: Dict[str, Deque[float]] = {}
+        self._daily: Dict[str, int] = {}
+        self._prompt_calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "FakeGeminiBackend":
+        """
+        Build a backend from a 'name=value,name=value' string (CLI friendly).
+
+        Example: "latency_mean=0.2,rpm=60,malformed_rate=0.05"
+        """
+        overrides: Dict[str, Any] = {}
+        for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+            name, _, value = item.partition('=')
+            default = getattr(FakeBackendConfig, name.strip(), None)
+            if isinstance(default, int) and not isinstance(default, bool) and '.' not in value:
+                overrides[name.strip()] = int(value)
+            else:
+                overrides[name.strip()] = float(value)
+        return cls(**overrides)
+
+    def limits(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Limits of an emulated Gemini model (see models())."""
+        return self.models().get(model_name)
+
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The Gemini models the fake stands in for, with the fake's own limits.
+
+        The client paces to these, so a load test runs at the configured
+        rpm / rpd rather than the published Gemini limits (unlimited when
+        the fake has none).
+        """
+        from .gemini_client import AVAILABLE_MODELS
+        return {
+            model_name: {
+                **config,
+                'rpm': self.config.rpm or UNLIMITED_RPM,
+                'tpm': UNLIMITED_TPM,
+                'rpd': self.config.rpd or UNLIMITED_RPD,
+            }
+            for model_name, config in AVAILABLE_MODELS.items()
+        }
+
+    def model(self, model_name: str, api_key: str = "offline",
+              system_instruction: Optional[str] = None) -> "FakeGenerativeModel":
+        """Get a model bound to an API key (each key has its own quota)."""
+        return FakeGenerativeModel(self, model_name, api_key, system_instruction)
+
+    def stats(self) -> Dict[str, int]:
+        """Requests served and 429s raised so far."""
+        with self._lock:
+            return {'requests': self.requests, 'rate_limited': self.rate_limited}
+
+    def _admit(self, api_key: str) -> None:
+        """Count a request against the key's quotas, raising 429s like the API."""
+        with self._lock:
+            now = time.monotonic()
+            window = self._windows.setdefault(api_key, deque())
+            while window and now - window[0] >= 60.0:
+                window.popleft()
+
+            if self.config.rpd is not None and self._daily.get(api_key, 0) >= self.config.rpd:
+                self.rate_limited += 1
+                raise ResourceExhausted(
+                    "Resource has been exhausted (e.g. check quota). "
+                    "[violations { quota_id: \"GenerateRequestsPerDayPerProjectPerModel-FreeTier\" }]"
+                )
+
+            if self.config.rpm is not None and len(window) >= self.config.rpm:
+                self.rate_limited += 1
+                retry_delay = max(1, int(60.0 - (now - window[0])) + 1)
+                raise ResourceExhausted(
+                    "Resource has been exhausted (e.g. check quota). "
+                    "[violations { quota_id: \"GenerateRequestsPerMinutePerProjectPerModel-FreeTier\" }, "
+                    f"retry_delay {{ seconds: {retry_delay} }}]"
+                )
+
+            window.append(now)
+            self._daily[api_key] = self._daily.get(api_key, 0) + 1
+            self.requests += 1
+
+    def _rng(self, prompt: str) -> random.Random:
+        """Deterministic random source for the n-th call with a prompt."""
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            call = self._prompt_calls.get(digest, 0)
+            self._prompt_calls[digest] = call + 1
+        return random.Random(f"{self.config.seed}:{digest}:{call}")
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.config.stall_rate > 0 and rng.random() < self.config.stall_rate:
+            return self.config.stall_seconds
+        if self.config.latency_sigma <= 0:
+            return self.config.latency_mean
+        mu = -self.config.latency_sigma ** 2 / 2  # Keeps the mean at latency_mean
+        return self.config.latency_mean * rng.lognormvariate(mu, self.config.latency_sigma)
+
+    def _verdict(self, rng: random.Random, code: str, sample_id: Optional[str] = None,
+                 terse: bool = False) -> Dict[str, Any]:
+        is_correct = rng.random() < self.config.correct_rate
+        verdict: Dict[str, Any] = {}
+        if sample_id is not None:
+            verdict['sample_id'] = sample_id
+        verdict.update({
+            'is_correct': is_correct,
+            'confidence_score': round(rng.uniform(0.55, 0.99), 2),
+            'reasoning': f"Simulasi: deskripsi pekerjaan {'sesuai' if is_correct else 'tidak sesuai'} "
+                         f"dengan kode KBLI {code}.",
+            'alternative_codes': [] if is_correct else [f"{rng.randint(10000, 99999)}"],
+            'alternative_reasoning': "" if is_correct else "Simulasi: kode alternatif lebih sesuai.",
+        })
+        if terse:
+            del verdict['reasoning'], verdict['alternative_reasoning']
+        return verdict
+
+    def _candidate_text(self, rng: random.Random, prompt: str, structured: bool = False,
+                        terse: bool = False) -> str:
+        """
+        One candidate: a JSON verdict (or array for batch prompts), possibly damaged.
+
+        In structured output mode the text is bare JSON and never malformed,
+        as with schema-constrained decoding, but it can still be cut off.
+        """
+        sample_ids = re.findall(r"### SAMPLE sample_id=(\S+)", prompt)
+        if sample_ids:
+            blocks = re.split(r"### SAMPLE sample_id=\S+", prompt)[1:]
+            verdicts = [
+                self._verdict(rng, self._find_code(block), sample_id, terse)
+                for sample_id, block in zip(sample_ids, blocks)
+            ]
+            payload = verdicts
+        else:
+            payload = self._verdict(rng, self._find_code(prompt), terse=terse)
+        text = json.dumps(payload, ensure_ascii=False, indent=None if structured else 2)
+        if not structured:
+            text = "```json\n" + text + "\n```"
+
+        roll = rng.random()
+        if roll < self.config.empty_rate:
+            return ""
+        roll -= self.config.empty_rate
+        if roll < self.config.truncated_rate:
+            return text[:rng.randint(1, max(1, len(text) - 5))]
+        roll -= self.config.truncated_rate
+        if roll < self.config.malformed_rate and not structured:
+            return "Berikut analisis saya: {is_correct: ya, confidence_score: tinggi}"
+        return text
+
+    @staticmethod
+    def _find_code(text: str) -> str:
+        match = re.search(r"\b(\d{5})\b", text)
+        return match.group(1) if match else "00000"
+
+    def generate(self, prompt: str, generation_config: Any = None,
+                 system_instruction: Optional[str] = None) -> TextResponse:
+        """Build the response to a prompt (quota checks happen in the model)."""
+        candidate_count = getattr(generation_config, 'candidate_count', None) or 1
+        structured = getattr(generation_config, 'response_mime_type', None) == 'application/json'
+        terse = '"reasoning"' not in (system_instruction or '') + prompt
+        rng = self._rng(prompt)
+        texts = [self._candidate_text(rng, prompt, structured, terse) for _ in range(candidate_count)]
+
+        candidates = [
+            TextCandidate(TextContent([TextPart(text)] if text else []))
+            for text in texts
+        ]
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN + 1
+        output_tokens = sum(len(text) // CHARS_PER_TOKEN for text in texts)
+        return TextResponse(
+            candidates,
+            UsageMetadata(prompt_tokens, output_tokens, prompt_tokens + output_tokens),
+        )
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel backed by a FakeGeminiBackend."""
+
+    def __init__(self, backend: FakeGeminiBackend, model_name: str, api_key: str,
+                 system_instruction: Optional[str] = None):
+        self.backend = backend
+        self.model_name = model_name
+        self.api_key = api_key
+        self.system_instruction = system_instruction
+
+    def _latency(self, prompt: str, response: TextResponse) -> float:
+        decode = response.usage_metadata.candidates_token_count * self.backend.config.latency_per_output_token
+        return self.backend._latency(self.backend._rng(prompt + "#latency")) + decode
+
+    def generate_content(self, prompt: str, generation_config: Any = None, **kwargs: Any) -> TextResponse:
+        self.backend._admit(self.api_key)
+        response = self.backend.generate(prompt, generation_config, self.system_instruction)
+        latency = self._latency(prompt, response)
+        timeout = (kwargs.get('request_options') or {}).get('timeout')
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded("Deadline Exceeded")
+        time.sleep(latency)
+        return response
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None,
+                                     **kwargs: Any) -> TextResponse:
+        self.backend._admit(self.api_key)
+        response = self.backend.generate(prompt, generation_config, self.system_instruction)
+        await asyncio.sleep(self._latency(prompt, response))
+        return response
+
+    def count_tokens(self, prompt: str) -> TokenCount:
+        prefix = len(self.system_instruction) if self.system_instruction else 0
+        return TokenCount((prefix + len(prompt)) // CHARS_PER_TOKEN + 1)
@@ -4,51 +4,241 @@ Handles all Gemini API interactions, rate limiting, and error handling.
 """
 
 import os
+import json
 import time
 import re
-import google.generativeai as genai
-from typing import Dict, Any, Optional
-from datetime import datetime
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, List, Optional
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 
-# Available models and their configurations
+from .rate_limiter import RateLimiter
+from .key_pool import APIKeyPool, KeyState, estimate_tokens, parse_api_keys
+from .adaptive_rate import ModelLimitsRegistry, RateLimitRegistry
+from .response_cache import ResponseCache
+from .backend import LLMBackend
+from .cassette import CassetteRecorder
+from .shared_rate_state import SharedRateState
+from .latency_tracker import LatencyTracker
+from .retry_policy import ErrorCategory, MalformedResponseError, RetryPolicy
+
+try:
+    import google.generativeai as genai
+    from google.generativeai import client as genai_client
+except ImportError:  # Only the offline backend works without the SDK
+    genai = None
+    genai_client = None
+
+# Available models and their configurations (limits are per API key,
+# prices are paid-tier USD per 1M input / output tokens)
 AVAILABLE_MODELS = {
-    "models/gemini-1.5-flash-latest": {"rpm": 15, "description": "Gemini 1.5 Flash (Latest)"},
-    "models/gemini-1.5-pro-latest": {"rpm": 2, "description": "Gemini 1.5 Pro (Latest)"},
-    "models/gemini-2.5-flash-lite": {"rpm": 15, "description": "Gemini 2.5 Flash Lite"},
+    "models/gemini-1.5-flash-latest": {"rpm": 15, "tpm": 1_000_000, "rpd": 1500, "input_price": 0.075, "output_price": 0.30, "description": "Gemini 1.5 Flash (Latest)"},
+    "models/gemini-1.5-pro-latest": {"rpm": 2, "tpm": 32_000, "rpd": 50, "input_price": 1.25, "output_price": 5.00, "description": "Gemini 1.5 Pro (Latest)"},
+    "models/gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000, "rpd": 1000, "input_price": 0.10, "output_price": 0.40, "description": "Gemini 2.5 Flash Lite"},
 }
 
+DEFAULT_CONTEXT_CACHE_TTL_MINUTES = 360
+
 DEFAULT_MAX_RETRIES = 3
-DEFAULT_RETRY_DELAY = 2
+RATE_LIMIT_BUFFER = 1.1  # Keep 10% headroom below the published RPM
+HEDGE_PERCENTILE = 0.95  # Hedge calls that run longer than this latency percentile
+
+
+@dataclass
+class ContextCacheHandle:
+    """A static prompt prefix registered with the API's context cache."""
+    name: str
+    model_name: str
+    fingerprint: str
+    cached_content: Any
+
+
+class GeminiSDKBackend:
+    """LLMBackend for the live Gemini API through google-generativeai."""
+    
+    name = "Gemini API"
+    
+    def __init__(self, api_keys: List[str]):
+        """
+        Configure the SDK.
+        
+        Args:
+            api_keys: Keys of the pool; the first one is the SDK default
+        """
+        if genai is None:
+            raise ImportError("google-generativeai is not installed. Install it with: pip install google-generativeai")
+        self.api_keys = list(api_keys)
+        self._key_clients: Dict[str, Any] = {}
+        genai.configure(api_key=self.api_keys[0])
+    
+    def limits(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Published limits and prices of a Gemini model."""
+        return AVAILABLE_MODELS.get(model_name)
+    
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        """Gemini models this client is configured for."""
+        return AVAILABLE_MODELS.copy()
+    
+    def model(self, model_name: str, api_key: str,
+              system_instruction: Optional[str] = None) -> Any:
+        """
+        Build a GenerativeModel bound to a specific key.
+        
+        genai.configure() only holds one global key, so each pool key gets its
+        own SDK client manager and the model is pointed at that key's clients.
+        """
+        if system_instruction:
+            model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        else:
+            model = genai.GenerativeModel(model_name)
+        if len(self.api_keys) == 1:
+            return model
+        
+        manager = self._key_clients.get(api_key)
+        if manager is None:
+            manager = genai_client._ClientManager()
+            manager.configure(api_key=api_key)
+            self._key_clients[api_key] = manager
+        
+        model._client = manager.get_default_client("generative")
+        model._async_client = manager.get_default_client("generative_async")
+        return model
 
 
 class GeminiClient:
     """Centralized Gemini API client with rate limiting and error handling."""
     
-    def __init__(self, api_key: Optional[str] = None, max_retries: int = DEFAULT_MAX_RETRIES):
+    def __init__(self, api_key: Optional[str] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                 api_keys: Optional[List[str]] = None, cache: Optional[ResponseCache] = None,
+                 adaptive_rate: bool = False, rate_registry: Optional[RateLimitRegistry] = None,
+                 backend: Optional[LLMBackend] = None,
+                 request_timeout: Optional[float] = None, hedge: bool = False,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 recorder: Optional[CassetteRecorder] = None,
+                 shared_rate_state: Optional[SharedRateState] = None):
         """
         Initialize the Gemini client.
         
         Args:
             api_key: Gemini API key (if None, reads from GEMINI_API_KEY env var)
             max_retries: Maximum number of API call retries
+            api_keys: Several API keys for key-pool mode (if None, reads the
+                comma-separated GEMINI_API_KEYS env var when set)
+            cache: Optional on-disk response cache consulted before every call
+            adaptive_rate: Learn the sustainable rate per model and key from
+                429s instead of trusting the published RPM
+            rate_registry: Registry of learned rates, so the next run starts
+                at the rate the previous one ended with
+            backend: Transport to send requests through instead of the
+                Gemini SDK, e.g. the offline fake or an OpenAI-compatible
+                local server; Gemini API keys are not needed when set
+            request_timeout: Deadline in seconds for a single API call; calls
+                that run over it are cancelled and retried (None = no deadline)
+            hedge: In async calls, send a duplicate request when a call runs
+                past the observed p95 latency and spare rate budget exists,
+                keeping whichever response arrives first
+            retry_policy: Error classification, backoff and retry budget
+                (default: RetryPolicy())
+            recorder: Cassette that every successful response is recorded to,
+                with its latency and usage, for offline replay
+            shared_rate_state: Rate-limit state shared with other processes on
+                this host, so they pace the same keys as one budget
         """
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        self.backend = backend
+        if api_keys is None and api_key is None and backend is None:
+            api_keys = parse_api_keys(os.getenv('GEMINI_API_KEYS', ''))
+        self.api_keys = list(api_keys or [])
+        if not self.api_keys:
+            single_key = api_key or (os.getenv('GEMINI_API_KEY') if backend is None else None)
+            self.api_keys = [single_key] if single_key else []
+        if not self.api_keys and backend is not None:
+            # Pool slot for backends that do not take Gemini keys
+            self.api_keys = ["offline-key"]
+        
+        self.api_key = self.api_keys[0] if self.api_keys else None
         self.max_retries = max_retries
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.request_timeout = request_timeout
+        self.hedge = hedge
+        self.recorder = recorder
+        self.latency = LatencyTracker()
+        self.request_stats = {'timeouts': 0, 'hedges_fired': 0, 'hedges_won': 0, 'cancelled': 0}
         self._configure_api()
+        self.key_pool = APIKeyPool(
+            self.api_keys, self.backend.models(), RATE_LIMIT_BUFFER,
+            adaptive=adaptive_rate, registry=rate_registry, shared_state=shared_rate_state
+        )
         
     def _configure_api(self) -> None:
         """Configure the Gemini API client."""
+        if self.backend is not None:
+            print(f"✅ Using {self.backend.name} backend ({len(self.api_keys)} key(s))")
+            return
+        
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not found. Please set it before running.")
         
-        genai.configure(api_key=self.api_key)
-        print("✅ Gemini API configured successfully")
+        self.backend = GeminiSDKBackend(self.api_keys)
+        if len(self.api_keys) > 1:
+            print(f"✅ Gemini API configured successfully ({len(self.api_keys)} keys in pool)")
+        else:
+            print("✅ Gemini API configured successfully")
     
     @staticmethod
     def get_available_models() -> Dict[str, Dict[str, Any]]:
         """Get available models and their configurations."""
         return AVAILABLE_MODELS.copy()
     
+    @property
+    def uses_sdk(self) -> bool:
+        """Whether requests go to the live Gemini API through the SDK."""
+        return isinstance(self.backend, GeminiSDKBackend)
+    
+    def get_model_config(self, model_name: str) -> Dict[str, Any]:
+        """
+        Limits and prices of a model served by this client's backend.
+        
+        Args:
+            model_name: The model being used
+            
+        Returns:
+            Configuration with 'rpm', 'tpm', 'rpd', prices and description
+            
+        Raises:
+            ValueError: If the backend does not serve the model
+        """
+        config = self.key_pool.model_limits.get(model_name) or self.backend.limits(model_name)
+        if config is None:
+            raise ValueError(f"Model {model_name} not available. Use get_available_models() to see options.")
+        # The key pool paces models it was not told about at construction
+        self.key_pool.model_limits.setdefault(model_name, config)
+        return config
+    
+    def apply_model_limits(self, registry: ModelLimitsRegistry) -> Dict[str, Dict[str, Any]]:
+        """
+        Pace to the limits measured by the throughput probe.
+        
+        Must be called before the first request of a model, since key pool
+        limiters take their rate when they are created.
+        
+        Args:
+            registry: Measured limits per backend and model
+            
+        Returns:
+            The effective limits of every model that had measurements
+        """
+        applied = {}
+        for model_name in registry.models(self.backend.name):
+            config = self.key_pool.model_limits.get(model_name) or self.backend.limits(model_name)
+            if config is None:
+                continue
+            applied[model_name] = registry.effective_limits(self.backend.name, model_name, config)
+            self.key_pool.model_limits[model_name] = applied[model_name]
+        return applied
+    
     @staticmethod
     def list_available_models() -> None:
         """Display available models and their configurations."""
@@ -57,13 +247,29 @@ class GeminiClient:
         for model, config in AVAILABLE_MODELS.items():
             print(f"📋 {model}")
             print(f"   Description: {config['description']}")
-            print(f"   Rate Limit: {config['rpm']} requests per minute")
-            delay = (60.0 / config['rpm']) * 1.1
+            print(f"   Rate Limit: {config['rpm']} requests per minute, "
+                  f"{config['tpm']:,} tokens per minute, {config['rpd']} requests per day (per key)")
+            delay = GeminiClient.rate_limit_delay(config)
             print(f"   Delay between requests: {delay:.1f} seconds")
+            print(f"   Price: ${config['input_price']:.3f} / ${config['output_price']:.2f} "
+                  f"per 1M input / output tokens")
             print()
     
     @staticmethod
-    def get_rate_limit_delay(model_name: str) -> float:
+    def rate_limit_delay(limits: Dict[str, Any]) -> float:
+        """
+        Calculate the minimum delay between requests for a model's limits.
+        
+        Args:
+            limits: Limits of the model (an AVAILABLE_MODELS entry; 15 RPM if it has no 'rpm')
+            
+        Returns:
+            Minimum delay in seconds between requests
+        """
+        rpm = limits.get("rpm", 15)
+        return (60.0 / rpm) * RATE_LIMIT_BUFFER
+    
+    def get_rate_limit_delay(self, model_name: str) -> float:
         """
         Calculate the minimum delay between requests to respect rate limits.
         
@@ -73,15 +279,51 @@ class GeminiClient:
         Returns:
             Minimum delay in seconds between requests
         """
-        rpm = AVAILABLE_MODELS.get(model_name, {}).get("rpm", 15)
-        return (60.0 / rpm) * 1.1
+        config = self.key_pool.model_limits.get(model_name) or self.backend.limits(model_name) or {}
+        return self.rate_limit_delay(config)
+    
+    def get_rate_limiter(self, model_name: str, api_key: Optional[str] = None) -> RateLimiter:
+        """
+        Get the shared rate limiter for a model, creating it on first use.
+        
+        Every call made through this client for the model and key (from any
+        thread or coroutine) draws from the same limiter.
+        
+        Args:
+            model_name: The model being used
+            api_key: Key whose limiter to return (default: the primary key)
+            
+        Returns:
+            The model's RateLimiter
+        """
+        key = self.key_pool.get_key(api_key or self.api_key)
+        return self.key_pool.get_limiter(key, model_name)
+    
+    def set_rate_limiter(self, model_name: str, limiter: RateLimiter,
+                         api_key: Optional[str] = None) -> None:
+        """
+        Use an existing limiter for a model, e.g. to share one budget
+        between several models or several clients.
+        """
+        key = self.key_pool.get_key(api_key or self.api_key)
+        self.key_pool.set_limiter(key, model_name, limiter)
     
     def generate_content(self, prompt: str, model_name: str, temperature: float = 0.7,
                         top_p: float = 0.8, top_k: int = 40, 
-                        max_output_tokens: int = 2048) -> str:
+                        max_output_tokens: int = 2048, run_number: Optional[int] = None,
+                        validate: Optional[Callable[[str], Any]] = None,
+                        system_instruction: Optional[str] = None,
+                        context_cache: Optional[ContextCacheHandle] = None,
+                        usage: Optional[Dict[str, Any]] = None,
+                        response_schema: Optional[Dict[str, Any]] = None) -> str:
         """
         Call the Gemini API with retry logic and rate limiting.
         
+        Each attempt is routed to the pool key with the most headroom and
+        waits for that key's rate limiter, so callers do not need to sleep
+        between requests. When a response cache is configured it is
+        consulted first, and a hit costs no API call at all.
+        
         Args:
             prompt: The formatted prompt
             model_name: Name of the model to use
@@ -89,58 +331,664 @@ class GeminiClient:
             top_p: Top-p parameter for generation
             top_k: Top-k parameter for generation
             max_output_tokens: Maximum output tokens
+            run_number: Run number, part of the cache key so repeated runs
+                of the same prompt stay independent samples
+            validate: Optional check (e.g. a JSON parser); a response it rejects
+                is retried like any other malformed response and never cached
+            system_instruction: Static instructions sent as the model's system
+                instruction instead of inside every prompt
+            context_cache: Registered context cache holding the static prefix;
+                the prompt then only carries the per-sample payload
+            usage: Optional dict that receives the call's token counts
+                (prompt_tokens, output_tokens, total_tokens, cache_hit) and
+                the number of retries it took (retry_count)
+            response_schema: Optional response schema; enables the API's JSON
+                output mode, so the text is bare JSON matching the schema
             
         Returns:
             Raw response text from the API
             
         Raises:
-            ValueError: If the model is not available or response is empty
+            ValueError: If the model is not available
+            MalformedResponseError: If every response was empty or failed validation
             Exception: If all retry attempts fail
         """
-        if model_name not in AVAILABLE_MODELS:
-            raise ValueError(f"Model {model_name} not available. Use get_available_models() to see options.")
+        generation_config = self._prepare_request(
+            model_name, temperature, top_p, top_k, max_output_tokens,
+            response_schema=response_schema
+        )
+        cache_key = self._get_cache_key(
+            prompt, model_name, run_number, temperature=temperature, top_p=top_p,
+            top_k=top_k, max_output_tokens=max_output_tokens,
+            **self._prefix_params(system_instruction, context_cache),
+            **self._output_params(response_schema)
+        )
+        return self._generate_with_retries(
+            prompt, model_name, generation_config, cache_key, validate, self._response_text,
+            system_instruction, context_cache, usage, retry_invalid=True
+        )
+    
+    async def generate_content_async(self, prompt: str, model_name: str, temperature: float = 0.7,
+                                     top_p: float = 0.8, top_k: int = 40,
+                                     max_output_tokens: int = 2048, run_number: Optional[int] = None,
+                                     validate: Optional[Callable[[str], Any]] = None,
+                                     system_instruction: Optional[str] = None,
+                                     context_cache: Optional[ContextCacheHandle] = None,
+                                     usage: Optional[Dict[str, Any]] = None,
+                                     response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Async variant of generate_content built on the SDK's async generate call.
         
-        model = genai.GenerativeModel(model_name)
+        Retry and rate limit handling mirror generate_content, but waits are
+        awaited so other in-flight requests keep running.
         
-        generation_config = genai.types.GenerationConfig(
-            temperature=temperature,
-            top_p=top_p,
-            top_k=top_k,
-            max_output_tokens=max_output_tokens,
+        Args:
+            prompt: The formatted prompt
+            model_name: Name of the model to use
+            temperature: Temperature parameter for generation
+            top_p: Top-p parameter for generation
+            top_k: Top-k parameter for generation
+            max_output_tokens: Maximum output tokens
+            run_number: Run number, part of the cache key
+            validate: Optional check; rejected responses are retried (see generate_content)
+            system_instruction: Static system instruction (see generate_content)
+            context_cache: Registered context cache (see generate_content)
+            usage: Optional dict that receives token counts (see generate_content)
+            response_schema: Optional response schema (see generate_content)
+            
+        Returns:
+            Raw response text from the API
+            
+        Raises:
+            ValueError: If the model is not available
+            MalformedResponseError: If every response was empty or failed validation
+            Exception: If all retry attempts fail
+        """
+        generation_config = self._prepare_request(
+            model_name, temperature, top_p, top_k, max_output_tokens,
+            response_schema=response_schema
+        )
+        cache_key = self._get_cache_key(
+            prompt, model_name, run_number, temperature=temperature, top_p=top_p,
+            top_k=top_k, max_output_tokens=max_output_tokens,
+            **self._prefix_params(system_instruction, context_cache),
+            **self._output_params(response_schema)
+        )
+        return await self._generate_with_retries_async(
+            prompt, model_name, generation_config, cache_key, validate, self._response_text,
+            system_instruction, context_cache, usage, retry_invalid=True
+        )
+    
+    def generate_candidates(self, prompt: str, model_name: str, candidate_count: int,
+                            temperature: float = 0.7, top_p: float = 0.8, top_k: int = 40,
+                            max_output_tokens: int = 2048,
+                            run_numbers: Optional[List[int]] = None,
+                            validate: Optional[Callable[[str], Any]] = None,
+                            system_instruction: Optional[str] = None,
+                            context_cache: Optional[ContextCacheHandle] = None,
+                            usage: Optional[Dict[str, Any]] = None,
+                            response_schema: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Get several independent completions of one prompt from a single API call.
+        
+        Uses the API's candidate_count, so N samples of the same prompt cost
+        one request against the RPM budget instead of N.
+        
+        Args:
+            prompt: The formatted prompt
+            model_name: Name of the model to use
+            candidate_count: Number of candidates to request (max 8)
+            temperature: Temperature parameter for generation
+            top_p: Top-p parameter for generation
+            top_k: Top-k parameter for generation
+            max_output_tokens: Maximum output tokens per candidate
+            run_numbers: Run numbers the candidates stand for (part of the cache key)
+            validate: Optional check applied to every candidate; responses are
+                only cached when all candidates pass
+            system_instruction: Static system instruction (see generate_content)
+            context_cache: Registered context cache (see generate_content)
+            usage: Optional dict that receives token counts (see generate_content)
+            response_schema: Optional response schema (see generate_content)
+            
+        Returns:
+            List of candidate texts (may be shorter than candidate_count if the
+            API returned fewer candidates)
+        """
+        generation_config = self._prepare_request(
+            model_name, temperature, top_p, top_k, max_output_tokens, candidate_count,
+            response_schema
+        )
+        cache_key = self._get_cache_key(
+            prompt, model_name, None, temperature=temperature, top_p=top_p, top_k=top_k,
+            max_output_tokens=max_output_tokens, candidate_count=candidate_count,
+            run_numbers=run_numbers, **self._prefix_params(system_instruction, context_cache),
+            **self._output_params(response_schema)
+        )
+        payload = self._generate_with_retries(
+            prompt, model_name, generation_config, cache_key,
+            self._validate_each(validate), self._candidate_payload,
+            system_instruction, context_cache, usage
         )
+        return json.loads(payload)
+    
+    async def generate_candidates_async(self, prompt: str, model_name: str, candidate_count: int,
+                                        temperature: float = 0.7, top_p: float = 0.8,
+                                        top_k: int = 40, max_output_tokens: int = 2048,
+                                        run_numbers: Optional[List[int]] = None,
+                                        validate: Optional[Callable[[str], Any]] = None,
+                                        system_instruction: Optional[str] = None,
+                                        context_cache: Optional[ContextCacheHandle] = None,
+                                        usage: Optional[Dict[str, Any]] = None,
+                                        response_schema: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Async variant of generate_candidates."""
+        generation_config = self._prepare_request(
+            model_name, temperature, top_p, top_k, max_output_tokens, candidate_count,
+            response_schema
+        )
+        cache_key = self._get_cache_key(
+            prompt, model_name, None, temperature=temperature, top_p=top_p, top_k=top_k,
+            max_output_tokens=max_output_tokens, candidate_count=candidate_count,
+            run_numbers=run_numbers, **self._prefix_params(system_instruction, context_cache),
+            **self._output_params(response_schema)
+        )
+        payload = await self._generate_with_retries_async(
+            prompt, model_name, generation_config, cache_key,
+            self._validate_each(validate), self._candidate_payload,
+            system_instruction, context_cache, usage
+        )
+        return json.loads(payload)
+    
+    def _generate_with_retries(self, prompt: str, model_name: str, generation_config: Any,
+                               cache_key: Optional[str], validate: Optional[Callable[[str], Any]],
+                               extract: Callable[[Any], str],
+                               system_instruction: Optional[str] = None,
+                               context_cache: Optional[ContextCacheHandle] = None,
+                               usage: Optional[Dict[str, Any]] = None,
+                               retry_invalid: bool = False) -> str:
+        """
+        Shared request loop: cache lookup, key selection, retries and caching.
+        
+        Args:
+            prompt: The formatted prompt
+            model_name: Name of the model to use
+            generation_config: SDK generation config
+            cache_key: Cache address of the request (None = no caching)
+            validate: Optional check a response must pass to be cached
+            extract: Turns an SDK response into the text to return
+            system_instruction: Optional static system instruction
+            context_cache: Optional registered context cache
+            usage: Optional dict that receives the call's token counts
+            retry_invalid: Retry responses that fail validate as malformed
+                instead of returning them uncached
+            
+        Returns:
+            Extracted response text
+        """
+        if cache_key is not None:
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                self._fill_usage(usage, None)
+                return cached_response
+        
+        tokens = estimate_tokens(prompt)
         
         for attempt in range(self.max_retries):
+            if usage is not None:
+                usage['retry_count'] = attempt
+            key = self.key_pool.acquire(model_name, tokens)
             try:
-                response = model.generate_content(prompt, generation_config=generation_config)
+                model = self._get_model(model_name, key, system_instruction, context_cache)
+                send_start = time.monotonic()
+                response = self._send(model, model_name, prompt, generation_config)
+                self._record_usage(key, model_name, response, tokens)
+                self._fill_usage(usage, response, time.monotonic() - send_start)
+                self.key_pool.report_success(key, model_name)
                 
-                if response.text:
-                    return response.text
-                else:
-                    raise ValueError("Empty response from API")
+                text = self._checked_text(extract(response), validate, retry_invalid)
+                self.retry_policy.record_success()
+                self._store_in_cache(cache_key, model_name, text, None if retry_invalid else validate)
+                return text
                     
             except Exception as e:
-                error_str = str(e)
-                print(f"API call attempt {attempt + 1} failed: {error_str[:100]}...")
+                delay = self._get_retry_delay(e, model_name, attempt, key)
+                if delay is None:
+                    # Out of attempts or not worth retrying, re-raise the exception
+                    raise
+                if delay > 0:
+                    time.sleep(delay)
+    
+    async def _generate_with_retries_async(self, prompt: str, model_name: str,
+                                           generation_config: Any, cache_key: Optional[str],
+                                           validate: Optional[Callable[[str], Any]],
+                                           extract: Callable[[Any], str],
+                                           system_instruction: Optional[str] = None,
+                                           context_cache: Optional[ContextCacheHandle] = None,
+                                           usage: Optional[Dict[str, Any]] = None,
+                                           retry_invalid: bool = False) -> str:
+        """Async variant of _generate_with_retries."""
+        if cache_key is not None:
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                self._fill_usage(usage, None)
+                return cached_response
+        
+        tokens = estimate_tokens(prompt)
+        
+        for attempt in range(self.max_retries):
+            if usage is not None:
+                usage['retry_count'] = attempt
+            key = await self.key_pool.acquire_async(model_name, tokens)
+            try:
+                send_start = time.monotonic()
+                response, key, hedged = await self._send_async(
+                    key, model_name, prompt, generation_config, tokens,
+                    system_instruction, context_cache
+                )
+                self._record_usage(key, model_name, response, tokens)
+                self._fill_usage(usage, response, time.monotonic() - send_start)
+                if usage is not None:
+                    usage['hedged'] = hedged
+                self.key_pool.report_success(key, model_name)
                 
-                # Handle rate limiting errors
-                if "ResourceExhausted" in error_str or "429" in error_str:
-                    # Check for suggested retry delay in error message
-                    retry_delay_match = re.search(r'retry_delay.*?seconds: (\d+)', error_str)
-                    if retry_delay_match:
-                        suggested_delay = int(retry_delay_match.group(1))
-                        print(f"  Rate limit hit, waiting {suggested_delay}s as suggested...")
-                        time.sleep(suggested_delay)
-                    else:
-                        # Use calculated rate limit delay
-                        rate_delay = self.get_rate_limit_delay(model_name)
-                        print(f"  Rate limit hit, waiting {rate_delay:.1f}s...")
-                        time.sleep(rate_delay)
-                elif attempt < self.max_retries - 1:
-                    # Exponential backoff for other errors
-                    time.sleep(DEFAULT_RETRY_DELAY * (attempt + 1))
-                else:
-                    # Last attempt failed, re-raise the exception
+                text = self._checked_text(extract(response), validate, retry_invalid)
+                self.retry_policy.record_success()
+                self._store_in_cache(cache_key, model_name, text, None if retry_invalid else validate)
+                return text
+                    
+            except Exception as e:
+                delay = self._get_retry_delay(e, model_name, attempt, key)
+                if delay is None:
                     raise
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _checked_text(text: str, validate: Optional[Callable[[str], Any]],
+                      retry_invalid: bool) -> str:
+        """
+        Reject empty responses, and when retry_invalid is set, responses
+        validate refuses, so the retry policy treats both as malformed.
+        """
+        if not text:
+            raise MalformedResponseError("Empty response from API")
+        if retry_invalid and validate is not None:
+            try:
+                validate(text)
+            except Exception as e:
+                raise MalformedResponseError(f"Response failed validation: {e}") from e
+        return text
+    
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Text of a single-candidate response."""
+        return response.text
+    
+    @staticmethod
+    def _candidate_payload(response: Any) -> str:
+        """
+        JSON-encoded list of candidate texts, or '' if no candidate has text.
+        
+        response.text only works for single-candidate responses, so the parts
+        of each candidate are joined directly.
+        """
+        texts = []
+        for candidate in getattr(response, 'candidates', None) or []:
+            content = getattr(candidate, 'content', None)
+            parts = getattr(content, 'parts', None) or []
+            text = "".join(getattr(part, 'text', '') for part in parts)
+            if text:
+                texts.append(text)
+        return json.dumps(texts, ensure_ascii=False) if texts else ""
+    
+    @staticmethod
+    def _validate_each(validate: Optional[Callable[[str], Any]]) -> Optional[Callable[[str], Any]]:
+        """Lift a per-text validator to a JSON-encoded list of candidate texts."""
+        if validate is None:
+            return None
+        
+        def validate_all(payload: str) -> None:
+            for text in json.loads(payload):
+                validate(text)
+        
+        return validate_all
+    
+    def _prepare_request(self, model_name: str, temperature: float, top_p: float,
+                         top_k: int, max_output_tokens: int, candidate_count: int = 1,
+                         response_schema: Optional[Dict[str, Any]] = None):
+        """Validate the model name and build the generation config."""
+        self.get_model_config(model_name)
+        
+        config_params = dict(
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            max_output_tokens=max_output_tokens,
+        )
+        if candidate_count > 1:
+            config_params['candidate_count'] = candidate_count
+        if response_schema is not None:
+            config_params['response_mime_type'] = 'application/json'
+            config_params['response_schema'] = response_schema
+        
+        if not self.uses_sdk:
+            # Other backends only read the attributes
+            return SimpleNamespace(**config_params)
+        return genai.types.GenerationConfig(**config_params)
+    
+    def _get_model(self, model_name: str, key: KeyState,
+                   system_instruction: Optional[str] = None,
+                   context_cache: Optional[ContextCacheHandle] = None) -> Any:
+        """Build a model bound to a specific pool key."""
+        if context_cache is not None:
+            # Context caches only exist for the SDK with a single key (see create_context_cache)
+            model = genai.GenerativeModel.from_cached_content(cached_content=context_cache.cached_content)
+        else:
+            model = self.backend.model(model_name, key.api_key, system_instruction)
+        if self.recorder is not None:
+            return self.recorder.wrap(model, model_name)
+        return model
+    
+    def create_context_cache(self, model_name: str, system_instruction: str,
+                             contents: Optional[List[str]] = None,
+                             ttl_minutes: int = DEFAULT_CONTEXT_CACHE_TTL_MINUTES,
+                             display_name: str = "acses-static-prefix") -> Optional[ContextCacheHandle]:
+        """
+        Register a static prompt prefix with the API's context cache.
+        
+        Requests made with the returned handle reference the prefix instead
+        of re-sending it. The API has a minimum cacheable size per model, and
+        a cache belongs to a single project, so this returns None (and the
+        caller should fall back to a plain system instruction) when the
+        prefix is too small, the model does not support caching, or several
+        API keys are pooled.
+        
+        Args:
+            model_name: Model the cache is created for
+            system_instruction: Static instructions to cache
+            contents: Optional extra reference text (e.g. the codebook hierarchy)
+            ttl_minutes: How long the API keeps the cache
+            display_name: Label shown in the API console
+            
+        Returns:
+            Handle to pass as context_cache, or None if caching is unavailable
+        """
+        if not self.uses_sdk:
+            print(f"⚠️  The {self.backend.name} backend has no context cache")
+            return None
+        if len(self.api_keys) > 1:
+            print("⚠️  Context caching is bound to one project; not used with a multi-key pool")
+            return None
+        
+        fingerprint = hashlib.sha256(
+            "\n".join([model_name, system_instruction] + list(contents or [])).encode('utf-8')
+        ).hexdigest()
+        
+        try:
+            cached_content = genai.caching.CachedContent.create(
+                model=model_name,
+                display_name=display_name,
+                system_instruction=system_instruction,
+                contents=list(contents or []) or None,
+                ttl=timedelta(minutes=ttl_minutes),
+            )
+        except Exception as e:
+            print(f"⚠️  Could not create context cache ({type(e).__name__}): {str(e)[:100]}")
+            return None
+        
+        print(f"✅ Registered context cache {cached_content.name} (TTL {ttl_minutes} min)")
+        return ContextCacheHandle(cached_content.name, model_name, fingerprint, cached_content)
+    
+    @staticmethod
+    def delete_context_cache(handle: ContextCacheHandle) -> None:
+        """Delete a context cache so it stops accruing storage cost."""
+        try:
+            handle.cached_content.delete()
+        except Exception as e:
+            print(f"⚠️  Could not delete context cache {handle.name}: {str(e)[:100]}")
+    
+    @staticmethod
+    def _prefix_params(system_instruction: Optional[str],
+                       context_cache: Optional[ContextCacheHandle]) -> Dict[str, str]:
+        """Cache-key entries describing the static prefix of a request."""
+        params = {}
+        if system_instruction:
+            params['system_instruction'] = hashlib.sha256(system_instruction.encode('utf-8')).hexdigest()
+        if context_cache is not None:
+            params['context_cache'] = context_cache.fingerprint
+        return params
+    
+    @staticmethod
+    def _output_params(response_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Cache-key entries describing the requested output format."""
+        if response_schema is None:
+            return {}
+        return {'response_schema': response_schema}
+    
+    def _get_cache_key(self, prompt: str, model_name: str, run_number: Optional[int],
+                       **generation_params: Any) -> Optional[str]:
+        """Content address of a request, or None when caching is disabled."""
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(prompt, model_name, run_number, **generation_params)
+    
+    def _store_in_cache(self, cache_key: Optional[str], model_name: str, text: str,
+                        validate: Optional[Callable[[str], Any]]) -> None:
+        """Cache a response unless caching is off or the response fails validation."""
+        if cache_key is None:
+            return
+        if validate is not None:
+            try:
+                validate(text)
+            except Exception:
+                # Unusable responses are not cached so a rerun asks again
+                return
+        self.cache.put(cache_key, model_name, text)
+    
+    def _send(self, model: Any, model_name: str, prompt: str, generation_config: Any) -> Any:
+        """Make one blocking call, bounded by request_timeout when set."""
+        if self.request_timeout is None:
+            start_time = time.monotonic()
+            response = model.generate_content(prompt, generation_config=generation_config)
+            self.latency.record(model_name, time.monotonic() - start_time)
+            return response
+        
+        start_time = time.monotonic()
+        try:
+            # The SDK turns the timeout into a gRPC deadline, which also
+            # cancels the call on the server side
+            response = model.generate_content(
+                prompt, generation_config=generation_config,
+                request_options={'timeout': self.request_timeout}
+            )
+        except Exception as e:
+            if self._is_timeout(e):
+                self.request_stats['timeouts'] += 1
+            raise
+        self.latency.record(model_name, time.monotonic() - start_time)
+        return response
+    
+    async def _send_async(self, key: KeyState, model_name: str, prompt: str,
+                          generation_config: Any, tokens: int,
+                          system_instruction: Optional[str] = None,
+                          context_cache: Optional[ContextCacheHandle] = None):
+        """
+        Make one async call with a deadline and optional hedging.
+        
+        When hedging is on and the call is still running after the model's
+        observed p95 latency, a duplicate is sent with any key that has spare
+        budget right now. The first successful response wins and the other
+        request is cancelled.
+        
+        Args:
+            key: The pool key already charged for the call
+            model_name: The model to call
+            prompt: The prompt to send
+            generation_config: Generation settings
+            tokens: Estimated tokens, charged to the hedge's key
+            system_instruction: Optional static system instruction
+            context_cache: Optional context cache holding the static prefix
+            
+        Returns:
+            (response, key that served it, whether a hedge was sent)
+            
+        Raises:
+            TimeoutError: If no response arrived before request_timeout
+        """
+        start_time = time.monotonic()
+        hedge_at = self.latency.percentile(model_name, HEDGE_PERCENTILE) if self.hedge else None
+        hedged = False
+        error: Optional[BaseException] = None
+        
+        def launch(call_key: KeyState) -> asyncio.Future:
+            model = self._get_model(model_name, call_key, system_instruction, context_cache)
+            return asyncio.ensure_future(
+                model.generate_content_async(prompt, generation_config=generation_config)
+            )
+        
+        primary = launch(key)
+        in_flight = {primary: (key, start_time)}
+        try:
+            while in_flight:
+                elapsed = time.monotonic() - start_time
+                deadlines = [limit - elapsed for limit in (self.request_timeout, hedge_at) if limit is not None]
+                wait_time = max(0.0, min(deadlines)) if deadlines else None
+                done, _ = await asyncio.wait(
+                    set(in_flight), timeout=wait_time, return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for task in done:
+                    task_key, task_start = in_flight.pop(task)
+                    if task.exception() is None:
+                        self.latency.record(model_name, time.monotonic() - task_start)
+                        if task is not primary:
+                            self.request_stats['hedges_won'] += 1
+                        return task.result(), task_key, hedged
+                    error = task.exception()
+                if done:
+                    continue
+                
+                elapsed = time.monotonic() - start_time
+                if self.request_timeout is not None and elapsed >= self.request_timeout:
+                    self.request_stats['timeouts'] += 1
+                    raise TimeoutError(f"API call exceeded the {self.request_timeout:g}s request timeout")
+                if hedge_at is not None and elapsed >= hedge_at:
+                    hedge_at = None  # At most one hedge per call
+                    hedge_key = self.key_pool.try_acquire(model_name, tokens)
+                    if hedge_key is not None:
+                        hedged = True
+                        self.request_stats['hedges_fired'] += 1
+                        in_flight[launch(hedge_key)] = (hedge_key, time.monotonic())
+            
+            raise error
+        finally:
+            # Losers and timed-out calls are cancelled, not left running
+            for task in in_flight:
+                task.cancel()
+                self.request_stats['cancelled'] += 1
+    
+    @staticmethod
+    def _is_timeout(error: Exception) -> bool:
+        """Whether an exception is a client or server deadline."""
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            return True
+        return any(marker in str(error) for marker in ('504', 'Deadline Exceeded', 'DeadlineExceeded'))
+    
+    def _record_usage(self, key: KeyState, model_name: str, response: Any,
+                      estimated_tokens: int) -> None:
+        """Replace the pre-call token estimate with the usage the API reported."""
+        usage = getattr(response, 'usage_metadata', None)
+        total_tokens = getattr(usage, 'total_token_count', 0) or 0
+        if total_tokens:
+            self.key_pool.record_usage(key, model_name, total_tokens - estimated_tokens)
+    
+    @staticmethod
+    def _fill_usage(usage: Optional[Dict[str, Any]], response: Any, latency: float = 0.0) -> None:
+        """
+        Copy the token counts of a response into the caller's usage dict.
+        
+        A None response stands for a cache hit, which uses no tokens.
+        `latency` is the time from sending the call to its response, without
+        the wait for rate-limit budget.
+        """
+        if usage is None:
+            return
+        metadata = getattr(response, 'usage_metadata', None)
+        usage['prompt_tokens'] = getattr(metadata, 'prompt_token_count', 0) or 0
+        usage['output_tokens'] = getattr(metadata, 'candidates_token_count', 0) or 0
+        usage['total_tokens'] = getattr(metadata, 'total_token_count', 0) or 0
+        usage['cache_hit'] = response is None
+        usage['api_latency_seconds'] = latency
+    
+    def count_tokens(self, prompt: str, model_name: str,
+                     system_instruction: Optional[str] = None) -> int:
+        """
+        Count the input tokens of a prompt with the API's tokenizer.
+        
+        Token counting has its own (much larger) quota, so it bypasses the
+        key pool's generation limits.
+        
+        Args:
+            prompt: The formatted prompt
+            model_name: Name of the model whose tokenizer to use
+            system_instruction: Optional static system instruction
+            
+        Returns:
+            Number of input tokens
+        """
+        self.get_model_config(model_name)
+        model = self._get_model(model_name, self.key_pool.keys[0], system_instruction)
+        return model.count_tokens(prompt).total_tokens
+    
+    def _get_retry_delay(self, error: Exception, model_name: str, attempt: int,
+                         key: KeyState) -> Optional[float]:
+        """
+        Decide how long to wait before retrying a failed API call.
+        
+        The retry policy classifies the error: safety blocks and invalid
+        requests fail immediately, other errors back off with full jitter
+        and draw from the policy's retry budget.
+        
+        Args:
+            error: The exception raised by the API call
+            model_name: The model being used
+            attempt: Zero-based attempt number that just failed
+            key: The pool key the call was sent with
+            
+        Returns:
+            Delay in seconds (0.0 when the key pool enforces the wait),
+            or None if the error should be re-raised
+        """
+        error_str = str(error)
+        category = self.retry_policy.classify(error)
+        print(f"API call attempt {attempt + 1} failed ({category.value}): {error_str[:100]}...")
+        
+        # Handle rate limiting errors by quarantining the key, so every caller
+        # backs off from it while other keys in the pool keep serving. This
+        # also feeds the adaptive controller, even on the last attempt.
+        if category is ErrorCategory.DAILY_QUOTA:
+            # Retrying today is pointless; let the pool fail over to another key
+            print(f"  Daily quota exhausted on {key.label} for {model_name}, taking it out of rotation...")
+            self.key_pool.mark_daily_exhausted(key, model_name)
+        elif category is ErrorCategory.RATE_LIMIT:
+            # Check for suggested retry delay in error message
+            retry_delay_match = re.search(r'retry_delay.*?seconds: (\d+)', error_str)
+            if retry_delay_match:
+                suggested_delay = int(retry_delay_match.group(1))
+                print(f"  Rate limit hit on {key.label}, pausing it {suggested_delay}s as suggested...")
+            else:
+                # Use calculated rate limit delay
+                suggested_delay = self.get_rate_limit_delay(model_name)
+                print(f"  Rate limit hit on {key.label}, pausing it {suggested_delay:.1f}s...")
+            self.key_pool.report_rate_limited(key, model_name, suggested_delay)
+        
+        if attempt >= self.max_retries - 1:
+            # Out of attempts - let the caller see the real error
+            return None
+        
+        delay = self.retry_policy.next_delay(category, attempt)
+        if delay is None and self.retry_policy.rule(category).retryable:
+            print(f"  Retry budget exhausted, not retrying")
+        return delay
     
     def test_connection(self, model_name: str = "models/gemini-2.5-flash-lite") -> bool:
         """
@@ -167,8 +1015,9 @@ def configure_gemini_api() -> GeminiClient:
     return GeminiClient()
 
 def get_rate_limit_delay(model_name: str) -> float:
-    """Get rate limit delay for a model."""
-    return GeminiClient.get_rate_limit_delay(model_name)
+    """Get rate limit delay for a model from its published limits."""
+    limits = AVAILABLE_MODELS.get(model_name) or AVAILABLE_MODELS.get(f"models/{model_name}", {})
+    return GeminiClient.rate_limit_delay(limits)
 
 def list_available_models() -> None:
     """List available models."""
@@ -0,0 +1,466 @@
+"""
+API Key Pool
+Spreads requests over several Gemini API keys with per-key quota accounting.
+"""
+
+import os
+import re
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from datetime import date, datetime, timezone, timedelta
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from .rate_limiter import RateLimiter
+from .adaptive_rate import AIMDController, RateLimitRegistry, MAX_RATE_FACTOR
+
+if TYPE_CHECKING:
+    from .shared_rate_state import SharedRateState
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # google-api-core ships with google-generativeai
+    google_exceptions = None
+
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1_000_000
+DEFAULT_RPD = 1_500
+CHARS_PER_TOKEN = 4  # Rough heuristic used until real usage metadata arrives
+HTTP_TOO_MANY_REQUESTS = 429
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised when no API key in the pool has quota left for a model."""
+
+    def __init__(self, message: str, model_name: Optional[str] = None):
+        super().__init__(message)
+        self.model_name = model_name
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for quota accounting before a call is sent."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def quota_day() -> date:
+    """
+    Current day in the quota's timezone.
+
+    Gemini daily quotas reset at midnight Pacific time.
+    """
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo("America/Los_Angeles")).date()
+    except Exception:
+        return (datetime.now(timezone.utc) - timedelta(hours=8)).date()
+
+
+def seconds_until_quota_reset() -> float:
+    """Seconds until the daily quota resets (next midnight Pacific time)."""
+    try:
+        from zoneinfo import ZoneInfo
+        now = datetime.now(ZoneInfo("America/Los_Angeles"))
+    except Exception:
+        now = datetime.now(timezone.utc) - timedelta(hours=8)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Whether an exception is a 429 from the API.
+
+    Decided by the exception type (ResourceExhausted / TooManyRequests) or an
+    HTTP status `code` of 429, never by the message: parse errors quote the
+    model's response, which may well contain "429" or "quota".
+    """
+    if google_exceptions is not None and isinstance(
+            error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+        return True
+    try:
+        return int(getattr(error, 'code', None)) == HTTP_TOO_MANY_REQUESTS
+    except (TypeError, ValueError):  # No code, or a gRPC-style code() method
+        return False
+
+
+def classify_quota_error(error: BaseException) -> Optional[str]:
+    """
+    Tell minute-level rate limiting apart from an exhausted daily quota.
+
+    Gemini reports both as 429 / ResourceExhausted; once the error is known
+    to be one, the violated quota id names the window (e.g.
+    GenerateRequestsPerDayPerProjectPerModel).
+
+    Returns:
+        'daily', 'minute', or None if the error is not quota related
+    """
+    if isinstance(error, QuotaExhaustedError):
+        return 'daily'
+    if not is_rate_limit_error(error):
+        return None
+    if re.search(r'per ?day', str(error), re.IGNORECASE):
+        return 'daily'
+    return 'minute'
+
+
+def parse_api_keys(value: str) -> List[str]:
+    """Split a comma, semicolon or whitespace separated list of keys."""
+    return [key for key in re.split(r'[,;\s]+', value or '') if key]
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Short, non-reversible identifier for a key (safe to log or persist)."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+class KeyState:
+    """Usage and quarantine state of a single API key."""
+
+    def __init__(self, api_key: str, index: int):
+        self.api_key = api_key
+        self.index = index
+        self.fingerprint = key_fingerprint(api_key)
+        self.label = f"key-{index + 1} (...{api_key[-4:]})"
+        self.quarantined_until = 0.0
+        self.limiters: Dict[str, RateLimiter] = {}
+        self.controllers: Dict[str, AIMDController] = {}
+        self.token_windows: Dict[str, Deque[Tuple[float, int]]] = {}
+        self.daily_requests: Dict[str, int] = {}
+        self.day = quota_day()
+        self.total_requests = 0
+        self.total_tokens = 0
+
+    def quarantine_remaining(self, now: float) -> float:
+        """Seconds until the key may be used again."""
+        return max(0.0, self.quarantined_until - now)
+
+    def tokens_in_window(self, model_name: str, now: float) -> int:
+        """Tokens charged to this key and model during the last minute."""
+        window = self.token_windows.setdefault(model_name, deque())
+        while window and now - window[0][0] >= 60.0:
+            window.popleft()
+        return sum(tokens for _, tokens in window)
+
+    def reset_day_if_needed(self) -> None:
+        """Clear daily counters once the quota day rolls over."""
+        today = quota_day()
+        if today != self.day:
+            self.day = today
+            self.daily_requests.clear()
+
+
+class APIKeyPool:
+    """
+    Routes each request to the API key with the most headroom.
+
+    Every key keeps its own RPM limiter, a one-minute token window for TPM
+    and a daily request counter per model. A key that hits a 429 is
+    quarantined until its suggested retry delay has passed.
+
+    In adaptive mode each limiter is driven by an AIMD controller instead of
+    the published RPM, starting from the rate learned in earlier runs.
+
+    With a SharedRateState the buckets, token windows, daily counters and
+    quarantines live in a database every process on the host consults, so
+    several runners on the same key share its budget. The local limiters
+    then only supply the rate (published or learned) to pace to.
+    """
+
+    def __init__(self, api_keys: List[str], model_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+                 rate_buffer: float = 1.0, adaptive: bool = False,
+                 registry: Optional[RateLimitRegistry] = None,
+                 shared_state: Optional["SharedRateState"] = None):
+        """
+        Initialize the key pool.
+
+        Args:
+            api_keys: API keys to spread requests over
+            model_limits: Per-model limits with 'rpm', 'tpm' and 'rpd' entries
+            rate_buffer: Safety factor applied to the RPM limit (1.1 = 10% headroom)
+            adaptive: Learn each key's sustainable rate from 429s (AIMD)
+            registry: Where learned rates are loaded from and saved to
+            shared_state: Rate-limit state shared with other processes
+                (None = this pool paces itself alone)
+        """
+        unique_keys = list(dict.fromkeys(api_keys))
+        if not unique_keys:
+            raise ValueError("At least one API key is required")
+
+        self.keys = [KeyState(key, i) for i, key in enumerate(unique_keys)]
+        self.model_limits = model_limits or {}
+        self.rate_buffer = rate_buffer
+        self.adaptive = adaptive
+        self.registry = registry
+        self.shared_state = shared_state
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "APIKeyPool":
+        """Build a pool from GEMINI_API_KEYS, falling back to GEMINI_API_KEY."""
+        keys = parse_api_keys(os.getenv('GEMINI_API_KEYS', ''))
+        if not keys and os.getenv('GEMINI_API_KEY'):
+            keys = [os.getenv('GEMINI_API_KEY')]
+        return cls(keys, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _limit(self, model_name: str, name: str, default: int) -> int:
+        return self.model_limits.get(model_name, {}).get(name, default)
+
+    def get_key(self, api_key: str) -> KeyState:
+        """Look up the state object of a key."""
+        for key in self.keys:
+            if key.api_key == api_key:
+                return key
+        raise KeyError("API key is not part of this pool")
+
+    def get_limiter(self, key: KeyState, model_name: str) -> RateLimiter:
+        """Get the RPM limiter of a key for a model, creating it on first use."""
+        with self._lock:
+            return self._get_limiter_locked(key, model_name)
+
+    def set_limiter(self, key: KeyState, model_name: str, limiter: RateLimiter) -> None:
+        """Use an existing limiter for a key and model (e.g. shared between models)."""
+        with self._lock:
+            key.limiters[model_name] = limiter
+
+    def _get_limiter_locked(self, key: KeyState, model_name: str) -> RateLimiter:
+        limiter = key.limiters.get(model_name)
+        if limiter is None:
+            rpm = self._limit(model_name, 'rpm', DEFAULT_RPM)
+            start_rpm = rpm / self.rate_buffer
+            if self.adaptive and self.registry is not None:
+                start_rpm = self.registry.get(model_name, key.fingerprint) or start_rpm
+            limiter = RateLimiter(start_rpm)
+            key.limiters[model_name] = limiter
+            if self.adaptive:
+                key.controllers[model_name] = AIMDController(limiter, max_rpm=rpm * MAX_RATE_FACTOR)
+        return limiter
+
+    def _tpm_wait(self, key: KeyState, model_name: str, tokens: int, now: float) -> float:
+        """Seconds until `tokens` more fit into the key's TPM window."""
+        tpm = self._limit(model_name, 'tpm', DEFAULT_TPM)
+        used = key.tokens_in_window(model_name, now)
+        if used + tokens <= tpm or used == 0:
+            return 0.0
+
+        # Wait until enough old entries leave the window
+        excess = used + tokens - tpm
+        for timestamp, charged in key.token_windows[model_name]:
+            excess -= charged
+            if excess <= 0:
+                return max(0.0, 60.0 - (now - timestamp))
+        return 60.0
+
+    def _reserve(self, model_name: str, tokens: int) -> Tuple[Optional[KeyState], float]:
+        """
+        Pick the key with the most headroom and charge it if it is ready.
+
+        Returns:
+            (key, 0.0) when a key was charged, otherwise (None, seconds to wait)
+        """
+        rpd = self._limit(model_name, 'rpd', DEFAULT_RPD)
+        tpm = self._limit(model_name, 'tpm', DEFAULT_TPM)
+
+        with self._lock:
+            now = time.monotonic()
+            best_key, best_score = None, None
+
+            for key in self.keys:
+                key.reset_day_if_needed()
+                limiter = self._get_limiter_locked(key, model_name)
+                if self.shared_state is not None:
+                    wait, used_today = self.shared_state.headroom(
+                        key.fingerprint, model_name, limiter.requests_per_minute, tpm,
+                        tokens, limiter.burst
+                    )
+                else:
+                    used_today = key.daily_requests.get(model_name, 0)
+                    wait = max(
+                        key.quarantine_remaining(now),
+                        limiter.time_until_available(),
+                        self._tpm_wait(key, model_name, tokens, now),
+                    )
+                if used_today >= rpd:
+                    continue
+
+                # Soonest available first, then the most daily budget left
+                score = (wait, used_today / rpd)
+                if best_score is None or score < best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                raise QuotaExhaustedError(
+                    f"Daily quota exhausted for {model_name} on all {len(self.keys)} API key(s)",
+                    model_name
+                )
+
+            wait = best_score[0]
+            limiter = self._get_limiter_locked(best_key, model_name)
+            if wait > 0:
+                return None, max(wait, 0.05)
+            if self.shared_state is not None:
+                # Another process may have taken the budget since headroom() looked
+                wait = self.shared_state.try_reserve(
+                    best_key.fingerprint, model_name, limiter.requests_per_minute, tpm, rpd,
+                    tokens, limiter.burst
+                )
+                if wait > 0:
+                    return None, min(max(wait, 0.05), 1.0)
+            elif not limiter.try_acquire():
+                return None, 0.05
+
+            best_key.token_windows.setdefault(model_name, deque()).append((now, tokens))
+            best_key.daily_requests[model_name] = best_key.daily_requests.get(model_name, 0) + 1
+            best_key.total_requests += 1
+            best_key.total_tokens += tokens
+            return best_key, 0.0
+
+    def acquire(self, model_name: str, tokens: int = 0) -> KeyState:
+        """
+        Block until some key has budget for a request, then charge it.
+
+        Args:
+            model_name: The model being called
+            tokens: Estimated tokens of the request
+
+        Returns:
+            The key to send the request with
+
+        Raises:
+            QuotaExhaustedError: If every key has used up its daily quota
+        """
+        while True:
+            key, wait = self._reserve(model_name, tokens)
+            if key is not None:
+                return key
+            time.sleep(wait)
+
+    async def acquire_async(self, model_name: str, tokens: int = 0) -> KeyState:
+        """Async variant of acquire that does not block the event loop."""
+        while True:
+            key, wait = self._reserve(model_name, tokens)
+            if key is not None:
+                return key
+            await asyncio.sleep(wait)
+
+    def try_acquire(self, model_name: str, tokens: int = 0) -> Optional[KeyState]:
+        """
+        Charge a key only if one has budget right now (never waits).
+
+        Used for optional extra requests, such as hedges, that must not eat
+        into budget the regular traffic is waiting for.
+
+        Returns:
+            The key to send the request with, or None if no budget is free
+        """
+        try:
+            key, _ = self._reserve(model_name, tokens)
+        except QuotaExhaustedError:
+            return None
+        return key
+
+    def record_usage(self, key: KeyState, model_name: str, tokens: int) -> None:
+        """
+        Correct a key's TPM window with the tokens reported by the API.
+
+        Args:
+            key: The key the request was sent with
+            model_name: The model that was called
+            tokens: Additional tokens beyond the estimate charged at acquire time
+        """
+        if tokens == 0:
+            return
+        with self._lock:
+            key.token_windows.setdefault(model_name, deque()).append((time.monotonic(), tokens))
+            key.total_tokens += tokens
+            if self.shared_state is not None:
+                self.shared_state.record_tokens(key.fingerprint, model_name, tokens)
+
+    def report_success(self, key: KeyState, model_name: str) -> None:
+        """Let the key's adaptive controller raise its rate after a successful call."""
+        controller = key.controllers.get(model_name)
+        if controller is not None:
+            controller.on_success()
+
+    def report_rate_limited(self, key: KeyState, model_name: str, retry_delay: float) -> None:
+        """
+        Handle a 429: quarantine the key and, in adaptive mode, cut its rate.
+
+        Args:
+            key: The key that was rate limited
+            model_name: The model that was called
+            retry_delay: Seconds the API asked us to wait
+        """
+        self.quarantine(key, retry_delay)
+        controller = key.controllers.get(model_name)
+        if controller is not None and controller.on_rate_limited(retry_delay):
+            print(f"  📉 {key.label}: {model_name} rate cut to {controller.rpm:.1f} RPM")
+            if self.registry is not None:
+                self.registry.set(model_name, key.fingerprint, controller.rpm,
+                                  rate_limited_at=controller.last_rate_limited_rpm)
+                self.registry.save()
+
+    def mark_daily_exhausted(self, key: KeyState, model_name: str) -> None:
+        """Take a key out of rotation for a model until the quota day rolls over."""
+        rpd = self._limit(model_name, 'rpd', DEFAULT_RPD)
+        with self._lock:
+            key.reset_day_if_needed()
+            key.daily_requests[model_name] = max(key.daily_requests.get(model_name, 0), rpd)
+            if self.shared_state is not None:
+                self.shared_state.mark_daily_exhausted(key.fingerprint, model_name, rpd)
+
+    def has_daily_quota(self, model_name: str) -> bool:
+        """Whether any key still has daily requests left for a model."""
+        rpd = self._limit(model_name, 'rpd', DEFAULT_RPD)
+        with self._lock:
+            for key in self.keys:
+                key.reset_day_if_needed()
+                if self.shared_state is not None:
+                    used_today = self.shared_state.requests_today(key.fingerprint, model_name)
+                else:
+                    used_today = key.daily_requests.get(model_name, 0)
+                if used_today < rpd:
+                    return True
+        return False
+
+    def save_learned_rates(self) -> None:
+        """Persist the current rate of every adaptive limiter to the registry."""
+        if self.registry is None:
+            return
+        with self._lock:
+            for key in self.keys:
+                for model_name, controller in key.controllers.items():
+                    self.registry.set(model_name, key.fingerprint, controller.rpm,
+                                      rate_limited_at=controller.last_rate_limited_rpm)
+        self.registry.save()
+
+    def quarantine(self, key: KeyState, seconds: float) -> None:
+        """Take a key out of rotation for the given number of seconds."""
+        with self._lock:
+            key.quarantined_until = max(key.quarantined_until, time.monotonic() + seconds)
+            if self.shared_state is not None:
+                self.shared_state.quarantine(key.fingerprint, seconds)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Usage summary for every key (keys themselves are not included)."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    'key': key.label,
+                    'fingerprint': key.fingerprint,
+                    'total_requests': key.total_requests,
+                    'total_tokens': key.total_tokens,
+                    'requests_today': dict(key.daily_requests),
+                    'quarantined_seconds': round(key.quarantine_remaining(now), 1),
+                    'learned_rpm': {
+                        model_name: round(controller.rpm, 2)
+                        for model_name, controller in key.controllers.items()
+                    },
+                }
+                for key in self.keys
+            ]
@@ -0,0 +1,57 @@
+"""
+Latency Tracker
+Rolling per-model latency percentiles used to decide when to hedge a request.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+DEFAULT_WINDOW = 200  # Most recent successful calls kept per model
+DEFAULT_MIN_SAMPLES = 20  # Percentiles are not trusted before this many calls
+
+
+class LatencyTracker:
+    """Keeps the latencies of recent successful calls for each model."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, min_samples: int = DEFAULT_MIN_SAMPLES):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Number of recent latencies kept per model
+            min_samples: Minimum observations before percentile() answers
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, seconds: float) -> None:
+        """Add the latency of a successful call."""
+        with self._lock:
+            self._latencies.setdefault(model_name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model_name: str, q: float) -> Optional[float]:
+        """
+        Latency percentile of a model (nearest-rank).
+
+        Args:
+            model_name: The model
+            q: Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            Latency in seconds, or None with fewer than min_samples observations
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(model_name, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        rank = max(1, math.ceil(q * len(latencies)))
+        return latencies[rank - 1]
+
+    def count(self, model_name: str) -> int:
+        """Number of latencies currently kept for a model."""
+        with self._lock:
+            return len(self._latencies.get(model_name, ()))
@@ -0,0 +1,229 @@
+"""
+OpenAI-Compatible Backend
+Adapter for self-hosted servers speaking the OpenAI chat completions API
+(llama.cpp server, vLLM, ...), so bulk labelling runs without external quotas.
+"""
+
+import json
+import asyncio
+import functools
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .backend import TextCandidate, TextContent, TextPart, TextResponse, TokenCount, UsageMetadata
+from .key_pool import estimate_tokens
+
+DEFAULT_TIMEOUT = 300.0  # Local models on modest hardware can be slow
+DEFAULT_MAX_CONNECTIONS = 32
+UNLIMITED_RPM = 1_000_000  # Pace only by concurrency unless an RPM is given
+UNLIMITED_TPM = 1_000_000_000
+UNLIMITED_RPD = 1_000_000_000
+
+
+class EndpointError(RuntimeError):
+    """HTTP error from the endpoint; the message starts with the status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}")
+        self.code = status
+
+
+class OpenAICompatibleBackend:
+    """
+    LLMBackend for a local OpenAI-compatible HTTP server.
+
+    Requests go to `{base_url}/chat/completions`; the system instruction is
+    sent as a system message, candidate_count as `n` and a response schema
+    as a JSON schema `response_format`. Calls use the standard library's
+    urllib in a thread pool, so no extra dependency is needed.
+
+    Token counts come from the server's `/tokenize` endpoint (llama.cpp and
+    vLLM both have one), falling back to the offline estimate.
+    """
+
+    name = "OpenAI-compatible"
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 rpm: Optional[float] = None, tpm: Optional[int] = None,
+                 rpd: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """
+        Initialize the backend.
+
+        Args:
+            base_url: API root of the server, e.g. http://localhost:8000/v1
+            api_key: Bearer token if the server requires one
+            rpm: Requests per minute to pace to (None = unlimited)
+            tpm: Tokens per minute to pace to (None = unlimited)
+            rpd: Requests per day (None = unlimited)
+            timeout: Default per-request timeout in seconds
+            max_connections: Requests sent to the server at the same time
+        """
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_connections,
+                                           thread_name_prefix="openai-backend")
+
+    def limits(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Limits of a model; the server decides which models exist."""
+        return {
+            'rpm': self.rpm or UNLIMITED_RPM,
+            'tpm': self.tpm or UNLIMITED_TPM,
+            'rpd': self.rpd or UNLIMITED_RPD,
+            'input_price': 0.0,
+            'output_price': 0.0,
+            'description': f"{model_name} on {self.base_url}",
+        }
+
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        """Models listed by the server's /models endpoint (empty if unavailable)."""
+        try:
+            listing = self.request('GET', '/models', timeout=10.0)
+        except Exception as e:
+            print(f"⚠️  Could not list models on {self.base_url}: {e}")
+            return {}
+        return {entry['id']: self.limits(entry['id']) for entry in listing.get('data', []) if 'id' in entry}
+
+    def model(self, model_name: str, api_key: str = "",
+              system_instruction: Optional[str] = None) -> "OpenAICompatibleModel":
+        """Get a model; pool keys are ignored, the backend's own api_key is used."""
+        return OpenAICompatibleModel(self, model_name, system_instruction)
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None, root: bool = False) -> Dict[str, Any]:
+        """
+        Send one JSON request to the server.
+
+        Args:
+            method: HTTP method
+            path: Path below the API root
+            payload: JSON body
+            timeout: Timeout in seconds (default: the backend's timeout)
+            root: Resolve the path against the server root instead of base_url
+                (for non-OpenAI endpoints such as /tokenize)
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            EndpointError: On HTTP errors (429s read as rate limits)
+            ConnectionError: If the server cannot be reached
+        """
+        base = self.base_url[:-3] if root and self.base_url.endswith('/v1') else self.base_url
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+
+        http_request = urllib.request.Request(base + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(http_request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode('utf-8', errors='replace')[:500]
+            raise EndpointError(e.code, f"{e.reason}: {detail}") from None
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, TimeoutError):
+                raise TimeoutError(f"Request to {base + path} timed out") from None
+            raise ConnectionError(f"Cannot reach {base + path}: {e.reason}") from None
+
+
+class OpenAICompatibleModel:
+    """Drop-in for genai.GenerativeModel backed by an OpenAICompatibleBackend."""
+
+    def __init__(self, backend: OpenAICompatibleBackend, model_name: str,
+                 system_instruction: Optional[str] = None):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, prompt: str, generation_config: Any = None, **kwargs: Any) -> TextResponse:
+        timeout = (kwargs.get('request_options') or {}).get('timeout')
+        data = self.backend.request('POST', '/chat/completions',
+                                    self._payload(prompt, generation_config), timeout)
+        return self._to_response(data)
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None,
+                                     **kwargs: Any) -> TextResponse:
+        # Cancelling the awaiting task abandons the call; the timeout bounds the thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.backend.executor,
+            functools.partial(self.generate_content, prompt, generation_config, **kwargs)
+        )
+
+    def count_tokens(self, prompt: str) -> TokenCount:
+        text = f"{self.system_instruction}\n\n{prompt}" if self.system_instruction else prompt
+        try:
+            # llama.cpp reads 'content', vLLM reads 'model' and 'prompt'
+            data = self.backend.request('POST', '/tokenize', {
+                'model': self.model_name, 'prompt': text, 'content': text,
+            }, root=True)
+            count = data.get('count', len(data.get('tokens', [])))
+        except Exception:
+            count = estimate_tokens(text)
+        return TokenCount(count)
+
+    def _payload(self, prompt: str, generation_config: Any) -> Dict[str, Any]:
+        """Chat completion request equivalent to a Gemini generate call."""
+        messages = []
+        if self.system_instruction:
+            messages.append({'role': 'system', 'content': self.system_instruction})
+        messages.append({'role': 'user', 'content': prompt})
+
+        payload: Dict[str, Any] = {'model': self.model_name, 'messages': messages}
+        for attribute, field in (('temperature', 'temperature'), ('top_p', 'top_p'),
+                                 ('top_k', 'top_k'), ('max_output_tokens', 'max_tokens'),
+                                 ('candidate_count', 'n')):
+            value = getattr(generation_config, attribute, None)
+            if value is not None:
+                payload[field] = value
+
+        schema = getattr(generation_config, 'response_schema', None)
+        if schema is not None:
+            payload['response_format'] = {
+                'type': 'json_schema',
+                'json_schema': {'name': 'response', 'schema': to_json_schema(schema)},
+            }
+        return payload
+
+    @staticmethod
+    def _to_response(data: Dict[str, Any]) -> TextResponse:
+        """Chat completion response in the shape GeminiClient reads."""
+        candidates: List[TextCandidate] = []
+        for choice in data.get('choices') or []:
+            text = (choice.get('message') or {}).get('content') or ""
+            candidates.append(TextCandidate(
+                TextContent([TextPart(text)] if text else []),
+                finish_reason=str(choice.get('finish_reason') or "STOP").upper(),
+            ))
+
+        usage = data.get('usage') or {}
+        prompt_tokens = usage.get('prompt_tokens', 0) or 0
+        output_tokens = usage.get('completion_tokens', 0) or 0
+        return TextResponse(
+            candidates,
+            UsageMetadata(prompt_tokens, output_tokens,
+                          usage.get('total_tokens') or prompt_tokens + output_tokens),
+        )
+
+
+def to_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Gemini response schema (upper-case types) to JSON Schema."""
+    converted: Dict[str, Any] = {}
+    for key, value in schema.items():
+        if key == 'type' and isinstance(value, str):
+            converted[key] = value.lower()
+        elif key == 'properties':
+            converted[key] = {name: to_json_schema(prop) for name, prop in value.items()}
+        elif key == 'items':
+            converted[key] = to_json_schema(value)
+        else:
+            converted[key] = value
+    return converted
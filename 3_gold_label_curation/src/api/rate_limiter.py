@@ -0,0 +1,140 @@
+"""
+Token Bucket Rate Limiter
+Admits API requests as soon as the per-minute budget allows it.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every caller of a model.
+
+    Tokens refill continuously at `requests_per_minute / 60` per second up to
+    `burst`. A request takes one token at the moment it is admitted, i.e. right
+    before it is sent, so time spent waiting on the network already counts
+    towards the next slot. The same instance can be used from threads,
+    coroutines and for several models at once.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Sustained request budget
+            burst: Maximum number of requests admitted back-to-back
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+
+        self.requests_per_minute = float(requests_per_minute)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate_per_second(self) -> float:
+        """Token refill rate in requests per second."""
+        return self.requests_per_minute / 60.0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update (lock must be held)."""
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+            self._updated_at = now
+
+    def _take(self) -> float:
+        """
+        Try to take a token.
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+
+            return (1.0 - self._tokens) / self.rate_per_second
+
+    def try_acquire(self) -> bool:
+        """Take a token without waiting. Returns True if one was available."""
+        return self._take() == 0.0
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def set_rate(self, requests_per_minute: float) -> None:
+        """Change the sustained request budget, keeping the tokens already earned."""
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.requests_per_minute = float(requests_per_minute)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop admitting requests for the given time, e.g. after a 429.
+
+        The bucket is also drained so requests resume at the sustained rate
+        instead of bursting when the pause ends.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated_at = max(self._updated_at, self._paused_until)
+
+    def time_until_available(self) -> float:
+        """Seconds until the next token is available (0.0 if one is ready now)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._paused_until - now)
+            if self._tokens < 1.0:
+                wait = max(wait, (1.0 - self._tokens) / self.rate_per_second)
+            return wait
+
+    def __repr__(self) -> str:
+        return f"RateLimiter(requests_per_minute={self.requests_per_minute:g}, burst={self.burst})"
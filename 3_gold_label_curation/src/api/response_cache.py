@@ -0,0 +1,209 @@
+"""
+Persistent LLM Response Cache
+Content-addressed SQLite cache so reruns never pay twice for the same call.
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_SIZE_MB = 512
+EVICTION_INTERVAL = 500  # Check eviction limits every N writes
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw model responses keyed by a hash of the request.
+
+    The key covers everything that determines the output: final prompt,
+    model, generation parameters and run number. Entries older than
+    `max_age_days` are dropped, and the least recently used entries are
+    evicted once the stored responses exceed `max_size_mb`. The database
+    runs in WAL mode so several readers can use it while one process writes.
+    """
+
+    def __init__(self, path: str, max_age_days: Optional[float] = DEFAULT_MAX_AGE_DAYS,
+                 max_size_mb: Optional[float] = DEFAULT_MAX_SIZE_MB):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path to the SQLite file
+            max_age_days: Drop entries older than this (None = keep forever)
+            max_size_mb: Evict least recently used entries above this size (None = unbounded)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(prompt: str, model_name: str, run_number: Optional[int] = None,
+                 **generation_params: Any) -> str:
+        """
+        Build the content address of a request.
+
+        Args:
+            prompt: The final prompt sent to the model
+            model_name: Name of the model
+            run_number: Run number, so repeated runs stay independent samples
+            **generation_params: Temperature and the rest of the generation config
+
+        Returns:
+            SHA-256 hex digest identifying the request
+        """
+        payload = json.dumps(
+            {
+                'prompt': prompt,
+                'model_name': model_name,
+                'run_number': run_number,
+                'generation_params': generation_params,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self._is_expired(row[1]):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model_name: str, response: str) -> None:
+        """Store a response under its key."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, model_name, response, size_bytes, created_at, last_access, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, model_name, response, len(response.encode('utf-8')), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            run_eviction = self._writes % EVICTION_INTERVAL == 0
+
+        if run_eviction:
+            self.evict()
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry, e.g. a response that later proved unusable."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _is_expired(self, created_at: float) -> bool:
+        if self.max_age_days is None:
+            return False
+        return time.time() - created_at > self.max_age_days * 86400
+
+    def evict(self) -> int:
+        """
+        Apply the age and size limits.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+                ).rowcount
+
+            if self.max_size_mb is not None:
+                max_bytes = int(self.max_size_mb * 1024 * 1024)
+                total = self._conn.execute(
+                    "SELECT COALESCE(SUM(size_bytes), 0) FROM responses"
+                ).fetchone()[0]
+
+                if total > max_bytes:
+                    # Drop least recently used entries until we are under the limit
+                    rows = self._conn.execute(
+                        "SELECT key, size_bytes FROM responses ORDER BY last_access ASC"
+                    ).fetchall()
+                    stale_keys = []
+                    for key, size in rows:
+                        if total <= max_bytes:
+                            break
+                        stale_keys.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+                    removed += len(stale_keys)
+
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this session plus the size of the store."""
+        with self._lock:
+            entries, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM responses"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'size_mb': size_bytes / (1024 * 1024),
+            'path': str(self.path),
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,194 @@
+"""
+Retry Policy
+Error classification, jittered exponential backoff and a global retry budget.
+"""
+
+import random
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Optional
+
+from .key_pool import classify_quota_error
+
+RETRY_BUDGET_CAPACITY = 20.0  # Retries available before any call has succeeded
+RETRY_BUDGET_REFILL = 0.2  # Retries earned per successful call
+
+
+class ErrorCategory(Enum):
+    """What kind of failure an API call ran into."""
+    TRANSIENT = "transient"  # Network trouble and deadlines
+    RATE_LIMIT = "rate_limit"  # Per-minute 429s; the key pool enforces the wait
+    DAILY_QUOTA = "daily_quota"  # Per-day 429s; the key pool fails over to another key
+    SERVER = "server"  # 5xx responses
+    SAFETY = "safety"  # Prompt or response blocked by the safety filters
+    INVALID = "invalid"  # Bad request, permissions, unknown model
+    MALFORMED = "malformed"  # Empty or unusable response text
+    UNKNOWN = "unknown"
+
+
+class MalformedResponseError(ValueError):
+    """Raised when a response is empty or fails the caller's validation."""
+
+
+@dataclass
+class BackoffRule:
+    """How a category of errors is retried."""
+    retryable: bool = True
+    base_delay: float = 1.0  # Seconds before the first retry (before jitter)
+    max_delay: float = 30.0
+    uses_budget: bool = True  # Whether retries draw from the global budget
+
+
+DEFAULT_RULES: Dict[ErrorCategory, BackoffRule] = {
+    ErrorCategory.TRANSIENT: BackoffRule(base_delay=1.0, max_delay=30.0),
+    ErrorCategory.RATE_LIMIT: BackoffRule(base_delay=0.0, max_delay=0.0, uses_budget=False),
+    ErrorCategory.DAILY_QUOTA: BackoffRule(base_delay=0.0, max_delay=0.0, uses_budget=False),
+    ErrorCategory.SERVER: BackoffRule(base_delay=2.0, max_delay=60.0),
+    ErrorCategory.SAFETY: BackoffRule(retryable=False),
+    ErrorCategory.INVALID: BackoffRule(retryable=False),
+    ErrorCategory.MALFORMED: BackoffRule(base_delay=0.5, max_delay=5.0),
+    ErrorCategory.UNKNOWN: BackoffRule(base_delay=2.0, max_delay=30.0),
+}
+
+# Markers in SDK exception names and messages, checked in this order
+_SAFETY_MARKERS = ('BlockedPromptException', 'StopCandidateException', 'SAFETY', 'block_reason')
+_INVALID_MARKERS = ('InvalidArgument', 'PermissionDenied', 'NotFound', 'Unauthenticated',
+                    '400 ', '401 ', '403 ', '404 ', 'API key not valid')
+_TRANSIENT_MARKERS = ('DeadlineExceeded', 'Deadline Exceeded', '504 ', 'Connection reset',
+                      'Connection aborted', 'RemoteDisconnected')
+_SERVER_MARKERS = ('InternalServerError', 'Internal error', 'ServiceUnavailable', 'BadGateway',
+                   '500 ', '502 ', '503 ')
+
+
+def classify_error(error: BaseException) -> ErrorCategory:
+    """
+    Sort an exception from an API call into an ErrorCategory.
+
+    Args:
+        error: The exception raised by the call
+
+    Returns:
+        The category deciding whether and how the call is retried
+    """
+    if isinstance(error, MalformedResponseError):
+        return ErrorCategory.MALFORMED
+
+    quota_window = classify_quota_error(error)
+    if quota_window == 'daily':
+        return ErrorCategory.DAILY_QUOTA
+    if quota_window == 'minute':
+        return ErrorCategory.RATE_LIMIT
+
+    description = f"{type(error).__name__}: {error}"
+    if any(marker in description for marker in _SAFETY_MARKERS):
+        return ErrorCategory.SAFETY
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return ErrorCategory.TRANSIENT
+    if any(marker in description for marker in _TRANSIENT_MARKERS):
+        return ErrorCategory.TRANSIENT
+    if any(marker in description for marker in _SERVER_MARKERS):
+        return ErrorCategory.SERVER
+    if any(marker in description for marker in _INVALID_MARKERS):
+        return ErrorCategory.INVALID
+    if isinstance(error, ValueError):
+        # Other parse errors raised while handling a response
+        return ErrorCategory.MALFORMED
+    return ErrorCategory.UNKNOWN
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a share of successful calls.
+
+    Every retry spends one token and every success earns `refill` tokens,
+    so when the API keeps failing, retries stop after `capacity` attempts
+    instead of multiplying the failed traffic.
+    """
+
+    def __init__(self, capacity: float = RETRY_BUDGET_CAPACITY, refill: float = RETRY_BUDGET_REFILL):
+        """
+        Initialize the budget.
+
+        Args:
+            capacity: Maximum number of stored retry tokens
+            refill: Tokens earned per successful call
+        """
+        self.capacity = capacity
+        self.refill = refill
+        self.tokens = capacity
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        """Take a token for one retry, or return False if none is left."""
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+    def deposit(self) -> None:
+        """Earn tokens for a successful call."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.refill)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Decides whether a failed call is retried and after how long.
+
+    Delays use exponential backoff with full jitter: a uniform draw from
+    zero up to `base_delay * 2**attempt`, capped at `max_delay`. This
+    spreads retries of concurrent callers instead of letting them fail in
+    lockstep.
+    """
+    rules: Dict[ErrorCategory, BackoffRule] = field(default_factory=lambda: dict(DEFAULT_RULES))
+    budget: Optional[RetryBudget] = field(default_factory=RetryBudget)
+    rng: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self):
+        self.stats: Dict[str, int] = {category.value: 0 for category in ErrorCategory}
+        self.stats['budget_exhausted'] = 0
+
+    def classify(self, error: BaseException) -> ErrorCategory:
+        """Categorize an error and count it."""
+        category = classify_error(error)
+        self.stats[category.value] += 1
+        return category
+
+    def rule(self, category: ErrorCategory) -> BackoffRule:
+        """Backoff rule of a category (UNKNOWN's rule if none is configured)."""
+        return self.rules.get(category, DEFAULT_RULES[ErrorCategory.UNKNOWN])
+
+    def backoff(self, category: ErrorCategory, attempt: int) -> float:
+        """Jittered delay before retrying after the given zero-based attempt."""
+        rule = self.rule(category)
+        ceiling = min(rule.max_delay, rule.base_delay * (2 ** attempt))
+        return self.rng.uniform(0.0, ceiling) if ceiling > 0 else 0.0
+
+    def next_delay(self, category: ErrorCategory, attempt: int) -> Optional[float]:
+        """
+        Delay before the next attempt.
+
+        Args:
+            category: Category of the error that just happened
+            attempt: Zero-based attempt number that failed
+
+        Returns:
+            Seconds to wait, or None if the error must not be retried
+            (not retryable, or the retry budget is used up)
+        """
+        rule = self.rule(category)
+        if not rule.retryable:
+            return None
+        if rule.uses_budget and self.budget is not None and not self.budget.try_spend():
+            self.stats['budget_exhausted'] += 1
+            return None
+        return self.backoff(category, attempt)
+
+    def record_success(self) -> None:
+        """Refill the retry budget after a successful call."""
+        if self.budget is not None:
+            self.budget.deposit()
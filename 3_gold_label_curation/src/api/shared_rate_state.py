@@ -0,0 +1,241 @@
+"""
+Shared Rate-Limit State
+SQLite-backed token buckets and quota counters shared by every process on a
+host, so separate runners on the same API key stay within one budget.
+"""
+
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from .key_pool import quota_day
+
+TOKEN_WINDOW_SECONDS = 60.0
+
+
+class SharedRateState:
+    """
+    Per-key, per-model rate-limit state in a SQLite database.
+
+    Holds what APIKeyPool otherwise keeps in memory: the RPM token bucket,
+    the one-minute token window for TPM, the daily request counter and the
+    quarantine after a 429. Every check-and-charge runs in one IMMEDIATE
+    transaction, so processes never both take the last token. Keys are
+    stored by fingerprint only and times are wall-clock seconds, which every
+    process on the host agrees on.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the state database.
+
+        Args:
+            path: Path to the SQLite file; every process pointing at the same
+                file shares one budget
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        # Autocommit mode, so transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                fingerprint TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (fingerprint, model_name)
+            );
+            CREATE TABLE IF NOT EXISTS token_usage (
+                fingerprint TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                charged_at REAL NOT NULL,
+                tokens INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_token_usage ON token_usage(fingerprint, model_name, charged_at);
+            CREATE TABLE IF NOT EXISTS daily_requests (
+                fingerprint TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                PRIMARY KEY (fingerprint, model_name, day)
+            );
+            CREATE TABLE IF NOT EXISTS quarantine (
+                fingerprint TEXT PRIMARY KEY,
+                until REAL NOT NULL
+            );
+            """
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Exclusive write transaction across threads and processes."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    @staticmethod
+    def _bucket_tokens(cursor: sqlite3.Cursor, fingerprint: str, model_name: str,
+                       rpm: float, burst: int, now: float) -> float:
+        """Tokens in the RPM bucket after refilling it up to now."""
+        row = cursor.execute(
+            "SELECT tokens, updated_at FROM buckets WHERE fingerprint = ? AND model_name = ?",
+            (fingerprint, model_name)
+        ).fetchone()
+        if row is None:
+            return float(burst)
+        tokens, updated_at = row
+        return min(float(burst), tokens + max(0.0, now - updated_at) * rpm / 60.0)
+
+    @staticmethod
+    def _tpm_wait(cursor: sqlite3.Cursor, fingerprint: str, model_name: str,
+                  tpm: int, tokens: int, now: float) -> float:
+        """Seconds until `tokens` more fit into the one-minute token window."""
+        window = cursor.execute(
+            "SELECT charged_at, tokens FROM token_usage "
+            "WHERE fingerprint = ? AND model_name = ? AND charged_at > ? ORDER BY charged_at",
+            (fingerprint, model_name, now - TOKEN_WINDOW_SECONDS)
+        ).fetchall()
+        used = sum(charged for _, charged in window)
+        if used + tokens <= tpm or used == 0:
+            return 0.0
+
+        # Wait until enough old entries leave the window
+        excess = used + tokens - tpm
+        for charged_at, charged in window:
+            excess -= charged
+            if excess <= 0:
+                return max(0.0, TOKEN_WINDOW_SECONDS - (now - charged_at))
+        return TOKEN_WINDOW_SECONDS
+
+    @staticmethod
+    def _requests_today(cursor: sqlite3.Cursor, fingerprint: str, model_name: str) -> int:
+        row = cursor.execute(
+            "SELECT requests FROM daily_requests WHERE fingerprint = ? AND model_name = ? AND day = ?",
+            (fingerprint, model_name, quota_day().isoformat())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _wait(self, cursor: sqlite3.Cursor, fingerprint: str, model_name: str,
+              rpm: float, tpm: int, tokens: int, burst: int, now: float) -> Tuple[float, float]:
+        """(seconds until the key can take the request, tokens in its RPM bucket)."""
+        bucket = self._bucket_tokens(cursor, fingerprint, model_name, rpm, burst, now)
+        row = cursor.execute("SELECT until FROM quarantine WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        wait = max(
+            max(0.0, row[0] - now) if row else 0.0,
+            (1.0 - bucket) / (rpm / 60.0) if bucket < 1.0 else 0.0,
+            self._tpm_wait(cursor, fingerprint, model_name, tpm, tokens, now),
+        )
+        return wait, bucket
+
+    def headroom(self, fingerprint: str, model_name: str, rpm: float, tpm: int,
+                 tokens: int = 0, burst: int = 1) -> Tuple[float, int]:
+        """
+        Look at a key's budget without charging it.
+
+        Args:
+            fingerprint: Fingerprint of the API key
+            model_name: The model being called
+            rpm: Requests per minute this caller paces the key to
+            tpm: Tokens per minute of the model
+            tokens: Estimated tokens of the request
+            burst: Requests the bucket admits back-to-back
+
+        Returns:
+            (seconds until the key has budget, requests made with it today)
+        """
+        with self._transaction() as cursor:
+            wait, _ = self._wait(cursor, fingerprint, model_name, rpm, tpm, tokens, burst, time.time())
+            return wait, self._requests_today(cursor, fingerprint, model_name)
+
+    def try_reserve(self, fingerprint: str, model_name: str, rpm: float, tpm: int, rpd: int,
+                    tokens: int = 0, burst: int = 1) -> float:
+        """
+        Charge a key for one request if it has budget right now.
+
+        Args:
+            fingerprint: Fingerprint of the API key
+            model_name: The model being called
+            rpm: Requests per minute this caller paces the key to
+            tpm: Tokens per minute of the model
+            rpd: Requests per day of the model
+            tokens: Estimated tokens of the request
+            burst: Requests the bucket admits back-to-back
+
+        Returns:
+            0.0 if the key was charged, otherwise the seconds to wait
+            (infinity once the key's daily quota is used up)
+        """
+        with self._transaction() as cursor:
+            now = time.time()
+            if self._requests_today(cursor, fingerprint, model_name) >= rpd:
+                return float('inf')
+            wait, bucket = self._wait(cursor, fingerprint, model_name, rpm, tpm, tokens, burst, now)
+            if wait > 0:
+                return wait
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO buckets (fingerprint, model_name, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                (fingerprint, model_name, bucket - 1.0, now)
+            )
+            cursor.execute(
+                "INSERT INTO token_usage (fingerprint, model_name, charged_at, tokens) VALUES (?, ?, ?, ?)",
+                (fingerprint, model_name, now, tokens)
+            )
+            cursor.execute(
+                "INSERT INTO daily_requests (fingerprint, model_name, day, requests) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(fingerprint, model_name, day) DO UPDATE SET requests = requests + 1",
+                (fingerprint, model_name, quota_day().isoformat())
+            )
+            cursor.execute("DELETE FROM token_usage WHERE charged_at <= ?", (now - TOKEN_WINDOW_SECONDS,))
+            return 0.0
+
+    def record_tokens(self, fingerprint: str, model_name: str, tokens: int) -> None:
+        """Charge tokens reported by the API beyond the estimate to the TPM window."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO token_usage (fingerprint, model_name, charged_at, tokens) VALUES (?, ?, ?, ?)",
+                (fingerprint, model_name, time.time(), tokens)
+            )
+
+    def quarantine(self, fingerprint: str, seconds: float) -> None:
+        """Take a key out of rotation for every process for the given time."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO quarantine (fingerprint, until) VALUES (?, ?) "
+                "ON CONFLICT(fingerprint) DO UPDATE SET until = MAX(until, excluded.until)",
+                (fingerprint, time.time() + seconds)
+            )
+
+    def requests_today(self, fingerprint: str, model_name: str) -> int:
+        """Requests made with a key and model during the current quota day."""
+        with self._transaction() as cursor:
+            return self._requests_today(cursor, fingerprint, model_name)
+
+    def mark_daily_exhausted(self, fingerprint: str, model_name: str, rpd: int) -> None:
+        """Record that a key's daily quota for a model is used up."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO daily_requests (fingerprint, model_name, day, requests) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint, model_name, day) DO UPDATE SET requests = MAX(requests, excluded.requests)",
+                (fingerprint, model_name, quota_day().isoformat(), rpd)
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
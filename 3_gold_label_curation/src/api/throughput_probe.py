@@ -0,0 +1,247 @@
+"""
+Throughput Probe
+Ramps the request rate and concurrency against a model until 429s set in, and
+measures the rate it can sustain, its latency and its success rate.
+"""
+
+import math
+import time
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .key_pool import classify_quota_error, estimate_tokens
+from .latency_tracker import LatencyTracker
+from .rate_limiter import RateLimiter
+
+DEFAULT_STEP_SECONDS = 60.0  # One quota window, so per-minute limits show up within a step
+DEFAULT_RAMP_FACTOR = 1.5
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_REQUESTS = 300  # Probing spends real quota
+MAX_RATE_LIMITED_SHARE = 0.02  # A step with more 429s than this is past the limit
+MIN_SUCCESS_RATE = 0.9
+INITIAL_LATENCY_GUESS = 2.0  # Seconds, used to size concurrency before anything was measured
+
+
+@dataclass
+class ProbeStep:
+    """Outcome of sending at one target rate for one step."""
+    target_rpm: float
+    concurrency: int
+    sent: int = 0
+    succeeded: int = 0
+    rate_limited: int = 0
+    token_limited: int = 0
+    errors: int = 0
+    daily_exhausted: bool = False
+    tokens: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def achieved_rpm(self) -> float:
+        """Successful requests per minute."""
+        return self.succeeded / self.elapsed * 60.0 if self.elapsed else 0.0
+
+    @property
+    def achieved_tpm(self) -> float:
+        """Tokens of successful requests per minute."""
+        return self.tokens / self.elapsed * 60.0 if self.elapsed else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.succeeded / self.sent if self.sent else 0.0
+
+    @property
+    def rate_limited_share(self) -> float:
+        return self.rate_limited / self.sent if self.sent else 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile of the successful requests (nearest rank)."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    @property
+    def clean(self) -> bool:
+        """Whether the model kept up with this rate."""
+        return (not self.daily_exhausted
+                and self.rate_limited_share <= MAX_RATE_LIMITED_SHARE
+                and self.success_rate >= MIN_SUCCESS_RATE)
+
+
+@dataclass
+class ProbeResult:
+    """Everything one probe of a model measured."""
+    model_name: str
+    backend_name: str
+    steps: List[ProbeStep]
+    sustainable: Optional[ProbeStep]  # Fastest clean step
+    onset: Optional[ProbeStep]  # First step past the limit
+
+    @property
+    def limited_by(self) -> Optional[str]:
+        """'tpm' or 'rpm' if the probe reached the limit, None if it never did."""
+        if self.onset is None or self.onset.rate_limited == 0:
+            return None
+        return 'tpm' if self.onset.token_limited > self.onset.rate_limited / 2 else 'rpm'
+
+    def registry_entry(self) -> Dict[str, Any]:
+        """Measured limits in the shape ModelLimitsRegistry stores."""
+        best = self.sustainable
+        return {
+            'rpm': round(best.achieved_rpm, 2) if best else None,
+            'tpm': int(best.achieved_tpm) if best else None,
+            'limited_by': self.limited_by,
+            'rate_limited_at_rpm': round(self.onset.target_rpm, 2) if self.onset else None,
+            'concurrency': best.concurrency if best else None,
+            'p50_latency': round(best.percentile(0.5), 3) if best else None,
+            'p95_latency': round(best.percentile(0.95), 3) if best else None,
+            'success_rate': round(best.success_rate, 4) if best else None,
+            'requests_sent': sum(step.sent for step in self.steps),
+            'probed_at': datetime.now().isoformat(),
+        }
+
+
+class ThroughputProbe:
+    """
+    Finds the request rate a model sustains on one API key.
+
+    Each step sends at a fixed target rate for `step_seconds`, with enough
+    requests in flight to reach that rate at the latency measured so far.
+    Rates grow by `ramp_factor` per step until a step sees more than
+    MAX_RATE_LIMITED_SHARE 429s, falls below MIN_SUCCESS_RATE, exhausts
+    the daily quota or the request budget runs out. Requests go straight
+    to the client's backend, bypassing the key pool's pacing and the
+    client's retries, so every 429 is seen.
+    """
+
+    def __init__(self, client: Any, model_name: str, prompts: Iterable[str],
+                 start_rpm: Optional[float] = None, max_rpm: Optional[float] = None,
+                 ramp_factor: float = DEFAULT_RAMP_FACTOR,
+                 step_seconds: float = DEFAULT_STEP_SECONDS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_requests: int = DEFAULT_MAX_REQUESTS,
+                 max_output_tokens: int = 1024):
+        """
+        Initialize the probe.
+
+        Args:
+            client: GeminiClient whose backend and first key are probed
+            model_name: The model to probe
+            prompts: Prompts to send (cycled), ideally real pilot prompts
+            start_rpm: Rate of the first step (default: half the published RPM)
+            max_rpm: Highest rate to try (default: 8x the published RPM)
+            ramp_factor: Rate multiplier between steps
+            step_seconds: Duration of each step
+            max_concurrency: Upper bound of requests in flight
+            max_requests: Total requests the probe may send
+            max_output_tokens: Output budget per request
+        """
+        published_rpm = client.get_model_config(model_name).get('rpm', 15)
+        self.client = client
+        self.model_name = model_name
+        self.prompts = itertools.cycle(list(prompts))
+        self.start_rpm = start_rpm or max(1.0, published_rpm / 2)
+        self.max_rpm = max_rpm or published_rpm * 8
+        self.ramp_factor = ramp_factor
+        self.step_seconds = step_seconds
+        self.max_concurrency = max_concurrency
+        self.max_requests = max_requests
+        self.generation_config = client._prepare_request(model_name, 0.7, 0.8, 40, max_output_tokens)
+        self.latency = LatencyTracker(min_samples=1)
+
+    def _concurrency(self, target_rpm: float) -> int:
+        """Requests in flight needed to reach a rate at the observed p95 latency."""
+        latency = self.latency.percentile(self.model_name, 0.95) or INITIAL_LATENCY_GUESS
+        return max(1, min(self.max_concurrency, math.ceil(target_rpm / 60.0 * latency * 1.5)))
+
+    async def _send(self, model: Any, prompt: str, step: ProbeStep) -> None:
+        """Send one request and count its outcome."""
+        start_time = time.monotonic()
+        try:
+            call = model.generate_content_async(prompt, generation_config=self.generation_config)
+            if self.client.request_timeout is not None:
+                call = asyncio.wait_for(call, self.client.request_timeout)
+            response = await call
+        except Exception as e:
+            window = classify_quota_error(e)
+            if window == 'daily':
+                step.daily_exhausted = True
+            elif window == 'minute':
+                step.rate_limited += 1
+                if 'token' in str(e).lower():
+                    step.token_limited += 1
+            else:
+                step.errors += 1
+            return
+
+        latency = time.monotonic() - start_time
+        step.succeeded += 1
+        step.latencies.append(latency)
+        self.latency.record(self.model_name, latency)
+        usage = getattr(response, 'usage_metadata', None)
+        step.tokens += getattr(usage, 'total_token_count', 0) or estimate_tokens(prompt)
+
+    async def _run_step(self, target_rpm: float, budget: int) -> ProbeStep:
+        """Send at one target rate for step_seconds (or until the budget is spent)."""
+        step = ProbeStep(target_rpm, self._concurrency(target_rpm))
+        model = self.client.backend.model(self.model_name, self.client.key_pool.keys[0].api_key)
+        limiter = RateLimiter(target_rpm)
+        slots = asyncio.Semaphore(step.concurrency)
+        tasks = []
+
+        async def send(prompt: str) -> None:
+            try:
+                await self._send(model, prompt, step)
+            finally:
+                slots.release()
+
+        start_time = time.monotonic()
+        deadline = start_time + self.step_seconds
+        while step.sent < budget and not step.daily_exhausted:
+            await slots.acquire()
+            await limiter.acquire_async()
+            if time.monotonic() >= deadline:
+                slots.release()
+                break
+            step.sent += 1
+            tasks.append(asyncio.ensure_future(send(next(self.prompts))))
+        await asyncio.gather(*tasks)
+        step.elapsed = time.monotonic() - start_time
+        return step
+
+    async def run(self, report: Optional[Any] = None) -> ProbeResult:
+        """
+        Ramp the rate until the model stops keeping up.
+
+        Args:
+            report: Optional callback receiving every finished ProbeStep
+
+        Returns:
+            The measurements of every step, the sustainable step and the onset
+        """
+        steps: List[ProbeStep] = []
+        sustainable: Optional[ProbeStep] = None
+        onset: Optional[ProbeStep] = None
+        target_rpm = self.start_rpm
+        sent = 0
+
+        while target_rpm <= self.max_rpm and sent < self.max_requests:
+            step = await self._run_step(target_rpm, self.max_requests - sent)
+            steps.append(step)
+            sent += step.sent
+            if report is not None:
+                report(step)
+            if not step.clean:
+                onset = step
+                break
+            if sustainable is None or step.achieved_rpm > sustainable.achieved_rpm:
+                sustainable = step
+            target_rpm *= self.ramp_factor
+
+        backend_name = getattr(self.client.backend, 'name', 'unknown')
+        return ProbeResult(self.model_name, backend_name, steps, sustainable, onset)
@@ -7,12 +7,25 @@ import argparse
 from typing import Dict, Any
 
 from ..api.gemini_client import GeminiClient
+from ..pipeline.adaptive_runs import DEFAULT_MIN_RUNS, EXTRA_RUNS
+from ..pipeline.cascade import DEFAULT_CONFIDENCE_THRESHOLD
+from ..pipeline.scheduler import DEFAULT_TASK_PRIORITIES, parse_task_priorities
 
 # Default values
 DEFAULT_MODEL_NAME = "models/gemini-2.5-flash-lite"
 DEFAULT_DATASET = "mini_test_with_ids.csv"
 DEFAULT_N_RUNS = 3
 DEFAULT_TEMPERATURE = 0.7
+DEFAULT_CONCURRENCY = 1
+DEFAULT_BATCH_SIZE = 1
+
+
+def task_priorities_type(spec: str) -> Dict[str, int]:
+    """argparse type for --task-priorities."""
+    try:
+        return parse_task_priorities(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 
 def create_base_parser() -> argparse.ArgumentParser:
@@ -32,13 +45,11 @@ Available Models:
 
 def add_pilot_study_arguments(parser: argparse.ArgumentParser) -> None:
     """Add pilot study specific arguments."""
-    available_models = GeminiClient.get_available_models()
-    
     parser.add_argument(
         "--model", "-m",
         default=DEFAULT_MODEL_NAME,
-        choices=list(available_models.keys()),
-        help=f"Model to use for evaluation (default: {DEFAULT_MODEL_NAME})"
+        help=f"Model to use for evaluation: a Gemini model (see --list-models) or any model "
+             f"served by --openai-base-url (default: {DEFAULT_MODEL_NAME})"
     )
     
     parser.add_argument(
@@ -66,6 +77,241 @@ def add_pilot_study_arguments(parser: argparse.ArgumentParser) -> None:
         default=None,
         help="Output directory (default: data/output/)"
     )
+    
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum requests in flight per model; >1 uses the async runner (default: {DEFAULT_CONCURRENCY})"
+    )
+    
+    parser.add_argument(
+        "--batch-size", "-b",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Samples packed into one request; failed items are retried individually (default: {DEFAULT_BATCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--multi-candidate",
+        action="store_true",
+        help="Get all runs of a sample from one request via candidate_count"
+    )
+    
+    parser.add_argument(
+        "--prompt-layout",
+        choices=["inline", "split", "cached"],
+        default="inline",
+        help="Send the static instructions inline, as a system instruction, or via a context cache"
+    )
+    
+    parser.add_argument(
+        "--cache-hierarchy",
+        action="store_true",
+        help="With --prompt-layout cached, also cache the full codebook hierarchy"
+    )
+    
+    parser.add_argument(
+        "--structured-output",
+        action="store_true",
+        help="Request bare JSON matching the verdict schema (response_mime_type=application/json)"
+    )
+    
+    parser.add_argument(
+        "--response-format",
+        choices=["full", "terse"],
+        default="full",
+        help="Ask for reasoning with every verdict (full) or only for is_correct, "
+             "confidence_score and alternative_codes (terse, written to a separate *_terse.jsonl)"
+    )
+    
+    parser.add_argument(
+        "--explain-on-demand",
+        action="store_true",
+        help="Answer tersely first and ask the same model for full reasoning only on samples "
+             "whose runs disagree or fall below --confidence-threshold"
+    )
+    
+    parser.add_argument(
+        "--max-samples",
+        type=int,
+        default=None,
+        help="Only process the first N samples of the dataset"
+    )
+    
+    parser.add_argument(
+        "--fake-backend",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="SPEC",
+        help="Use the offline fake API, optionally configured as "
+             "'latency_mean=0.5,rpm=60,malformed_rate=0.05,truncated_rate=0.02,empty_rate=0.01'"
+    )
+    
+    parser.add_argument(
+        "--openai-base-url",
+        default=None,
+        metavar="URL",
+        help="Send requests to a local OpenAI-compatible server (llama.cpp, vLLM) instead of Gemini, "
+             "e.g. http://localhost:8000/v1 (API key read from OPENAI_API_KEY if set)"
+    )
+    
+    parser.add_argument(
+        "--openai-rpm",
+        type=float,
+        default=None,
+        help="With --openai-base-url, requests per minute to pace to (default: only --concurrency limits)"
+    )
+    
+    parser.add_argument(
+        "--record-cassette",
+        default=None,
+        metavar="PATH",
+        help="Append every raw response, with its latency and usage, to this .jsonl.gz cassette "
+             "(bypasses the response cache)"
+    )
+    
+    parser.add_argument(
+        "--replay-cassette",
+        default=None,
+        metavar="PATH",
+        help="Serve responses from a recorded cassette instead of calling a model"
+    )
+    
+    parser.add_argument(
+        "--replay-timing",
+        action="store_true",
+        help="With --replay-cassette, reproduce the recorded latency of every response"
+    )
+    
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Build every pending prompt and print projected tokens, cost and time without generating"
+    )
+    
+    parser.add_argument(
+        "--offline-estimate",
+        action="store_true",
+        help="With --dry-run, skip count_tokens calibration and estimate tokens offline"
+    )
+    
+    parser.add_argument(
+        "--cache-path",
+        default=None,
+        help="SQLite response cache file (default: data/output/cache/llm_responses.sqlite)"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the response cache and send every request to the API"
+    )
+    
+    parser.add_argument(
+        "--no-prompt-cache",
+        action="store_true",
+        help="Compile the prompts afresh instead of reading them from data/output/cache/prompts"
+    )
+    
+    parser.add_argument(
+        "--on-daily-quota",
+        choices=["stop", "wait"],
+        default="stop",
+        help="When every key has used its daily quota: stop, or sleep until the quota resets and continue"
+    )
+    
+    parser.add_argument(
+        "--task-priorities",
+        type=task_priorities_type,
+        default=None,
+        metavar="KIND=N,...",
+        help="Priority of fresh, retry and escalation runs, lower first "
+             f"(default: {', '.join(f'{k}={v}' for k, v in DEFAULT_TASK_PRIORITIES.items())})"
+    )
+    
+    parser.add_argument(
+        "--adaptive-rate",
+        action="store_true",
+        help="Learn the sustainable request rate from 429s (AIMD) and remember it between runs"
+    )
+    
+    parser.add_argument(
+        "--rate-limits-path",
+        default=None,
+        help="JSON registry of learned rates (default: data/output/cache/rate_limits.json)"
+    )
+    
+    parser.add_argument(
+        "--shared-rate-limits",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Share rate-limit state with every other process on this host through a SQLite file "
+             "(default: data/output/cache/rate_state.sqlite)"
+    )
+    
+    parser.add_argument(
+        "--model-limits-path",
+        default=None,
+        help="Probed model limits to pace to, written by 02b_probe_throughput.py "
+             "(default: data/output/cache/model_limits.json)"
+    )
+    
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Cancel and retry API calls that take longer than this (default: no timeout)"
+    )
+    
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="With --concurrency > 1, duplicate calls that run past the observed p95 latency "
+             "when spare rate budget exists, keeping the first response"
+    )
+    
+    parser.add_argument(
+        "--cascade",
+        default=None,
+        metavar="MODEL1,MODEL2,...",
+        help="Label every sample with the first model and escalate only samples whose runs "
+             "disagree or have low confidence to the next ones (overrides --model); "
+             "append :terse to a model for verdicts without reasoning"
+    )
+    
+    parser.add_argument(
+        "--confidence-threshold",
+        type=float,
+        default=DEFAULT_CONFIDENCE_THRESHOLD,
+        help=f"With --cascade, --explain-on-demand or --adaptive-runs, mean confidence_score below which "
+             f"a sample is escalated or gets more runs (default: {DEFAULT_CONFIDENCE_THRESHOLD})"
+    )
+    
+    parser.add_argument(
+        "--adaptive-runs",
+        action="store_true",
+        help="Stop issuing runs for a sample once --min-runs runs agree above --confidence-threshold "
+             "and spend the saved calls on samples whose runs disagree (--runs sets the call budget)"
+    )
+    
+    parser.add_argument(
+        "--min-runs",
+        type=int,
+        default=DEFAULT_MIN_RUNS,
+        help=f"With --adaptive-runs, runs every sample gets before it can settle (default: {DEFAULT_MIN_RUNS})"
+    )
+    
+    parser.add_argument(
+        "--max-runs",
+        type=int,
+        default=None,
+        help=f"With --adaptive-runs, most runs a disagreeing sample gets (default: --runs + {EXTRA_RUNS})"
+    )
 
 
 def add_common_arguments(parser: argparse.ArgumentParser) -> None:
@@ -93,6 +339,15 @@ Examples:
   python script.py
   python script.py --model models/gemini-1.5-flash-latest
   python script.py --dataset other_test.csv --model models/gemini-1.5-pro-latest
+  python script.py --dataset valid.csv --concurrency 8
+  python script.py --dataset valid.csv --dry-run
+  python script.py --dataset valid.csv --cascade models/gemini-2.5-flash-lite,models/gemini-1.5-pro-latest
+  python script.py --response-format terse --structured-output
+  python script.py --explain-on-demand --confidence-threshold 0.8
+  python script.py --adaptive-runs --runs 3 --max-runs 5
+  python script.py --openai-base-url http://localhost:8000/v1 --model Qwen/Qwen2.5-7B-Instruct -c 16
+  python script.py --record-cassette data/output/cassettes/mini.jsonl.gz
+  python script.py --replay-cassette data/output/cassettes/mini.jsonl.gz -c 64
   python script.py --list-models
 
 """ + parser.epilog
@@ -29,11 +29,12 @@ class PipelineConfig:
     max_output_tokens: int = 500
     
     def __post_init__(self):
-        """Initialize model configurations"""
+        """Initialize model configurations from the client's model table"""
+        from .api.gemini_client import AVAILABLE_MODELS
+        
         self.models = {
-            "gemini-1.5-flash-latest": ModelConfig("models/gemini-1.5-flash-latest", 15),
-            "gemini-1.5-pro-latest": ModelConfig("models/gemini-1.5-pro-latest", 2),
-            "gemini-2.5-flash-lite": ModelConfig("models/gemini-2.5-flash-lite", 15),
+            name: ModelConfig(name, limits["rpm"])
+            for name, limits in AVAILABLE_MODELS.items()
         }
     
     def get_model_config(self, model_name: str) -> ModelConfig:
@@ -1,4 +1,6 @@
 # Data package init
 from .data_loader import DataLoader, load_hierarchical_codebook, load_test_data, load_master_template
+from .codebook_index import CodebookIndex, format_hierarchy
 
-__all__ = ['DataLoader', 'load_hierarchical_codebook', 'load_test_data', 'load_master_template']
+__all__ = ['DataLoader', 'load_hierarchical_codebook', 'load_test_data', 'load_master_template',
+           'CodebookIndex', 'format_hierarchy']
@@ -0,0 +1,92 @@
+"""
+Codebook Index
+Constant-time lookup of KBLI codes in the hierarchical codebook, with the
+hierarchy text of every code formatted once when the index is built.
+"""
+
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+
+def format_hierarchy(row: Mapping[str, Any]) -> str:
+    """
+    Create a clean, multi-line string for the prompt hierarchy.
+
+    Args:
+        row: A row of the hierarchical codebook (Series or dict)
+
+    Returns:
+        Formatted hierarchy string
+    """
+    hierarchy_lines = [
+        f"- Section {row['code_1']}: {row['title_1']}",
+        f"- Division {row['code_2']}: {row['title_2']}",
+        f"- Group {row['code_3']}: {row['title_3']}",
+        f"- Class {row['code_4']}: {row['title_4']}",
+        f"- Sub-Class {row['code_5']}: {row['title_5']}"
+    ]
+
+    # Add description if available
+    if pd.notna(row['desc_5']) and row['desc_5'].strip():
+        hierarchy_lines.append(f"- Description: {row['desc_5']}")
+
+    return "\n".join(hierarchy_lines)
+
+
+class CodebookIndex:
+    """
+    The hierarchical codebook keyed by 5-digit code.
+
+    Built once from the codebook DataFrame: looking a code up is a dict
+    hit instead of a boolean scan over every row, and each code's
+    hierarchy fragment is formatted only once. If a code occurs more than
+    once, its first row wins, as with the scan this replaces.
+    """
+
+    def __init__(self, codebook: pd.DataFrame):
+        """
+        Index a codebook.
+
+        Args:
+            codebook: The hierarchical codebook DataFrame (code_5 as str)
+        """
+        self.codebook = codebook
+        self._positions: Dict[str, int] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._hierarchies: Dict[str, str] = {}
+
+        for position, row in enumerate(codebook.to_dict('records')):
+            code = str(row['code_5'])
+            if code in self._positions:
+                continue
+            self._positions[code] = position
+            self._entries[code] = row
+            self._hierarchies[code] = format_hierarchy(row)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, code: object) -> bool:
+        return str(code) in self._entries
+
+    @property
+    def codes(self) -> List[str]:
+        """Indexed codes in codebook order."""
+        return list(self._entries)
+
+    def entry(self, code: str) -> Optional[Dict[str, Any]]:
+        """Fields of a code's codebook row, or None if the code is unknown."""
+        return self._entries.get(str(code))
+
+    def row(self, code: str) -> Optional[pd.Series]:
+        """A code's codebook row as a Series, or None if the code is unknown."""
+        position = self._positions.get(str(code))
+        return None if position is None else self.codebook.iloc[position]
+
+    def hierarchy(self, code: str) -> Optional[str]:
+        """Precomputed hierarchy fragment of a code, or None if the code is unknown."""
+        return self._hierarchies.get(str(code))
+
+    def hierarchies(self) -> Iterator[Tuple[str, str]]:
+        """(code, hierarchy fragment) pairs in codebook order."""
+        return iter(self._hierarchies.items())
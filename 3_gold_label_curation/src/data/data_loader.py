@@ -5,9 +5,11 @@ Handles loading of codebooks, test datasets, and templates.
 
 import os
 import pandas as pd
-from typing import Optional
+from typing import Optional, Union
 from pathlib import Path
 
+from .codebook_index import CodebookIndex
+
 
 class DataLoader:
     """Centralized data loading functionality."""
@@ -25,6 +27,8 @@ class DataLoader:
             self.project_root = current_file.parent.parent.parent
         else:
             self.project_root = Path(project_root)
+        # Index of the codebook last looked up, reused while the same DataFrame is passed
+        self._codebook_index: Optional[CodebookIndex] = None
     
     def load_hierarchical_codebook(self, path: Optional[str] = None) -> pd.DataFrame:
         """
@@ -58,6 +62,35 @@ class DataLoader:
         print(f"✅ Loaded hierarchical codebook with {len(df)} entries")
         return df
     
+    def load_codebook_index(self, path: Optional[str] = None) -> CodebookIndex:
+        """
+        Load the hierarchical codebook and index it by 5-digit code.
+        
+        Args:
+            path: Custom path to codebook (if None, uses default location)
+            
+        Returns:
+            CodebookIndex over the loaded codebook
+        """
+        self._codebook_index = CodebookIndex(self.load_hierarchical_codebook(path))
+        return self._codebook_index
+    
+    def codebook_index(self, codebook: Union[pd.DataFrame, CodebookIndex]) -> CodebookIndex:
+        """
+        Index of a codebook, built on first use and reused for the same DataFrame.
+        
+        Args:
+            codebook: The hierarchical codebook DataFrame, or an index of it
+            
+        Returns:
+            CodebookIndex over the codebook
+        """
+        if isinstance(codebook, CodebookIndex):
+            return codebook
+        if self._codebook_index is None or self._codebook_index.codebook is not codebook:
+            self._codebook_index = CodebookIndex(codebook)
+        return self._codebook_index
+    
     def load_test_data(self, dataset_filename: str) -> pd.DataFrame:
         """
         Load test dataset with UUIDs (preferred) or fallback to original.
@@ -127,23 +160,19 @@ class DataLoader:
         print("✅ Loaded master prompt template")
         return template
     
-    def get_codebook_entry(self, codebook: pd.DataFrame, code: str) -> Optional[pd.Series]:
+    def get_codebook_entry(self, codebook: Union[pd.DataFrame, CodebookIndex],
+                           code: str) -> Optional[pd.Series]:
         """
         Get a specific entry from the hierarchical codebook.
         
         Args:
-            codebook: The hierarchical codebook DataFrame
+            codebook: The hierarchical codebook DataFrame, or an index of it
             code: The 5-digit KBLI code to find
             
         Returns:
             Series with the codebook entry, or None if not found
         """
-        matching_rows = codebook[codebook['code_5'] == str(code)]
-        
-        if matching_rows.empty:
-            return None
-        
-        return matching_rows.iloc[0]
+        return self.codebook_index(codebook).row(code)
 
 
 # Convenience functions for backward compatibility
@@ -0,0 +1,220 @@
+"""
+Adaptive Runs
+Early stopping of self-consistency runs: a sample gets more runs only while
+its runs disagree or lack confidence, and the calls saved on easy samples are
+spent on extra runs for the hard ones.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .cascade import DEFAULT_CONFIDENCE_THRESHOLD, escalation_reason
+
+DEFAULT_MIN_RUNS = 2
+EXTRA_RUNS = 2  # Default max_runs is n_runs + EXTRA_RUNS
+
+
+@dataclass
+class AdaptiveRunPolicy:
+    """When a sample has had enough runs."""
+    min_runs: int = DEFAULT_MIN_RUNS
+    max_runs: Optional[int] = None  # None: n_runs + EXTRA_RUNS
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD
+
+    def settled(self, runs: List[Dict[str, Any]]) -> bool:
+        """
+        Whether the successful runs of a sample settle it.
+
+        A sample is settled once it has at least min_runs successful runs
+        that agree on is_correct with a mean confidence_score of at least
+        the threshold (the same rule a cascade stage decides by).
+
+        Args:
+            runs: Successful records of the sample
+
+        Returns:
+            True if no more runs are needed
+        """
+        return len(runs) >= self.min_runs and escalation_reason(runs, self.confidence_threshold) is None
+
+    def max_runs_for(self, n_runs: int) -> int:
+        """Upper bound of runs per sample for a study of n_runs."""
+        return self.max_runs if self.max_runs is not None else n_runs + EXTRA_RUNS
+
+    def metadata(self, n_runs: int) -> Dict[str, Any]:
+        """Policy as stamped on every record, so the analyzer can judge each run set."""
+        return {
+            'min_runs': self.min_runs,
+            'max_runs': self.max_runs_for(n_runs),
+            'confidence_threshold': self.confidence_threshold,
+            'n_runs': n_runs,
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Any]) -> 'AdaptiveRunPolicy':
+        """Policy stamped on a record by metadata()."""
+        return cls(
+            min_runs=metadata.get('min_runs', DEFAULT_MIN_RUNS),
+            max_runs=metadata.get('max_runs'),
+            confidence_threshold=metadata.get('confidence_threshold', DEFAULT_CONFIDENCE_THRESHOLD),
+        )
+
+    def complete(self, runs: List[Dict[str, Any]], n_runs: int) -> bool:
+        """Whether a sample needs no more runs: settled, or given the n_runs of a full study."""
+        return self.settled(runs) or len(runs) >= n_runs
+
+
+class AdaptiveRunTracker:
+    """
+    Decides run by run which runs each sample still gets.
+
+    Every sample starts with min_runs runs. Once all issued runs of a
+    sample have finished, it gets one more run if it is not settled,
+    until it has n_runs. Runs beyond n_runs (up to max_runs) are extra:
+    they are only dispatched while the calls spent, plus the runs still
+    owed to unsettled samples, stay below the n_runs-per-sample budget a
+    full study would have used. Run numbers
+    attempted in this session are not issued again; failed ones are
+    retried on resume like any other failed run.
+    """
+
+    def __init__(self, policy: AdaptiveRunPolicy, n_runs: int, sample_ids: Iterable[str],
+                 existing_records: Iterable[Dict[str, Any]] = ()):
+        """
+        Initialize the tracker.
+
+        Args:
+            policy: The adaptive run policy
+            n_runs: Runs per sample of a full study (sets the call budget)
+            sample_ids: Samples of this study
+            existing_records: Records already in the results file
+        """
+        self.policy = policy
+        self.n_runs = n_runs
+        self.max_runs = policy.max_runs_for(n_runs)
+        self.sample_ids = [str(sample_id) for sample_id in sample_ids]
+        self.budget = len(self.sample_ids) * n_runs
+
+        wanted = set(self.sample_ids)
+        self.successes: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for record in existing_records:
+            sample_id = str(record.get('sample_id'))
+            if sample_id in wanted and record.get('success'):
+                self.successes.setdefault(sample_id, {})[record.get('run_number')] = record
+
+        self.spent = sum(len(runs) for runs in self.successes.values())
+        self.attempted: Dict[str, Set[int]] = {}
+        self.outstanding: Dict[str, int] = {}
+        self.extra: Set[Tuple[str, int]] = set()
+        self.ready: Dict[str, List[int]] = {}  # Runs issued by finish(), not queued yet
+        self.dropped = 0
+
+        # Calls reserved for runs up to n_runs: not issued yet (per sample), or issued but not sent
+        self.owed = {sample_id: self._owed(sample_id) for sample_id in self.sample_ids}
+        self.reserved = sum(self.owed.values())
+
+    def runs(self, sample_id: str) -> List[Dict[str, Any]]:
+        """Successful records of a sample."""
+        return list(self.successes.get(str(sample_id), {}).values())
+
+    def _owed(self, sample_id: str) -> int:
+        """Runs up to n_runs an unsettled sample may still be issued."""
+        if self.policy.settled(self.runs(sample_id)):
+            return 0
+        done = set(self.successes.get(sample_id, {})) | self.attempted.get(sample_id, set())
+        return max(0, self.n_runs - len(done))
+
+    def next_runs(self, sample_id: str) -> List[int]:
+        """
+        Issue the runs a sample should get now.
+
+        Args:
+            sample_id: The sample (with no runs outstanding)
+
+        Returns:
+            Run numbers to queue (empty once the sample is settled or capped)
+        """
+        sample_id = str(sample_id)
+        runs = self.runs(sample_id)
+        if self.policy.settled(runs):
+            self.reserved -= self.owed.pop(sample_id, 0)
+            return []
+
+        attempted = self.attempted.setdefault(sample_id, set())
+        done = set(self.successes.get(sample_id, {})) | attempted
+        wanted = min(max(self.policy.min_runs - len(runs), 1), self.max_runs - len(done))
+
+        run_numbers: List[int] = []
+        run_num = 1
+        while len(run_numbers) < wanted:
+            if run_num not in done:
+                run_numbers.append(run_num)
+                if len(done) + len(run_numbers) > self.n_runs:
+                    self.extra.add((sample_id, run_num))
+            run_num += 1
+
+        attempted.update(run_numbers)
+        self.outstanding[sample_id] = self.outstanding.get(sample_id, 0) + len(run_numbers)
+        # Required runs move from owed to issued; both stay reserved until sent
+        owed = self._owed(sample_id)
+        self.reserved += owed - self.owed.get(sample_id, 0)
+        self.owed[sample_id] = owed
+        self.reserved += sum(1 for run_num in run_numbers if (sample_id, run_num) not in self.extra)
+        return run_numbers
+
+    def dispatch(self, sample_id: str, run_num: int) -> bool:
+        """
+        Account for a run about to be sent.
+
+        Returns:
+            False if it is an extra run and the budget is spent (the run is dropped)
+        """
+        sample_id = str(sample_id)
+        if (sample_id, run_num) not in self.extra:
+            self.reserved -= 1
+        elif self.spent + self.reserved >= self.budget:
+            self.outstanding[sample_id] -= 1
+            self.dropped += 1
+            return False
+        self.spent += 1
+        return True
+
+    def undispatch(self, sample_id: str, run_num: int) -> None:
+        """Give back the call of a run that was parked on a quota error."""
+        self.spent -= 1
+        if (str(sample_id), run_num) not in self.extra:
+            self.reserved += 1
+
+    def finish(self, sample_id: str, run_num: int, record: Optional[Dict[str, Any]]) -> None:
+        """
+        Record the outcome of a run and, once none of the sample's runs is
+        outstanding, issue its next runs (collected with take_ready).
+
+        Args:
+            sample_id: The sample
+            run_num: The run that finished
+            record: Its result record, or None if it failed
+        """
+        sample_id = str(sample_id)
+        if record is not None and record.get('success'):
+            self.successes.setdefault(sample_id, {})[run_num] = record
+        self.outstanding[sample_id] = self.outstanding.get(sample_id, 1) - 1
+        if self.outstanding[sample_id] <= 0:
+            self.ready.setdefault(sample_id, []).extend(self.next_runs(sample_id))
+
+    def take_ready(self, sample_id: str) -> List[int]:
+        """Runs issued for a sample since the last call, to be queued."""
+        return self.ready.pop(str(sample_id), [])
+
+    def stats(self) -> Dict[str, Any]:
+        """Settled samples, run counts and calls saved against a full study."""
+        run_counts = Counter(len(self.successes.get(sample_id, {})) for sample_id in self.sample_ids)
+        settled = sum(1 for sample_id in self.sample_ids if self.policy.settled(self.runs(sample_id)))
+        return {
+            'settled_samples': settled,
+            'run_counts': dict(sorted(run_counts.items())),
+            'calls_spent': self.spent,
+            'call_budget': self.budget,
+            'extra_runs_dropped': self.dropped,
+        }
@@ -0,0 +1,153 @@
+"""
+Model Cascade
+Decides which samples a cheap model settled and which must be escalated to a
+stronger (scarcer) model, and merges the deciding records of every stage.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+
+# Why a sample was passed on to the next stage
+ESCALATE_NO_RESULT = 'no_result'
+ESCALATE_DISAGREEMENT = 'disagreement'
+ESCALATE_LOW_CONFIDENCE = 'low_confidence'
+
+# A stage given as 'model:terse' asks its model for verdicts without reasoning
+TERSE_STAGE_SUFFIX = ':terse'
+
+
+def parse_stage(stage: str) -> Tuple[str, str]:
+    """
+    Split a cascade stage into its model and response format.
+
+    Args:
+        stage: Model name, optionally followed by TERSE_STAGE_SUFFIX
+
+    Returns:
+        (model name, 'terse' or 'full')
+    """
+    if stage.endswith(TERSE_STAGE_SUFFIX):
+        return stage[:-len(TERSE_STAGE_SUFFIX)], 'terse'
+    return stage, 'full'
+
+
+def group_stage_records(records: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[int, Dict[str, Any]]], Dict[str, set]]:
+    """
+    Index the records of one stage by sample.
+
+    Failed runs are retried on resume, so a run can have an error record
+    followed by a success; the latest successful record of a run wins.
+
+    Args:
+        records: Records loaded from the stage's results file
+
+    Returns:
+        (successful records by sample_id and run_number,
+         run numbers attempted per sample_id, successful or not)
+    """
+    successes: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    attempted: Dict[str, set] = {}
+    for record in records:
+        sample_id = str(record.get('sample_id'))
+        run_number = record.get('run_number')
+        attempted.setdefault(sample_id, set()).add(run_number)
+        if record.get('success'):
+            successes.setdefault(sample_id, {})[run_number] = record
+    return successes, attempted
+
+
+def escalation_reason(runs: List[Dict[str, Any]],
+                      confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> Optional[str]:
+    """
+    Decide whether the runs of one sample settle it.
+
+    Args:
+        runs: Successful records of the sample from one stage
+        confidence_threshold: Minimum mean confidence_score to accept
+
+    Returns:
+        None if the stage decided the sample, otherwise why it is escalated
+    """
+    if not runs:
+        return ESCALATE_NO_RESULT
+    if len({bool(run.get('is_correct')) for run in runs}) > 1:
+        return ESCALATE_DISAGREEMENT
+
+    scores = [run['confidence_score'] for run in runs
+              if isinstance(run.get('confidence_score'), (int, float))]
+    if not scores or sum(scores) / len(scores) < confidence_threshold:
+        return ESCALATE_LOW_CONFIDENCE
+    return None
+
+
+def triage_stage(records: List[Dict[str, Any]], sample_ids: List[str], n_runs: int,
+                 confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                 min_runs: Optional[int] = None
+                 ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str], List[str]]:
+    """
+    Split the samples a stage was given into decided, escalated and pending.
+
+    Samples whose runs were not all attempted yet (e.g. the stage stopped
+    on a quota) are pending: they are neither decided nor escalated, so a
+    later rerun finishes them at this stage before spending a scarcer
+    model on them. With adaptive runs (min_runs given), a sample whose
+    runs already settle it is decided even though it got fewer than n_runs.
+
+    Args:
+        records: Records loaded from the stage's results file
+        sample_ids: Samples sent to this stage
+        n_runs: Runs per sample
+        confidence_threshold: Minimum mean confidence_score to accept
+        min_runs: Fewest runs that can settle a sample when the stage ran
+            with adaptive runs (None: every sample needs n_runs attempts)
+
+    Returns:
+        (successful runs of decided samples, escalation reason per escalated
+         sample, pending sample ids)
+    """
+    successes, attempted = group_stage_records(records)
+    decided: Dict[str, List[Dict[str, Any]]] = {}
+    escalated: Dict[str, str] = {}
+    pending: List[str] = []
+
+    for sample_id in sample_ids:
+        runs = [successes[sample_id][run] for run in sorted(successes.get(sample_id, {}))]
+        reason = escalation_reason(runs, confidence_threshold)
+        settled_early = min_runs is not None and len(runs) >= min_runs and reason is None
+        if len(attempted.get(sample_id, set())) < n_runs and not settled_early:
+            pending.append(sample_id)
+            continue
+        if reason is None:
+            decided[sample_id] = runs
+        else:
+            escalated[sample_id] = reason
+    return decided, escalated, pending
+
+
+def write_decisions(decisions: Dict[str, List[Dict[str, Any]]], output_path: Path) -> int:
+    """
+    Write the deciding records of every sample to one JSONL file.
+
+    The file is rebuilt from the stage files on every cascade run, so it
+    always reflects the latest state of each stage.
+
+    Args:
+        decisions: Deciding records by sample_id (already tagged)
+        output_path: Path of the combined results file
+
+    Returns:
+        Number of records written
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    tmp_path = output_path.with_suffix(output_path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for sample_id in decisions:
+            for record in decisions[sample_id]:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                written += 1
+    tmp_path.replace(output_path)
+    return written
@@ -5,20 +5,78 @@ Main execution logic for running pilot studies with different models and dataset
 
 import os
 import time
+import asyncio
 import pandas as pd
-from typing import Dict, Any, Optional, Set, Tuple
+from dataclasses import replace
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple, Union
 from datetime import datetime
 from pathlib import Path
 
-from ..api.gemini_client import GeminiClient
+from ..api.gemini_client import GeminiClient, RATE_LIMIT_BUFFER
+from ..api.adaptive_rate import ModelLimitsRegistry, RateLimitRegistry
+from ..api.backend import LLMBackend
+from ..api.cassette import CassetteRecorder
+from ..api.key_pool import classify_quota_error, estimate_tokens, seconds_until_quota_reset
+from ..api.retry_policy import classify_error
+from ..api.response_cache import ResponseCache
+from ..api.shared_rate_state import SharedRateState
+from ..data.codebook_index import CodebookIndex, format_hierarchy
 from ..data.data_loader import DataLoader
+from .adaptive_runs import AdaptiveRunPolicy, AdaptiveRunTracker
+from .cascade import (
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    parse_stage,
+    triage_stage,
+    write_decisions,
+)
+from .run_estimator import (
+    CALIBRATION_SAMPLES,
+    measured_averages,
+    project_campaign,
+)
+from .prompt_compiler import PromptCompiler
+from .scheduler import TASK_ESCALATION, TASK_FRESH, TASK_RETRY, Task, TaskScheduler
+from ..utils.resume_index import ResumeIndex
 from ..utils.json_parser import (
     extract_json_from_response, 
+    extract_json_array_from_response,
+    parse_json_response,
+    parse_json_array_response,
+    RESULT_SCHEMA,
+    BATCH_RESULT_SCHEMA,
+    TERSE_RESULT_SCHEMA,
+    TERSE_BATCH_RESULT_SCHEMA,
+    expand_terse_result,
+    is_valid_result,
+    REQUIRED_RESULT_FIELDS,
+    TERSE_RESULT_FIELDS,
     save_result_to_jsonl, 
     load_existing_results,
     calculate_success_rate
 )
 
+# Output token budget per sample when several samples share one request
+BATCH_OUTPUT_TOKENS_PER_SAMPLE = 600
+MAX_BATCH_OUTPUT_TOKENS = 8192
+
+# Terse verdicts carry no reasoning, so a much smaller output budget suffices
+TERSE_MAX_OUTPUT_TOKENS = 256
+TERSE_BATCH_OUTPUT_TOKENS_PER_SAMPLE = 80
+
+# Upper bound the API accepts for candidate_count
+MAX_CANDIDATE_COUNT = 8
+
+PROMPT_LAYOUTS = ('inline', 'split', 'cached')
+RESPONSE_FORMATS = ('full', 'terse')
+
+# Quota handling: park work for one window on minute-level 429s (giving up after
+# MAX_RATE_LIMIT_PARKS parks in a row without a successful call) and optionally
+# sleep through the daily reset
+RATE_LIMIT_PARK_SECONDS = 60
+MAX_RATE_LIMIT_PARKS = 30
+QUOTA_RESET_MARGIN_SECONDS = 120
+DAILY_QUOTA_POLICIES = ('stop', 'wait')
+
 
 class PilotRunner:
     """Main class for running pilot studies."""
@@ -37,11 +95,127 @@ class PilotRunner:
             self.project_root = Path(project_root)
         
         self.data_loader = DataLoader(str(self.project_root))
+        # Renders every prompt of a dataset before the first request (set
+        # prompt_compiler.cache_dir to None to compile without the disk cache)
+        self.prompt_compiler = PromptCompiler(self.default_prompt_cache_dir)
         self.gemini_client = None
+        # Static prompt prefix (system_instruction / context_cache) and output
+        # format (response_schema) sent with every call
+        self.request_options: Dict[str, Any] = {}
+        self.structured_output = False
+        self.response_format = 'full'
+        # Extra fields stamped on every record (e.g. the cascade stage)
+        self.record_tags: Dict[str, Any] = {}
+        # Quota handling state of the current run
+        self.on_daily_quota = 'stop'
+        self._rate_limit_parks = 0  # Parks since the last successful call
+        self._quota_resume_at = 0.0
+        # Scheduling of the current run: priority per task kind and the
+        # runs whose earlier attempt left an error record
+        self.task_priorities: Optional[Dict[str, int]] = None
+        self._failed_runs = ResumeIndex()
+        # Decides the runs of each sample when runs are adaptive
+        self._adaptive: Optional[AdaptiveRunTracker] = None
+    
+    def initialize_api(self, api_key: Optional[str] = None,
+                       cache_path: Optional[str] = None,
+                       adaptive_rate: bool = False,
+                       rate_limits_path: Optional[str] = None,
+                       backend: Optional[LLMBackend] = None,
+                       request_timeout: Optional[float] = None,
+                       hedge: bool = False,
+                       record_path: Optional[str] = None,
+                       shared_rate_path: Optional[str] = None,
+                       model_limits_path: Optional[str] = None) -> None:
+        """
+        Initialize the Gemini API client.
+        
+        Args:
+            api_key: Gemini API key (if None, reads from environment)
+            cache_path: SQLite response cache to consult before each call
+                (if None, every call goes to the API)
+            adaptive_rate: Learn the sustainable request rate from 429s
+            rate_limits_path: JSON registry of learned rates (default:
+                data/output/cache/rate_limits.json when adaptive_rate is set)
+            backend: Transport to use instead of the Gemini SDK (the offline
+                fake, or an OpenAI-compatible local server)
+            request_timeout: Deadline in seconds for a single API call
+            hedge: Send a duplicate of calls that run past the p95 latency
+                (concurrent runs only)
+            record_path: Cassette (.jsonl.gz) to record every raw response
+                to, for replay with CassetteBackend
+            shared_rate_path: SQLite file holding rate-limit state shared by
+                every process on this host (None = pace this process alone)
+            model_limits_path: Limits measured by the throughput probe (default:
+                data/output/cache/model_limits.json, used when it exists)
+        """
+        cache = ResponseCache(cache_path) if cache_path else None
+        registry = None
+        if adaptive_rate:
+            registry = RateLimitRegistry(rate_limits_path or str(self.default_rate_limits_path))
+        recorder = CassetteRecorder(record_path) if record_path else None
+        shared_rate_state = SharedRateState(shared_rate_path) if shared_rate_path else None
+        self.gemini_client = GeminiClient(
+            api_key=api_key, cache=cache, adaptive_rate=adaptive_rate, rate_registry=registry,
+            backend=backend, request_timeout=request_timeout, hedge=hedge, recorder=recorder,
+            shared_rate_state=shared_rate_state
+        )
+        
+        limits_path = Path(model_limits_path or self.default_model_limits_path)
+        if limits_path.exists():
+            applied = self.gemini_client.apply_model_limits(ModelLimitsRegistry(str(limits_path)))
+            for model_name, limits in applied.items():
+                print(f"📏 {model_name}: pacing to probed {limits['rpm']:g} RPM ({limits_path.name})")
+    
+    @property
+    def result_parser(self) -> Callable[[str], Dict[str, Any]]:
+        """Parser for single-verdict responses in the current output mode."""
+        parser = parse_json_response if self.structured_output else extract_json_from_response
+        if self.response_format == 'terse':
+            return lambda text: expand_terse_result(parser(text))
+        return parser
+    
+    @property
+    def batch_parser(self) -> Callable[[str], List[Dict[str, Any]]]:
+        """Parser for batched responses in the current output mode."""
+        return parse_json_array_response if self.structured_output else extract_json_array_from_response
+    
+    def _batch_options(self) -> Dict[str, Any]:
+        """Request options of batched calls (always inline, array schema)."""
+        if not self.structured_output:
+            return {}
+        return {'response_schema': TERSE_BATCH_RESULT_SCHEMA if self.response_format == 'terse'
+                else BATCH_RESULT_SCHEMA}
+    
+    @property
+    def required_fields(self) -> Tuple[str, ...]:
+        """Fields a verdict must carry in the current response format."""
+        return TERSE_RESULT_FIELDS if self.response_format == 'terse' else REQUIRED_RESULT_FIELDS
+    
+    @property
+    def default_cache_path(self) -> Path:
+        """Default location of the on-disk response cache."""
+        return self.project_root / "data" / "output" / "cache" / "llm_responses.sqlite"
+    
+    @property
+    def default_model_limits_path(self) -> Path:
+        """Default location of the limits measured by the throughput probe."""
+        return self.project_root / "data" / "output" / "cache" / "model_limits.json"
+    
+    @property
+    def default_shared_rate_path(self) -> Path:
+        """Default location of the rate-limit state shared between processes."""
+        return self.project_root / "data" / "output" / "cache" / "rate_state.sqlite"
     
-    def initialize_api(self, api_key: Optional[str] = None) -> None:
-        """Initialize the Gemini API client."""
-        self.gemini_client = GeminiClient(api_key=api_key)
+    @property
+    def default_rate_limits_path(self) -> Path:
+        """Default location of the learned rate limit registry."""
+        return self.project_root / "data" / "output" / "cache" / "rate_limits.json"
+    
+    @property
+    def default_prompt_cache_dir(self) -> Path:
+        """Default location of the compiled prompt cache."""
+        return self.project_root / "data" / "output" / "cache" / "prompts"
     
     def format_hierarchy(self, row: pd.Series) -> str:
         """
@@ -53,44 +227,42 @@ class PilotRunner:
         Returns:
             Formatted hierarchy string
         """
-        hierarchy_lines = [
-            f"- Section {row['code_1']}: {row['title_1']}",
-            f"- Division {row['code_2']}: {row['title_2']}",
-            f"- Group {row['code_3']}: {row['title_3']}",
-            f"- Class {row['code_4']}: {row['title_4']}",
-            f"- Sub-Class {row['code_5']}: {row['title_5']}"
-        ]
-        
-        # Add description if available
-        if pd.notna(row['desc_5']) and row['desc_5'].strip():
-            hierarchy_lines.append(f"- Description: {row['desc_5']}")
+        return format_hierarchy(row)
+    
+    def get_hierarchy_context(self, code: str,
+                              codebook: Union[pd.DataFrame, CodebookIndex]) -> Optional[str]:
+        """
+        Look up the precomputed hierarchy of a code.
         
-        return "\n".join(hierarchy_lines)
+        Args:
+            code: The 5-digit KBLI code
+            codebook: The hierarchical codebook DataFrame, or an index of it
+                (a DataFrame is indexed once and the index reused)
+            
+        Returns:
+            Formatted hierarchy string or None if code not found
+        """
+        return self.data_loader.codebook_index(codebook).hierarchy(code)
     
     def build_prompt_for_sample(self, template: str, sample: pd.Series, 
-                               codebook: pd.DataFrame) -> Optional[str]:
+                               codebook: Union[pd.DataFrame, CodebookIndex]) -> Optional[str]:
         """
         Build the prompt for a specific sample.
         
         Args:
             template: The master prompt template
             sample: A row from the test dataset
-            codebook: The hierarchical codebook DataFrame
+            codebook: The hierarchical codebook DataFrame, or an index of it
             
         Returns:
             Formatted prompt string or None if code not found
         """
         code_to_check = str(sample['kbli_code'])
+        hierarchy_context = self.get_hierarchy_context(code_to_check, codebook)
         
-        # Find the row in our prepared hierarchical codebook
-        rule_rows = codebook[codebook['code_5'] == code_to_check]
-        
-        if rule_rows.empty:
+        if hierarchy_context is None:
             return None
         
-        rule_row = rule_rows.iloc[0]
-        hierarchy_context = self.format_hierarchy(rule_row)
-        
         # Inject all data into the prompt template
         final_prompt = template.replace("{job_description}", str(sample['text']))
         final_prompt = final_prompt.replace("{code_to_check}", code_to_check)
@@ -98,9 +270,87 @@ class PilotRunner:
         
         return final_prompt
     
+    def compile_prompts(self, template: str, dataset: pd.DataFrame, test_data: pd.DataFrame,
+                        codebook: CodebookIndex) -> pd.DataFrame:
+        """
+        Render the prompts of a dataset up front and attach them to the samples to run.
+        
+        The whole dataset is compiled (or read from the prompt cache), so
+        runs on different subsets of it share one cache file. Samples whose
+        code is not in the codebook are reported once here and dropped.
+        
+        Args:
+            template: The per-sample prompt template
+            dataset: The full dataset as loaded
+            test_data: The rows of it to process
+            codebook: Index of the hierarchical codebook
+            
+        Returns:
+            The processable rows of test_data with their prompt in a 'prompt' column
+        """
+        compiled = self.prompt_compiler.compile(template, dataset, codebook)
+        source = "read from cache" if compiled.from_cache else "compiled"
+        print(f"🧩 {len(dataset):,} prompts {source} in {compiled.seconds:.2f}s"
+              + (f" ({compiled.cache_path.name})" if compiled.cache_path is not None else ""))
+        
+        selected, unmatched = compiled.select(test_data)
+        if unmatched:
+            skipped = sum(unmatched.values())
+            listed = ", ".join(f"{code} ({count})" for code, count in list(unmatched.items())[:10])
+            more = f" and {len(unmatched) - 10} more" if len(unmatched) > 10 else ""
+            print(f"⚠️  Skipping {skipped} samples whose {len(unmatched)} codes are not in the codebook: "
+                  f"{listed}{more}")
+        return selected
+    
+    def build_codebook_reference(self, codebook: Union[pd.DataFrame, CodebookIndex]) -> str:
+        """
+        Format the whole hierarchical codebook as one reference document.
+        
+        Used as static context when the codebook is held in a context cache,
+        so per-sample prompts only need to name the code to check.
+        
+        Args:
+            codebook: The hierarchical codebook DataFrame, or an index of it
+            
+        Returns:
+            All code hierarchies, one block per 5-digit code
+        """
+        blocks = [
+            f"### KBLI {code}\n{hierarchy}"
+            for code, hierarchy in self.data_loader.codebook_index(codebook).hierarchies()
+        ]
+        return "# KBLI CODEBOOK REFERENCE\n\n" + "\n\n".join(blocks)
+    
+    def build_batch_prompt(self, template: str, samples: List[Tuple[str, pd.Series]],
+                           codebook: Union[pd.DataFrame, CodebookIndex]) -> str:
+        """
+        Build one prompt that asks for verdicts on several samples at once.
+        
+        Args:
+            template: The batch prompt template with a {samples_block} placeholder
+            samples: (sample_id, sample) pairs whose codes are in the codebook
+            codebook: The hierarchical codebook DataFrame, or an index of it
+            
+        Returns:
+            Formatted batch prompt string
+        """
+        blocks = []
+        for sample_id, sample in samples:
+            code_to_check = str(sample['kbli_code'])
+            hierarchy_context = self.get_hierarchy_context(code_to_check, codebook)
+            blocks.append(
+                f"### SAMPLE sample_id={sample_id}\n"
+                f"KBLI code to check: {code_to_check}\n"
+                f"Hierarchical context for code {code_to_check}:\n{hierarchy_context}\n"
+                f"Job description: \"{sample['text']}\""
+            )
+        
+        return template.replace("{samples_block}", "\n\n".join(blocks))
+    
     def add_metadata_to_result(self, result: Dict[str, Any], sample: pd.Series, 
                               run_number: int, model_name: str, 
-                              processing_time: float) -> Dict[str, Any]:
+                              processing_time: float,
+                              usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Add metadata to the parsed result for later analysis.
         
@@ -110,6 +360,8 @@ class PilotRunner:
             run_number: Which run this is (1 to N_RUNS)
             model_name: Name of the model used
             processing_time: Time taken for this API call
+            usage: Token counts of the call (prompt_tokens, output_tokens, cache_hit,
+                hedged), its api_latency_seconds and retry_count
             
         Returns:
             Result dictionary with added metadata
@@ -127,9 +379,20 @@ class PilotRunner:
             'dataset_name': sample.get('dataset_name', 'unknown.csv'),
             'timestamp': datetime.now().isoformat(),
             'processing_time_seconds': processing_time,
+            'response_format': self.response_format,
             'success': True
         }
         
+        if usage is not None:
+            metadata['prompt_tokens'] = usage.get('prompt_tokens', 0)
+            metadata['output_tokens'] = usage.get('output_tokens', 0)
+            metadata['cache_hit'] = usage.get('cache_hit', False)
+            metadata['retry_count'] = usage.get('retry_count', 0)
+            metadata['api_latency_seconds'] = usage.get('api_latency_seconds', 0.0)
+            if usage.get('hedged'):
+                metadata['hedged'] = True
+        metadata.update(self.record_tags)
+        
         # Add UUID creation timestamp if available
         if 'id_created_at' in sample:
             metadata['sample_id_created_at'] = str(sample['id_created_at'])
@@ -137,7 +400,8 @@ class PilotRunner:
         return {**metadata, **result}
     
     def create_error_record(self, sample: pd.Series, error: Exception, 
-                           run_number: int, model_name: str) -> Dict[str, Any]:
+                           run_number: int, model_name: str,
+                           usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Create an error record when API call fails.
         
@@ -146,6 +410,7 @@ class PilotRunner:
             error: The exception that occurred
             run_number: Which run this is
             model_name: Name of the model used
+            usage: Usage dict of the failed call (for its retry_count)
             
         Returns:
             Error record dictionary
@@ -162,14 +427,18 @@ class PilotRunner:
             'model_name': model_name,
             'dataset_name': sample.get('dataset_name', 'unknown.csv'),
             'timestamp': datetime.now().isoformat(),
+            'response_format': self.response_format,
             'success': False,
             'error_type': type(error).__name__,
+            'error_category': classify_error(error).value,
             'error_message': str(error),
+            'retry_count': (usage or {}).get('retry_count', 0),
             'is_correct': None,
             'confidence_score': None,
             'reasoning': None,
             'alternative_codes': [],
-            'alternative_reasoning': None
+            'alternative_reasoning': None,
+            **self.record_tags
         }
         
         # Add UUID creation timestamp if available
@@ -178,9 +447,212 @@ class PilotRunner:
         
         return error_record
     
+    @property
+    def codebook_path(self) -> Path:
+        """Location of the prepared hierarchical codebook."""
+        return self.project_root / "data" / "output" / "kbli_codebook_hierarchical.csv"
+    
+    def get_output_path(self, model_name: str, dataset_filename: str,
+                        output_dir: Optional[str] = None,
+                        response_format: str = 'full') -> Path:
+        """
+        Results file of a model and dataset.
+        
+        Args:
+            model_name: Name of the Gemini model
+            dataset_filename: Name of the dataset file
+            output_dir: Custom output directory
+            response_format: 'terse' results get their own file, so resuming
+                a full run never counts terse verdicts as done
+            
+        Returns:
+            Path of the JSONL results file
+        """
+        model_safe_name = model_name.replace('/', '_').replace('-', '_')
+        dataset_safe_name = os.path.splitext(dataset_filename)[0]
+        format_suffix = "_terse" if response_format == 'terse' else ""
+        output_filename = f"{model_safe_name}_{dataset_safe_name}{format_suffix}.jsonl"
+        
+        if output_dir:
+            return Path(output_dir) / output_filename
+        
+        # Save to pilot_results_models subdirectory for better organization
+        pilot_results_dir = self.project_root / "data" / "output" / "pilot_results_models"
+        pilot_results_dir.mkdir(exist_ok=True)  # Ensure directory exists
+        return pilot_results_dir / output_filename
+    
+    def prompt_path(self, name: str, response_format: str = 'full') -> Path:
+        """
+        Location of a prompt template in the given response format.
+        
+        Args:
+            name: Template name without extension (e.g. 'master_prompt')
+            response_format: 'full' or 'terse' (the '_terse' variant)
+            
+        Returns:
+            Path of the template file
+        """
+        suffix = "_terse" if response_format == 'terse' else ""
+        return self.project_root / "prompts" / f"{name}{suffix}.txt"
+    
+    def load_prompt_templates(self, prompt_layout: str = 'inline',
+                              response_format: str = 'full') -> Tuple[str, Optional[str]]:
+        """
+        Load the per-sample template and static system prompt of a layout.
+        
+        Args:
+            prompt_layout: 'inline', 'split' or 'cached'
+            response_format: 'full' asks for reasoning with every verdict,
+                'terse' only for is_correct, confidence_score and alternative_codes
+            
+        Returns:
+            Tuple of (per-sample template, system prompt or None for 'inline')
+        """
+        if prompt_layout == 'inline':
+            return self.data_loader.load_master_template(
+                str(self.prompt_path("master_prompt", response_format))
+            ), None
+        
+        # The per-sample part is the same in both formats; the format lives in the system prompt
+        sample_template = self.data_loader.load_master_template(str(self.prompt_path("sample_prompt")))
+        system_prompt = self.data_loader.load_master_template(
+            str(self.prompt_path("system_prompt", response_format))
+        )
+        return sample_template, system_prompt
+    
+    def estimate_pilot_study(self, model_name: str, dataset_filename: str,
+                             n_runs: int = 3, output_dir: Optional[str] = None,
+                             concurrency: int = 1, batch_size: int = 1,
+                             multi_candidate: bool = False, prompt_layout: str = 'inline',
+                             use_tokenizer: bool = True,
+                             response_format: str = 'full') -> Dict[str, Any]:
+        """
+        Dry run: build every pending prompt and project tokens, cost and time.
+        
+        Nothing is sent to the generation endpoint. Input tokens are counted
+        offline with a chars-per-token estimate; with use_tokenizer, a few
+        prompts are first sent to the API's count_tokens endpoint to
+        calibrate that estimate. Output tokens and latency come from earlier
+        records of the same results file when available.
+        
+        Args:
+            model_name: Name of the Gemini model to use
+            dataset_filename: Name of the dataset file
+            n_runs: Number of runs per sample
+            output_dir: Custom output directory (used to find completed runs)
+            concurrency: Maximum number of requests in flight
+            batch_size: Samples packed into one request
+            multi_candidate: Whether runs of a sample share one request
+            prompt_layout: 'inline', 'split' or 'cached'
+            use_tokenizer: Calibrate the estimate with the API's count_tokens
+            response_format: 'full' or 'terse' (output tokens are measured
+                from earlier results of the same format)
+            
+        Returns:
+            Dictionary with request count, token totals, cost and projected time
+        """
+        if use_tokenizer and self.gemini_client is None:
+            self.initialize_api()
+        if self.gemini_client is not None:
+            model_config = self.gemini_client.get_model_config(model_name)
+        else:
+            model_config = GeminiClient.get_available_models().get(model_name)
+        if model_config is None:
+            raise ValueError(f"Model {model_name} not available. Use get_available_models() to see options.")
+        
+        print(f"🧮 Estimating pilot study for {model_name} on {dataset_filename}")
+        codebook = self.data_loader.load_codebook_index(str(self.codebook_path))
+        dataset = self.data_loader.load_test_data(dataset_filename)
+        master_template, system_prompt = self.load_prompt_templates(prompt_layout, response_format)
+        test_data = self.compile_prompts(master_template, dataset, dataset, codebook)
+        existing_results, completed_runs = load_existing_results(
+            str(self.get_output_path(model_name, dataset_filename, output_dir, response_format))
+        )
+        
+        # (prompt, results produced by the request) for every pending request
+        requests: List[Tuple[str, int]] = []
+        pending_by_run: Dict[int, List[Tuple[str, pd.Series]]] = {}
+        for idx, (_, sample) in enumerate(test_data.iterrows()):
+            sample_id = str(sample.get('sample_id', f"row_{idx}"))
+            prompt = sample['prompt']
+            
+            remaining_runs = self._get_remaining_runs(sample_id, completed_runs, n_runs)
+            if batch_size > 1:
+                for run_num in remaining_runs:
+                    pending_by_run.setdefault(run_num, []).append((sample_id, sample))
+            elif multi_candidate:
+                for start in range(0, len(remaining_runs), MAX_CANDIDATE_COUNT):
+                    requests.append((prompt, len(remaining_runs[start:start + MAX_CANDIDATE_COUNT])))
+            else:
+                requests.extend((prompt, 1) for _ in remaining_runs)
+        
+        if pending_by_run:
+            batch_template = self.data_loader.load_master_template(
+                str(self.prompt_path("batch_prompt", response_format))
+            )
+            system_prompt = None  # Batch prompts carry their own instructions
+            for run_num in sorted(pending_by_run):
+                items = pending_by_run[run_num]
+                for start in range(0, len(items), batch_size):
+                    batch = items[start:start + batch_size]
+                    requests.append((self.build_batch_prompt(batch_template, batch, codebook), len(batch)))
+        
+        # Offline estimate, optionally calibrated against the API tokenizer
+        tokens_per_estimate = 1.0
+        token_source = "offline"
+        if use_tokenizer and requests:
+            calibration = [prompt for prompt, _ in requests[:CALIBRATION_SAMPLES]]
+            try:
+                counted = sum(
+                    self.gemini_client.count_tokens(prompt, model_name, system_prompt)
+                    for prompt in calibration
+                )
+                estimated = sum(
+                    estimate_tokens(prompt) + (estimate_tokens(system_prompt) if system_prompt else 0)
+                    for prompt in calibration
+                )
+                tokens_per_estimate = counted / estimated
+                token_source = f"offline, calibrated with count_tokens on {len(calibration)} prompts"
+            except Exception as e:
+                print(f"⚠️  count_tokens failed ({type(e).__name__}), using the offline estimate")
+        
+        prefix_tokens = estimate_tokens(system_prompt) if system_prompt else 0
+        input_tokens = int(sum(
+            (estimate_tokens(prompt) + prefix_tokens) * tokens_per_estimate for prompt, _ in requests
+        ))
+        
+        averages = measured_averages(existing_results)
+        pending_runs = sum(results for _, results in requests)
+        output_tokens = int(pending_runs * averages['output_tokens'])
+        n_keys = len(self.gemini_client.key_pool) if self.gemini_client is not None else 1
+        
+        estimate = project_campaign(
+            len(requests), input_tokens, output_tokens, model_config, n_keys=n_keys,
+            concurrency=concurrency, latency_seconds=averages['latency_seconds'],
+            rate_buffer=RATE_LIMIT_BUFFER
+        )
+        estimate.update({
+            'model_name': model_name,
+            'dataset': dataset_filename,
+            'pending_runs': pending_runs,
+            'output_tokens_per_result': averages['output_tokens'],
+            'token_source': token_source,
+        })
+        return estimate
+    
     def run_pilot_study(self, model_name: str, dataset_filename: str, 
                        n_runs: int = 3, temperature: float = 0.7,
-                       output_dir: Optional[str] = None) -> Dict[str, Any]:
+                       output_dir: Optional[str] = None,
+                       concurrency: int = 1, batch_size: int = 1,
+                       multi_candidate: bool = False, prompt_layout: str = 'inline',
+                       cache_hierarchy: bool = False,
+                       on_daily_quota: str = 'stop',
+                       max_samples: Optional[int] = None,
+                       structured_output: bool = False,
+                       sample_ids: Optional[Set[str]] = None,
+                       response_format: str = 'full',
+                       task_priorities: Optional[Dict[str, int]] = None,
+                       adaptive_runs: Optional[AdaptiveRunPolicy] = None) -> Dict[str, Any]:
         """
         Run the complete pilot study.
         
@@ -190,10 +662,57 @@ class PilotRunner:
             n_runs: Number of runs per sample
             temperature: Temperature for generation
             output_dir: Custom output directory
+            concurrency: Maximum number of requests in flight (1 = serial loop)
+            batch_size: Samples packed into one request (1 = one request per run)
+            multi_candidate: Get all remaining runs of a sample from one request
+                using candidate_count instead of one request per run
+            prompt_layout: 'inline' sends the full master prompt every time,
+                'split' sends the static instructions as a system instruction,
+                'cached' registers them in an API context cache
+            cache_hierarchy: With the 'cached' layout, also cache the whole
+                codebook so per-sample prompts only carry the code and text
+            on_daily_quota: What to do once every key has used up its daily
+                quota: 'stop' (resume manually later) or 'wait' (sleep until
+                the quota resets and carry on)
+            max_samples: Only process the first N samples of the dataset
+            structured_output: Ask the API for bare JSON matching the verdict
+                schema (response_mime_type='application/json') and parse it
+                directly instead of searching the text for JSON
+            sample_ids: Only process these samples (after max_samples)
+            response_format: 'full' asks for reasoning with every verdict;
+                'terse' only for is_correct, confidence_score and
+                alternative_codes, with a smaller output budget, and writes
+                to its own results file
+            task_priorities: Priority per task kind ('fresh', 'retry',
+                'escalation'; lower runs first). Within a priority, pending
+                runs go out by run number, so every sample gets its first
+                run before any sample gets its second
+            adaptive_runs: Stop issuing runs for a sample once its runs
+                settle it (see AdaptiveRunPolicy) and spend the calls saved
+                on extra runs, up to max_runs, for samples whose runs
+                disagree. n_runs then sets the call budget, not the runs
+                of every sample. Serial and concurrent modes only
             
         Returns:
             Dictionary with execution statistics
         """
+        if batch_size > 1 and multi_candidate:
+            raise ValueError("batch_size > 1 and multi_candidate cannot be combined")
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"prompt_layout must be one of {', '.join(PROMPT_LAYOUTS)}")
+        if on_daily_quota not in DAILY_QUOTA_POLICIES:
+            raise ValueError(f"on_daily_quota must be one of {', '.join(DAILY_QUOTA_POLICIES)}")
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"response_format must be one of {', '.join(RESPONSE_FORMATS)}")
+        if adaptive_runs is not None and (batch_size > 1 or multi_candidate):
+            raise ValueError("adaptive_runs needs one request per run (no batch_size > 1 or multi_candidate)")
+        self.on_daily_quota = on_daily_quota
+        self._rate_limit_parks = 0
+        self._quota_resume_at = 0.0
+        self.structured_output = structured_output
+        self.response_format = response_format
+        self.task_priorities = task_priorities
+        
         if self.gemini_client is None:
             self.initialize_api()
         
@@ -202,44 +721,96 @@ class PilotRunner:
         print(f"Dataset: {dataset_filename}")
         print(f"Runs per sample: {n_runs}")
         print(f"Temperature: {temperature}")
+        print(f"Concurrency: {concurrency} request(s) in flight")
+        if batch_size > 1:
+            print(f"Batch size: {batch_size} samples per request")
+        if multi_candidate:
+            print(f"Multi-candidate: all runs of a sample from one request")
+        print(f"Prompt layout: {prompt_layout}")
+        if structured_output:
+            print(f"Output: structured JSON (response schema)")
+        if response_format == 'terse':
+            print(f"Response format: terse (no reasoning, max {TERSE_MAX_OUTPUT_TOKENS} output tokens)")
+        if adaptive_runs is not None:
+            print(f"Adaptive runs: stop once {adaptive_runs.min_runs}+ runs agree with mean confidence "
+                  f">= {adaptive_runs.confidence_threshold}, up to {adaptive_runs.max_runs_for(n_runs)} runs "
+                  f"for disagreeing samples within {n_runs} calls per sample")
+        if task_priorities:
+            print(f"Task priorities: " + ", ".join(f"{kind}={priority}" for kind, priority in task_priorities.items()))
         
         # Show rate limiting info
-        available_models = self.gemini_client.get_available_models()
-        rpm_limit = available_models.get(model_name, {}).get("rpm", 15)
+        rpm_limit = self.gemini_client.get_model_config(model_name).get("rpm", 15)
         rate_delay = self.gemini_client.get_rate_limit_delay(model_name)
         
-        print(f"Rate limit: {rpm_limit} requests per minute")
-        print(f"Delay between requests: {rate_delay:.1f} seconds")
+        print(f"Rate limit: {rpm_limit} requests per minute per key (shared token bucket)")
+        if self.gemini_client.key_pool.adaptive:
+            print(f"Adaptive rate: AIMD, starting from learned rates where available")
+        if self.gemini_client.key_pool.shared_state is not None:
+            print(f"Shared rate limits: {self.gemini_client.key_pool.shared_state.path} "
+                  f"(budget shared with other processes)")
+        print(f"API keys in pool: {len(self.gemini_client.key_pool)}")
+        print(f"Minimum interval between requests: {rate_delay:.1f} seconds")
         print(f"Estimated time per sample: {rate_delay * n_runs:.1f} seconds")
         
         # Define paths
-        codebook_path = self.project_root / "data" / "output" / "kbli_codebook_hierarchical.csv"
-        template_path = self.project_root / "prompts" / "master_prompt.txt"
-        
-        # Create output filename
-        model_safe_name = model_name.replace('/', '_').replace('-', '_')
-        dataset_safe_name = os.path.splitext(dataset_filename)[0]
-        output_filename = f"{model_safe_name}_{dataset_safe_name}.jsonl"
-        
-        if output_dir:
-            output_path = Path(output_dir) / output_filename
-        else:
-            # Save to pilot_results_models subdirectory for better organization
-            pilot_results_dir = self.project_root / "data" / "output" / "pilot_results_models"
-            pilot_results_dir.mkdir(exist_ok=True)  # Ensure directory exists
-            output_path = pilot_results_dir / output_filename
+        codebook_path = self.codebook_path
+        batch_template_path = self.prompt_path("batch_prompt", response_format)
+        code_only_template_path = self.prompt_path("sample_prompt_code_only")
+        output_path = self.get_output_path(model_name, dataset_filename, output_dir, response_format)
+        record_tags = self.record_tags
         
         try:
             # 1. LOAD RESOURCES
             print("\n📂 Loading resources...")
-            codebook = self.data_loader.load_hierarchical_codebook(str(codebook_path))
-            test_data = self.data_loader.load_test_data(dataset_filename)
+            codebook = self.data_loader.load_codebook_index(str(codebook_path))
+            dataset = self.data_loader.load_test_data(dataset_filename)
+            test_data = dataset
+            if max_samples is not None:
+                test_data = test_data.head(max_samples).copy()
+            if sample_ids is not None:
+                test_data = test_data[test_data['sample_id'].astype(str).isin(sample_ids)].copy()
             test_data['dataset_name'] = dataset_filename
-            master_template = self.data_loader.load_master_template(str(template_path))
+            master_template, system_prompt = self.load_prompt_templates(prompt_layout, response_format)
+            if structured_output:
+                self.request_options['response_schema'] = (
+                    TERSE_RESULT_SCHEMA if response_format == 'terse' else RESULT_SCHEMA
+                )
+            if response_format == 'terse':
+                self.request_options['max_output_tokens'] = TERSE_MAX_OUTPUT_TOKENS
+            if system_prompt is not None:
+                self.request_options['system_instruction'] = system_prompt
+            
+            if prompt_layout == 'cached':
+                contents = [self.build_codebook_reference(codebook)] if cache_hierarchy else None
+                context_cache = self.gemini_client.create_context_cache(
+                    model_name, system_prompt, contents=contents
+                )
+                if context_cache is None:
+                    print("⚠️  Falling back to the 'split' prompt layout")
+                else:
+                    self.request_options.pop('system_instruction', None)
+                    self.request_options['context_cache'] = context_cache
+                    if cache_hierarchy:
+                        master_template = self.data_loader.load_master_template(
+                            str(code_only_template_path)
+                        )
+            
+            test_data = self.compile_prompts(master_template, dataset, test_data, codebook)
             
             # 2. LOAD EXISTING RESULTS FOR RESUMPTION
             print("\n🔄 Checking for existing results...")
             existing_results, completed_runs = load_existing_results(str(output_path))
+            if sample_ids is not None:
+                completed_runs = completed_runs.restrict(sample_ids)
+            self._failed_runs = ResumeIndex(
+                (str(record.get('sample_id')), record.get('run_number'))
+                for record in existing_results if not record.get('success', False)
+            )
+            if adaptive_runs is not None:
+                self._adaptive = AdaptiveRunTracker(
+                    adaptive_runs, n_runs, test_data['sample_id'].astype(str), existing_results
+                )
+                self.record_tags = {**record_tags, 'adaptive_runs': adaptive_runs.metadata(n_runs)}
             
             total_samples = len(test_data)
             total_expected_runs = total_samples * n_runs
@@ -250,98 +821,38 @@ class PilotRunner:
             print(f"Already completed runs: {len(completed_runs)}")
             print(f"Remaining runs: {total_expected_runs - len(completed_runs)}")
             
-            if len(completed_runs) == total_expected_runs:
+            if self._adaptive is None and len(completed_runs) == total_expected_runs:
                 print("🎉 All runs already completed! Nothing to do.")
                 return self._create_execution_stats(
                     total_samples, len(existing_results), 0, 
                     calculate_success_rate(str(output_path)), str(output_path)
                 )
             
-            processed_samples = 0
-            new_results_count = 0
-            
             print(f"\n🔄 Processing samples (resuming from existing results)...")
             
             # 3. ITERATE AND PROCESS
-            resource_exhausted = False
-            for idx, (_, sample) in enumerate(test_data.iterrows()):
-                sample_id = sample.get('sample_id', f"row_{idx}")
-                
-                print(f"\nProcessing sample {idx + 1}/{total_samples}: {sample['kbli_code']} (ID: {sample_id})")
-                
-                prompt = self.build_prompt_for_sample(master_template, sample, codebook)
-                
-                if prompt is None:
-                    print(f"⚠️  Warning: Code {sample['kbli_code']} not in codebook. Skipping.")
-                    continue
-                
-                # Check completed runs for this sample
-                sample_completed_runs = {run_num for (sid, run_num) in completed_runs if sid == sample_id}
-                remaining_runs = [run_num for run_num in range(1, n_runs + 1) if run_num not in sample_completed_runs]
-                
-                if not remaining_runs:
-                    print(f"  ✅ All runs already completed for this sample")
-                    processed_samples += 1
-                    continue
-                
-                print(f"  📋 Need to complete runs: {remaining_runs}")
-                
-                # Run the remaining runs for this sample
-                for run_num in remaining_runs:
-                    if resource_exhausted:
-                        print("⏹️  Stopping further processing due to ResourceExhausted error.")
-                        break
-                    
-                    start_time = time.time()
-                    try:
-                        print(f"  Run {run_num}/{n_runs}...", end=" ")
-                        
-                        raw_response = self.gemini_client.generate_content(
-                            prompt, model_name, temperature
-                        )
-                        parsed_json = extract_json_from_response(raw_response)
-                        processing_time = time.time() - start_time
-                        
-                        full_result = self.add_metadata_to_result(
-                            parsed_json, sample, run_num, model_name, processing_time
-                        )
-                        
-                        if save_result_to_jsonl(full_result, str(output_path)):
-                            completed_runs.add((sample_id, run_num))
-                            new_results_count += 1
-                            print(f"✅ ({processing_time:.1f}s) [Saved]")
-                        else:
-                            print(f"⚠️  ({processing_time:.1f}s) [Save failed]")
-                            
-                    except Exception as e:
-                        processing_time = time.time() - start_time
-                        error_type = type(e).__name__
-                        
-                        if "ResourceExhausted" in str(e) or "429" in str(e) or "quota" in str(e).lower():
-                            print(f"⚠️  Quota exceeded: {str(e)[:80]}...")
-                            print(f"⏹️  Breaking loop due to ResourceExhausted error. No output will be appended for this sample.")
-                            resource_exhausted = True
-                            break
-                        else:
-                            print(f"❌ Error ({error_type}): {str(e)[:50]}...")
-                            error_record = self.create_error_record(sample, e, run_num, model_name)
-                            
-                            if save_result_to_jsonl(error_record, str(output_path)):
-                                new_results_count += 1
-                                print(f"  📝 Error logged and saved (will retry on resume)")
-                    
-                    # Rate-limited delay
-                    print(f"  ⏳ Waiting {rate_delay:.1f}s (rate limit: {rpm_limit} RPM)")
-                    time.sleep(rate_delay)
-                
-                processed_samples += 1
-                
-                if processed_samples % 10 == 0:
-                    total_completed = len(existing_results) + new_results_count
-                    print(f"📊 Progress: {processed_samples}/{total_samples} samples, {total_completed} total results")
-                
-                if resource_exhausted:
-                    break
+            if batch_size > 1:
+                batch_template = self.data_loader.load_master_template(str(batch_template_path))
+                processed_samples, new_results_count = asyncio.run(self._run_batched(
+                    test_data, batch_template, codebook, model_name,
+                    temperature, n_runs, completed_runs, str(output_path),
+                    concurrency, batch_size
+                ))
+            elif multi_candidate:
+                processed_samples, new_results_count = asyncio.run(self._run_multi_candidate(
+                    test_data, model_name, temperature,
+                    n_runs, completed_runs, str(output_path), concurrency
+                ))
+            elif concurrency > 1:
+                processed_samples, new_results_count = asyncio.run(self._run_concurrent(
+                    test_data, model_name, temperature,
+                    n_runs, completed_runs, str(output_path), concurrency
+                ))
+            else:
+                processed_samples, new_results_count = self._run_serial(
+                    test_data, model_name, temperature,
+                    n_runs, completed_runs, str(output_path), len(existing_results)
+                )
             
             # 4. FINAL SUMMARY
             final_success_rate = calculate_success_rate(str(output_path))
@@ -353,13 +864,50 @@ class PilotRunner:
             print(f"Total results in file: {total_completed}")
             print(f"Success rate: {final_success_rate:.1%}")
             print(f"Results saved to: {output_path}")
+            if self._adaptive is not None:
+                adaptive_stats = self._adaptive.stats()
+                run_counts = ", ".join(f"{count} with {runs}" for runs, count in adaptive_stats['run_counts'].items())
+                print(f"🎯 Adaptive runs: {adaptive_stats['settled_samples']}/{total_samples} samples settled; "
+                      f"samples by successful runs: {run_counts}")
+                print(f"   Calls: {adaptive_stats['calls_spent']} of a {adaptive_stats['call_budget']}-call budget "
+                      f"({1 - adaptive_stats['calls_spent'] / max(1, adaptive_stats['call_budget']):.0%} saved)")
+            if self.gemini_client.cache is not None:
+                cache_stats = self.gemini_client.cache.stats()
+                print(f"💾 Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                      f"({cache_stats['entries']} entries, {cache_stats['size_mb']:.1f} MB)")
+            if len(self.gemini_client.key_pool) > 1 or self.gemini_client.key_pool.adaptive:
+                print(f"\n🔑 Key usage:")
+                for key_stats in self.gemini_client.key_pool.stats():
+                    learned = "".join(
+                        f", {rpm:.1f} RPM learned" for rpm in key_stats['learned_rpm'].values()
+                    )
+                    print(f"  {key_stats['key']}: {key_stats['total_requests']} requests, "
+                          f"{key_stats['total_tokens']:,} tokens{learned}")
+            request_stats = self.gemini_client.request_stats
+            if any(request_stats.values()):
+                p95 = self.gemini_client.latency.percentile(model_name, 0.95)
+                print(f"\n⏱️  Requests: {request_stats['timeouts']} timed out, "
+                      f"{request_stats['hedges_fired']} hedged ({request_stats['hedges_won']} hedges won), "
+                      f"{request_stats['cancelled']} cancelled"
+                      + (f", p95 latency {p95:.1f}s" if p95 is not None else ""))
+            retry_stats = self.gemini_client.retry_policy.stats
+            failures = {category: count for category, count in retry_stats.items() if count}
+            if failures:
+                print(f"🔁 Failed attempts by category: "
+                      + ", ".join(f"{category} {count}" for category, count in failures.items()))
+            recorder = self.gemini_client.recorder
+            if recorder is not None:
+                print(f"🎞️  Recorded {recorder.recorded} responses to {recorder.path}")
             print(f"\n💡 Note: Results are saved in JSONL format (one JSON per line)")
             print(f"💡 To resume if interrupted, just run this script again!")
             
-            return self._create_execution_stats(
+            stats = self._create_execution_stats(
                 processed_samples, total_completed, new_results_count,
                 final_success_rate, str(output_path)
             )
+            if self._adaptive is not None:
+                stats['adaptive_runs'] = self._adaptive.stats()
+            return stats
             
         except KeyboardInterrupt:
             print(f"\n\n⏸️  Process interrupted by user")
@@ -372,6 +920,741 @@ class PilotRunner:
             print(f"📂 Partial results (if any) saved to: {output_path}")
             print(f"🔄 To resume, run this script again after fixing the error")
             raise
+        
+        finally:
+            self.gemini_client.key_pool.save_learned_rates()
+            if self.gemini_client.recorder is not None:
+                self.gemini_client.recorder.close()
+            context_cache = self.request_options.get('context_cache')
+            if context_cache is not None:
+                self.gemini_client.delete_context_cache(context_cache)
+            self.request_options = {}
+            self.structured_output = False
+            self.response_format = 'full'
+            self.task_priorities = None
+            self._failed_runs = ResumeIndex()
+            self._adaptive = None
+            self.record_tags = record_tags
+    
+    def run_cascade(self, models: List[str], dataset_filename: str,
+                    n_runs: int = 3, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                    output_dir: Optional[str] = None,
+                    max_samples: Optional[int] = None,
+                    **run_options: Any) -> Dict[str, Any]:
+        """
+        Label with the cheapest model first and escalate only the hard samples.
+        
+        Every sample is labelled by models[0]. A sample moves on to the next
+        model when its runs disagree on is_correct or their mean
+        confidence_score is below the threshold; the last model decides
+        whatever reaches it. Each stage keeps its own resumable results file
+        and the deciding records of all stages are merged into one file,
+        tagged with the stage and model that decided them.
+        
+        A stage given as 'model:terse' asks for verdicts without reasoning,
+        so ['flash:terse', 'flash'] explains only the hard samples.
+        
+        Args:
+            models: Stages ordered from fastest/cheapest to strongest
+            dataset_filename: Name of the dataset file
+            n_runs: Number of runs per sample at every stage
+            confidence_threshold: Minimum mean confidence_score a stage
+                needs to settle a sample
+            output_dir: Custom output directory
+            max_samples: Only process the first N samples of the dataset
+            **run_options: Further options of run_pilot_study (temperature,
+                concurrency, batch_size, prompt_layout, ...)
+        
+        Returns:
+            Dictionary with per-stage statistics and the merged results path
+        """
+        if not models:
+            raise ValueError("A cascade needs at least one model")
+        
+        dataset_safe_name = os.path.splitext(dataset_filename)[0]
+        if output_dir:
+            cascade_dir = Path(output_dir) / f"cascade_{dataset_safe_name}"
+        else:
+            cascade_dir = self.project_root / "data" / "output" / "pilot_results_models" / f"cascade_{dataset_safe_name}"
+        decisions_path = cascade_dir / f"cascade_{dataset_safe_name}.jsonl"
+        
+        stages = [parse_stage(stage) for stage in models]
+        print("🪜 Model cascade: " + " → ".join(models))
+        print(f"Escalate on: disagreement between runs or mean confidence < {confidence_threshold}")
+        
+        test_data = self.data_loader.load_test_data(dataset_filename)
+        if max_samples is not None:
+            test_data = test_data.head(max_samples)
+        sample_ids = set(test_data['sample_id'].astype(str))
+        
+        decisions: Dict[str, List[Dict[str, Any]]] = {}
+        reasons: Dict[str, List[str]] = {}
+        stage_stats: List[Dict[str, Any]] = []
+        
+        try:
+            for stage, (model_name, response_format) in enumerate(stages):
+                if not sample_ids:
+                    break
+                
+                print(f"\n{'=' * 60}")
+                print(f"🪜 Cascade stage {stage}: {models[stage]} "
+                      f"({len(sample_ids)} {'samples' if stage == 0 else 'escalated samples'})")
+                print(f"{'=' * 60}")
+                self.record_tags = {'cascade_stage': stage}
+                self.run_pilot_study(
+                    model_name, dataset_filename, n_runs=n_runs, output_dir=str(cascade_dir),
+                    max_samples=max_samples, sample_ids=None if stage == 0 else sample_ids,
+                    response_format=response_format, **run_options
+                )
+                
+                stage_path = self.get_output_path(
+                    model_name, dataset_filename, str(cascade_dir), response_format
+                )
+                records, _ = load_existing_results(str(stage_path))
+                adaptive_runs = run_options.get('adaptive_runs')
+                decided, escalated, pending = triage_stage(
+                    records, sorted(sample_ids), n_runs, confidence_threshold,
+                    min_runs=adaptive_runs.min_runs if adaptive_runs is not None else None
+                )
+                
+                is_last = stage == len(models) - 1
+                resolved = {sample_id: True for sample_id in decided}
+                if is_last:
+                    # Nothing left to escalate to: the last model has the final word
+                    for sample_id, reason in escalated.items():
+                        reasons.setdefault(sample_id, []).append(reason)
+                        decided[sample_id] = [record for record in records if record.get('success')
+                                              and str(record.get('sample_id')) == sample_id]
+                        resolved[sample_id] = False
+                
+                for sample_id, runs in decided.items():
+                    decisions[sample_id] = [{
+                        **record,
+                        'decided_by_stage': stage,
+                        'decided_by_model': model_name,
+                        'escalation_reasons': reasons.get(sample_id, []),
+                        'cascade_resolved': resolved[sample_id],
+                    } for record in runs]
+                
+                stage_stats.append({
+                    'stage': stage,
+                    'model_name': model_name,
+                    'response_format': response_format,
+                    'samples': len(sample_ids),
+                    'decided': len(decided) - (len(escalated) if is_last else 0),
+                    'escalated': 0 if is_last else len(escalated),
+                    'unresolved': len(escalated) if is_last else 0,
+                    'pending': len(pending),
+                })
+                print(f"\n🪜 Stage {stage} ({models[stage]}): {stage_stats[-1]['decided']} decided, "
+                      + (f"{len(escalated)} unresolved" if is_last else f"{len(escalated)} escalated")
+                      + (f", {len(pending)} pending (rerun to finish them)" if pending else ""))
+                
+                if not is_last:
+                    for sample_id, reason in escalated.items():
+                        reasons.setdefault(sample_id, []).append(reason)
+                    sample_ids = set(escalated)
+        finally:
+            self.record_tags = {}
+        
+        written = write_decisions(decisions, decisions_path)
+        print(f"\n🎉 Cascade complete!")
+        for stats in stage_stats:
+            print(f"  Stage {stats['stage']} ({models[stats['stage']]}): "
+                  f"{stats['decided']}/{stats['samples']} samples decided"
+                  + (f", {stats['unresolved']} unresolved" if stats['unresolved'] else ""))
+        print(f"Deciding records: {written} for {len(decisions)} samples")
+        print(f"Results saved to: {decisions_path}")
+        
+        return {
+            'stages': stage_stats,
+            'decided_samples': len(decisions),
+            'decided_records': written,
+            'output_path': str(decisions_path),
+            'completed_at': datetime.now().isoformat()
+        }
+    
+    def _run_serial(self, test_data: pd.DataFrame, model_name: str, temperature: float,
+                    n_runs: int, completed_runs: ResumeIndex, output_path: str,
+                    existing_count: int) -> Tuple[int, int]:
+        """
+        Process remaining runs one request at a time, most urgent task first.
+        
+        Pacing is left to the client's rate limiter, which admits the next
+        request as soon as budget is available.
+        
+        Returns:
+            Tuple of (processed samples, new results written)
+        """
+        scheduler = self._schedule_runs(test_data, model_name, n_runs, completed_runs)
+        total_tasks = len(scheduler)
+        new_results_count = 0
+        done_tasks = 0
+        
+        while scheduler:
+            task = scheduler.pop()
+            if self._adaptive is not None and not self._adaptive.dispatch(task.sample_id, task.run_number):
+                continue
+            sample = task.sample
+            start_time = time.time()
+            usage: Dict[str, Any] = {}
+            try:
+                print(f"  [{done_tasks + 1}/{total_tasks}] {task.sample_id} ({sample['kbli_code']}) "
+                      f"run {task.run_number}/{n_runs}...", end=" ")
+                
+                raw_response = self.gemini_client.generate_content(
+                    task.prompt, task.model_name, temperature, run_number=task.run_number,
+                    validate=self.result_parser, usage=usage,
+                    **self.request_options
+                )
+                self._rate_limit_parks = 0
+                parsed_json = self.result_parser(raw_response)
+                processing_time = time.time() - start_time
+                
+                full_result = self.add_metadata_to_result(
+                    parsed_json, sample, task.run_number, task.model_name, processing_time, usage
+                )
+                
+                if save_result_to_jsonl(full_result, output_path):
+                    completed_runs.add((task.sample_id, task.run_number))
+                    new_results_count += 1
+                    print(f"✅ ({processing_time:.1f}s) [Saved]")
+                else:
+                    full_result = None
+                    print(f"⚠️  ({processing_time:.1f}s) [Save failed]")
+                if self._adaptive is not None:
+                    self._adaptive.finish(task.sample_id, task.run_number, full_result)
+                    
+            except Exception as e:
+                error_type = type(e).__name__
+                
+                if self._is_quota_error(e):
+                    print(f"⚠️  Quota exceeded: {str(e)[:80]}...")
+                    # Park this run and try it again once the quota window allows
+                    scheduler.push(task)
+                    if self._adaptive is not None:
+                        self._adaptive.undispatch(task.sample_id, task.run_number)
+                    wait = self._quota_wait(e, task.model_name)
+                    if wait is None:
+                        print(f"⏹️  Breaking loop due to ResourceExhausted error. {len(scheduler)} runs left for resume.")
+                        break
+                    time.sleep(wait)
+                    continue
+                else:
+                    print(f"❌ Error ({error_type}): {str(e)[:50]}...")
+                    error_record = self.create_error_record(sample, e, task.run_number, task.model_name, usage)
+                    
+                    if save_result_to_jsonl(error_record, output_path):
+                        new_results_count += 1
+                        print(f"  📝 Error logged and saved (will retry on resume)")
+                    if self._adaptive is not None:
+                        self._adaptive.finish(task.sample_id, task.run_number, None)
+            
+            self._queue_adaptive_runs(scheduler, task)
+            done_tasks += 1
+            if done_tasks % 30 == 0:
+                total_completed = existing_count + new_results_count
+                print(f"📊 Progress: {done_tasks}/{total_tasks} runs, {total_completed} total results")
+        
+        return len(test_data) - len(scheduler.pending_samples()), new_results_count
+    
+    async def _run_concurrent(self, test_data: pd.DataFrame, model_name: str, temperature: float,
+                              n_runs: int, completed_runs: ResumeIndex, output_path: str,
+                              concurrency: int) -> Tuple[int, int]:
+        """
+        Process remaining runs with up to `concurrency` requests in flight.
+        
+        Every request still waits for the model's shared rate limiter, so
+        the RPM is respected, but each call's round-trip time overlaps with
+        the waits of the others instead of being added to them. Workers pull
+        the most urgent task from the scheduler.
+        
+        Returns:
+            Tuple of (processed samples, new results written)
+        """
+        scheduler = self._schedule_runs(test_data, model_name, n_runs, completed_runs)
+        total_tasks = len(scheduler)
+        print(f"🚀 Dispatching {total_tasks} runs with up to {concurrency} requests in flight")
+        
+        new_results_count = 0
+        resource_exhausted = False
+        in_flight = 0
+        
+        async def worker() -> None:
+            nonlocal new_results_count, resource_exhausted, in_flight
+            while not resource_exhausted:
+                task = scheduler.pop()
+                if task is None:
+                    # With adaptive runs, a run still in flight may queue its sample's next runs
+                    if self._adaptive is None or in_flight == 0:
+                        return
+                    await asyncio.sleep(0.05)
+                    continue
+                if self._adaptive is not None and not self._adaptive.dispatch(task.sample_id, task.run_number):
+                    continue
+                
+                in_flight += 1
+                try:
+                    written = await self._process_run_async(
+                        task.sample_id, task.sample, task.prompt, task.run_number,
+                        task.model_name, temperature, n_runs, completed_runs, output_path
+                    )
+                    new_results_count += written
+                    self._queue_adaptive_runs(scheduler, task)
+                    in_flight -= 1
+                except Exception as e:
+                    in_flight -= 1
+                    # _process_run_async logs every other API error as a record
+                    if not self._is_quota_error(e):
+                        raise
+                    print(f"  ⚠️  Quota exceeded: {str(e)[:80]}...")
+                    scheduler.push(task)
+                    if self._adaptive is not None:
+                        self._adaptive.undispatch(task.sample_id, task.run_number)
+                    wait = self._quota_wait(e, task.model_name)
+                    if wait is None:
+                        print(f"⏹️  Stopping dispatch due to ResourceExhausted error. In-flight requests will finish.")
+                        resource_exhausted = True
+                        return
+                    await asyncio.sleep(wait)
+        
+        workers = [worker() for _ in range(min(concurrency, total_tasks))]
+        await asyncio.gather(*workers)
+        
+        return len(test_data) - len(scheduler.pending_samples()), new_results_count
+    
+    async def _process_run_async(self, sample_id: str, sample: pd.Series, prompt: str,
+                                 run_num: int, model_name: str, temperature: float,
+                                 n_runs: int, completed_runs: ResumeIndex,
+                                 output_path: str) -> int:
+        """
+        Send one (sample, run) request and save its result or error record.
+        
+        Returns:
+            Number of records written (0 or 1)
+            
+        Raises:
+            Exception: Quota errors are re-raised so the caller can stop dispatching
+        """
+        start_time = time.time()
+        usage: Dict[str, Any] = {}
+        try:
+            raw_response = await self.gemini_client.generate_content_async(
+                prompt, model_name, temperature, run_number=run_num,
+                validate=self.result_parser, usage=usage,
+                **self.request_options
+            )
+            self._rate_limit_parks = 0
+            parsed_json = self.result_parser(raw_response)
+            processing_time = time.time() - start_time
+            
+            full_result = self.add_metadata_to_result(
+                parsed_json, sample, run_num, model_name, processing_time, usage
+            )
+            
+            if save_result_to_jsonl(full_result, output_path):
+                completed_runs.add((sample_id, run_num))
+                print(f"  ✅ {sample_id} run {run_num}/{n_runs} ({processing_time:.1f}s) [Saved]")
+                if self._adaptive is not None:
+                    self._adaptive.finish(sample_id, run_num, full_result)
+                return 1
+            
+            print(f"  ⚠️  {sample_id} run {run_num}/{n_runs} ({processing_time:.1f}s) [Save failed]")
+            if self._adaptive is not None:
+                self._adaptive.finish(sample_id, run_num, None)
+            return 0
+            
+        except Exception as e:
+            if self._is_quota_error(e):
+                raise
+            
+            print(f"  ❌ {sample_id} run {run_num}/{n_runs} error ({type(e).__name__}): {str(e)[:50]}...")
+            error_record = self.create_error_record(sample, e, run_num, model_name, usage)
+            if self._adaptive is not None:
+                self._adaptive.finish(sample_id, run_num, None)
+            
+            if save_result_to_jsonl(error_record, output_path):
+                print(f"  📝 Error logged and saved (will retry on resume)")
+                return 1
+            return 0
+    
+    async def _run_batched(self, test_data: pd.DataFrame,
+                           batch_template: str, codebook: CodebookIndex, model_name: str,
+                           temperature: float, n_runs: int,
+                           completed_runs: ResumeIndex, output_path: str,
+                           concurrency: int, batch_size: int) -> Tuple[int, int]:
+        """
+        Process remaining runs with several samples packed into each request.
+        
+        Pending runs are grouped by run number (a sample never appears twice in
+        one batch) and sent as a single prompt that returns a JSON array keyed
+        by sample_id. Valid items become the usual per-sample records; missing
+        or malformed items are re-queued as individual requests.
+        
+        Returns:
+            Tuple of (processed samples, new results written)
+        """
+        scheduler = self._schedule_batches(
+            self._schedule_runs(test_data, model_name, n_runs, completed_runs), batch_size
+        )
+        total_batches = len(scheduler)
+        print(f"🚀 Dispatching {total_batches} batches of up to {batch_size} samples "
+              f"with up to {concurrency} requests in flight")
+        
+        new_results_count = 0
+        requeued_count = 0
+        resource_exhausted = False
+        
+        async def process_batch(run_num: int, batch: List[Tuple[str, pd.Series]]) -> None:
+            nonlocal new_results_count, requeued_count
+            
+            prompt = self.build_batch_prompt(batch_template, batch, codebook)
+            tokens_per_sample = (TERSE_BATCH_OUTPUT_TOKENS_PER_SAMPLE if self.response_format == 'terse'
+                                 else BATCH_OUTPUT_TOKENS_PER_SAMPLE)
+            max_output_tokens = min(MAX_BATCH_OUTPUT_TOKENS, tokens_per_sample * len(batch))
+            batch_id = f"run{run_num}-{batch[0][0]}"
+            
+            start_time = time.time()
+            verdicts: Dict[str, Dict[str, Any]] = {}
+            usage: Dict[str, Any] = {}
+            try:
+                # The batch template carries its own instructions, so it is always sent inline
+                raw_response = await self.gemini_client.generate_content_async(
+                    prompt, model_name, temperature, max_output_tokens=max_output_tokens,
+                    run_number=run_num, validate=self.batch_parser, usage=usage,
+                    **self._batch_options()
+                )
+                self._rate_limit_parks = 0
+                for item in self.batch_parser(raw_response):
+                    verdicts[str(item.get('sample_id', ''))] = item
+            except Exception as e:
+                if self._is_quota_error(e):
+                    raise
+                print(f"  ❌ Batch {batch_id} failed ({type(e).__name__}): {str(e)[:50]}... "
+                      f"Re-queuing {len(batch)} samples individually")
+            processing_time = time.time() - start_time
+            sample_usage = self._split_usage(usage, len(batch))
+            
+            retry_individually = []
+            for sample_id, sample in batch:
+                verdict = verdicts.get(sample_id)
+                if verdict is None or not is_valid_result(verdict, self.required_fields):
+                    retry_individually.append((sample_id, sample))
+                    continue
+                
+                # Terse verdicts get None for the explanation fields they leave out
+                result = {field: verdict.get(field) for field in REQUIRED_RESULT_FIELDS}
+                full_result = self.add_metadata_to_result(
+                    result, sample, run_num, model_name, processing_time, sample_usage
+                )
+                full_result['batch_id'] = batch_id
+                full_result['batch_size'] = len(batch)
+                
+                if save_result_to_jsonl(full_result, output_path):
+                    completed_runs.add((sample_id, run_num))
+                    new_results_count += 1
+            
+            saved = len(batch) - len(retry_individually)
+            print(f"  ✅ Batch {batch_id}: {saved}/{len(batch)} verdicts saved ({processing_time:.1f}s)")
+            
+            for sample_id, sample in retry_individually:
+                requeued_count += 1
+                written = await self._process_run_async(
+                    sample_id, sample, sample['prompt'], run_num, model_name, temperature,
+                    n_runs, completed_runs, output_path
+                )
+                new_results_count += written
+        
+        async def worker() -> None:
+            nonlocal resource_exhausted
+            while not resource_exhausted:
+                task = scheduler.pop()
+                if task is None:
+                    return
+                
+                try:
+                    await process_batch(task.run_number, task.batch)
+                except Exception as e:
+                    if not self._is_quota_error(e):
+                        raise
+                    print(f"  ⚠️  Quota exceeded: {str(e)[:80]}...")
+                    # Samples saved before the quota error are not sent again
+                    pending = [(sid, s) for sid, s in task.batch if (sid, task.run_number) not in completed_runs]
+                    if pending:
+                        scheduler.push(replace(task, sample_id=pending[0][0], batch=pending))
+                    wait = self._quota_wait(e, model_name)
+                    if wait is None:
+                        print(f"⏹️  Stopping dispatch due to ResourceExhausted error. In-flight requests will finish.")
+                        resource_exhausted = True
+                        return
+                    await asyncio.sleep(wait)
+        
+        workers = [worker() for _ in range(min(concurrency, total_batches))]
+        await asyncio.gather(*workers)
+        
+        if requeued_count:
+            print(f"🔁 {requeued_count} samples were re-requested individually after incomplete batches")
+        
+        return len(test_data) - len(scheduler.pending_samples()), new_results_count
+    
+    async def _run_multi_candidate(self, test_data: pd.DataFrame, model_name: str, temperature: float,
+                                   n_runs: int, completed_runs: ResumeIndex,
+                                   output_path: str, concurrency: int) -> Tuple[int, int]:
+        """
+        Process remaining runs with one multi-candidate request per sample.
+        
+        The remaining run numbers of a sample are requested together through
+        candidate_count and the candidates are fanned out as run 1..N records
+        with the usual schema. Runs the API returned no candidate for stay
+        missing and are picked up on resume, like any other failed run.
+        
+        Returns:
+            Tuple of (processed samples, new results written)
+        """
+        scheduler = TaskScheduler(self.task_priorities)
+        for idx, (_, sample) in enumerate(test_data.iterrows()):
+            sample_id = sample.get('sample_id', f"row_{idx}")
+            remaining_runs = self._get_remaining_runs(sample_id, completed_runs, n_runs)
+            for start in range(0, len(remaining_runs), MAX_CANDIDATE_COUNT):
+                run_numbers = remaining_runs[start:start + MAX_CANDIDATE_COUNT]
+                scheduler.push(Task(
+                    sample_id, run_numbers[0], model_name, self._task_kind(sample_id, run_numbers),
+                    sample, sample['prompt'], run_numbers=run_numbers
+                ))
+        
+        total_requests = len(scheduler)
+        print(f"🚀 Dispatching {total_requests} multi-candidate requests "
+              f"with up to {concurrency} requests in flight")
+        
+        new_results_count = 0
+        resource_exhausted = False
+        
+        async def process_sample(sample_id: str, sample: pd.Series, prompt: str,
+                                 run_numbers: List[int]) -> None:
+            nonlocal new_results_count
+            
+            start_time = time.time()
+            usage: Dict[str, Any] = {}
+            try:
+                candidates = await self.gemini_client.generate_candidates_async(
+                    prompt, model_name, len(run_numbers), temperature,
+                    run_numbers=run_numbers, validate=self.result_parser,
+                    usage=usage, **self.request_options
+                )
+                self._rate_limit_parks = 0
+            except Exception as e:
+                if self._is_quota_error(e):
+                    raise
+                print(f"  ❌ {sample_id} runs {run_numbers} error ({type(e).__name__}): {str(e)[:50]}...")
+                for run_num in run_numbers:
+                    error_record = self.create_error_record(sample, e, run_num, model_name, usage)
+                    if save_result_to_jsonl(error_record, output_path):
+                        new_results_count += 1
+                return
+            processing_time = time.time() - start_time
+            candidate_usage = self._split_usage(usage, len(candidates))
+            
+            for candidate_index, (run_num, raw_response) in enumerate(zip(run_numbers, candidates)):
+                try:
+                    parsed_json = self.result_parser(raw_response)
+                except ValueError as e:
+                    error_record = self.create_error_record(
+                        sample, e, run_num, model_name, candidate_usage
+                    )
+                    if save_result_to_jsonl(error_record, output_path):
+                        new_results_count += 1
+                    continue
+                
+                full_result = self.add_metadata_to_result(
+                    parsed_json, sample, run_num, model_name, processing_time, candidate_usage
+                )
+                full_result['candidate_index'] = candidate_index
+                full_result['candidate_count'] = len(run_numbers)
+                
+                if save_result_to_jsonl(full_result, output_path):
+                    completed_runs.add((sample_id, run_num))
+                    new_results_count += 1
+            
+            missing_runs = run_numbers[len(candidates):]
+            status = f"{min(len(candidates), len(run_numbers))}/{len(run_numbers)} candidates"
+            if missing_runs:
+                status += f", runs {missing_runs} left for resume"
+            print(f"  ✅ {sample_id} runs {run_numbers}: {status} ({processing_time:.1f}s)")
+        
+        async def worker() -> None:
+            nonlocal resource_exhausted
+            while not resource_exhausted:
+                task = scheduler.pop()
+                if task is None:
+                    return
+                
+                try:
+                    await process_sample(task.sample_id, task.sample, task.prompt, task.run_numbers)
+                except Exception as e:
+                    if not self._is_quota_error(e):
+                        raise
+                    print(f"  ⚠️  Quota exceeded: {str(e)[:80]}...")
+                    scheduler.push(task)
+                    wait = self._quota_wait(e, model_name)
+                    if wait is None:
+                        print(f"⏹️  Stopping dispatch due to ResourceExhausted error. In-flight requests will finish.")
+                        resource_exhausted = True
+                        return
+                    await asyncio.sleep(wait)
+        
+        workers = [worker() for _ in range(min(concurrency, total_requests))]
+        await asyncio.gather(*workers)
+        
+        return len(test_data) - len(scheduler.pending_samples()), new_results_count
+    
+    def _task_kind(self, sample_id: str, run_numbers: List[int]) -> str:
+        """Whether runs of a sample are retries, escalations or fresh work."""
+        if any((str(sample_id), run_num) in self._failed_runs for run_num in run_numbers):
+            return TASK_RETRY
+        if self.record_tags.get('cascade_stage', 0) > 0:
+            return TASK_ESCALATION
+        return TASK_FRESH
+    
+    def _schedule_runs(self, test_data: pd.DataFrame, model_name: str, n_runs: int,
+                       completed_runs: ResumeIndex) -> TaskScheduler:
+        """
+        Queue one task per pending (sample, run).
+        
+        Returns:
+            TaskScheduler holding the tasks, ordered by kind priority and run number
+        """
+        scheduler = TaskScheduler(self.task_priorities)
+        for idx, (_, sample) in enumerate(test_data.iterrows()):
+            sample_id = sample.get('sample_id', f"row_{idx}")
+            if self._adaptive is not None:
+                run_numbers = self._adaptive.next_runs(sample_id)
+            else:
+                run_numbers = self._get_remaining_runs(sample_id, completed_runs, n_runs)
+            for run_num in run_numbers:
+                scheduler.push(Task(
+                    sample_id, run_num, model_name, self._task_kind(sample_id, [run_num]),
+                    sample, sample['prompt']
+                ))
+        
+        kinds = scheduler.kind_counts()
+        if len(kinds) > 1:
+            print(f"📋 Queued runs: " + ", ".join(f"{count} {kind}" for kind, count in kinds.items()))
+        return scheduler
+    
+    def _queue_adaptive_runs(self, scheduler: TaskScheduler, task: Task) -> None:
+        """Queue the runs the adaptive tracker issued for a task's sample."""
+        if self._adaptive is None:
+            return
+        for run_num in self._adaptive.take_ready(task.sample_id):
+            scheduler.push(Task(
+                task.sample_id, run_num, task.model_name, self._task_kind(task.sample_id, [run_num]),
+                task.sample, task.prompt
+            ))
+    
+    def _schedule_batches(self, runs: TaskScheduler, batch_size: int) -> TaskScheduler:
+        """
+        Pack queued runs into batches of up to batch_size samples.
+        
+        Runs are taken in scheduling order and only runs with the same
+        priority and run number share a batch, so a sample never appears
+        twice in one batch and urgent runs are not held back by others.
+        
+        Returns:
+            TaskScheduler holding one task per batch
+        """
+        batches = TaskScheduler(self.task_priorities)
+        batch: List[Task] = []
+        
+        def flush() -> None:
+            if batch:
+                first = batch[0]
+                batches.push(Task(
+                    first.sample_id, first.run_number, first.model_name, first.kind,
+                    batch=[(task.sample_id, task.sample) for task in batch]
+                ))
+                batch.clear()
+        
+        while runs:
+            task = runs.pop()
+            if batch and (len(batch) == batch_size
+                          or runs.priorities[task.kind] != runs.priorities[batch[0].kind]
+                          or task.run_number != batch[0].run_number):
+                flush()
+            batch.append(task)
+        flush()
+        return batches
+    
+    @staticmethod
+    def _get_remaining_runs(sample_id: str, completed_runs: ResumeIndex,
+                            n_runs: int) -> List[int]:
+        """Return the run numbers still missing for a sample (one lookup in the resume index)."""
+        return completed_runs.remaining(sample_id, n_runs)
+    
+    @staticmethod
+    def _split_usage(usage: Dict[str, Any], parts: int) -> Dict[str, Any]:
+        """
+        Share the token counts of one call between the records it produced.
+        
+        Keeps per-record token sums equal to what was billed when several
+        samples or candidates came from the same request.
+        """
+        parts = max(1, parts)
+        return {
+            'prompt_tokens': usage.get('prompt_tokens', 0) // parts,
+            'output_tokens': usage.get('output_tokens', 0) // parts,
+            'cache_hit': usage.get('cache_hit', False),
+            'retry_count': usage.get('retry_count', 0),
+            'api_latency_seconds': usage.get('api_latency_seconds', 0.0),
+        }
+    
+    @staticmethod
+    def _is_quota_error(error: Exception) -> bool:
+        """Check whether an exception signals an exhausted API quota."""
+        return classify_quota_error(error) is not None
+    
+    def _quota_wait(self, error: Exception, model_name: str) -> Optional[float]:
+        """
+        Decide how to continue after a quota error surfaced from the client.
+        
+        Minute-level 429s park the work for one rate window; only a run of
+        MAX_RATE_LIMIT_PARKS parks with no successful call in between stops
+        it, so scattered 429s over a long run never do. An exhausted
+        daily quota is retried right away while another key still has
+        quota, waited out when on_daily_quota is 'wait', and otherwise stops
+        the run (every finished result is already on disk, so a later run
+        resumes from there).
+        
+        Args:
+            error: The quota error
+            model_name: The model being called
+            
+        Returns:
+            Seconds to wait before retrying the parked work, or None to stop
+        """
+        if classify_quota_error(error) == 'minute':
+            self._rate_limit_parks += 1
+            if self._rate_limit_parks > MAX_RATE_LIMIT_PARKS:
+                print(f"⏹️  Still rate limited after {MAX_RATE_LIMIT_PARKS} parked windows in a row, giving up")
+                return None
+            print(f"⏸️  Rate limited, parking work for {RATE_LIMIT_PARK_SECONDS}s until the window resets")
+            return RATE_LIMIT_PARK_SECONDS
+        
+        if self.gemini_client.key_pool.has_daily_quota(model_name):
+            print(f"🔀 Failing over to another API key with daily quota left")
+            return 0.0
+        
+        if self.on_daily_quota != 'wait':
+            return None
+        
+        now = time.time()
+        if self._quota_resume_at <= now:
+            # First worker to notice announces the checkpoint; the rest just wait
+            wait = seconds_until_quota_reset() + QUOTA_RESET_MARGIN_SECONDS
+            self._quota_resume_at = now + wait
+            print(f"🌙 Daily quota exhausted for {model_name} on all keys. Results so far are saved; "
+                  f"sleeping {wait / 3600:.1f}h until the quota resets "
+                  f"(resuming around {datetime.fromtimestamp(self._quota_resume_at):%Y-%m-%d %H:%M})")
+        return self._quota_resume_at - now
     
     def _create_execution_stats(self, processed_samples: int, total_completed: int,
                                new_results: int, success_rate: float, 
@@ -383,5 +1666,7 @@ class PilotRunner:
             'new_results_generated': new_results,
             'success_rate': success_rate,
             'output_path': output_path,
+            'request_stats': dict(self.gemini_client.request_stats),
+            'retry_stats': dict(self.gemini_client.retry_policy.stats),
             'completed_at': datetime.now().isoformat()
         }
@@ -0,0 +1,220 @@
+"""
+Prompt Compiler
+Renders the prompts of a whole dataset in one pass before any request is sent,
+joining the samples to the codebook on kbli_code, and keeps the rendered
+prompts in a columnar cache keyed by the hashes of template, codebook and dataset.
+"""
+
+import re
+import time
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..data.codebook_index import CodebookIndex
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine of pandas)
+    PARQUET_AVAILABLE = True
+except ImportError:  # pyarrow is in requirements.txt; without it prompts are not cached
+    PARQUET_AVAILABLE = False
+
+JOB_DESCRIPTION = "{job_description}"
+CODE_TO_CHECK = "{code_to_check}"
+HIERARCHY_CONTEXT = "{hierarchy_context}"
+_PLACEHOLDER_PATTERN = re.compile(
+    "(" + "|".join(re.escape(p) for p in (JOB_DESCRIPTION, CODE_TO_CHECK, HIERARCHY_CONTEXT)) + ")"
+)
+
+
+def fingerprint_text(text: str) -> str:
+    """sha256 hex digest of a string."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def fingerprint_codebook(codebook: CodebookIndex) -> str:
+    """sha256 of every code and hierarchy fragment a prompt can contain."""
+    digest = hashlib.sha256()
+    for code, hierarchy in codebook.hierarchies():
+        digest.update(f"{code}\x00{hierarchy}\x01".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def fingerprint_dataset(test_data: pd.DataFrame) -> str:
+    """sha256 of the row index, text and kbli_code of every sample."""
+    hashed = pd.util.hash_pandas_object(
+        test_data[['text', 'kbli_code']].astype(str), index=True
+    )
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def render_prompts(template: str, test_data: pd.DataFrame,
+                   codebook: CodebookIndex) -> pd.Series:
+    """
+    Render a template for every sample of a dataset.
+
+    The template is split on its placeholders once; each prompt is then
+    joined from the literal parts and the sample's columns. Unlike chained
+    str.replace, placeholder-like text inside a job description is left
+    untouched.
+
+    Args:
+        template: Prompt template with {job_description}, {code_to_check}
+            and optionally {hierarchy_context} placeholders
+        test_data: Samples with 'text' and 'kbli_code' columns
+        codebook: Index of the hierarchical codebook
+
+    Returns:
+        Prompt per sample (aligned with test_data), None where the sample's
+        code is not in the codebook
+    """
+    codes = test_data['kbli_code'].astype(str)
+    hierarchies = codes.map(dict(codebook.hierarchies()))
+    matched = hierarchies.notna()
+    n_matched = int(matched.sum())
+
+    columns = {
+        JOB_DESCRIPTION: test_data['text'][matched].astype(str).to_numpy(),
+        CODE_TO_CHECK: codes[matched].to_numpy(),
+        HIERARCHY_CONTEXT: hierarchies[matched].to_numpy(),
+    }
+    # Literal parts are repeated per sample, so a template without placeholders
+    # still yields one prompt per matched sample
+    parts = [
+        columns[part] if part in columns else np.full(n_matched, part, dtype=object)
+        for part in _PLACEHOLDER_PATTERN.split(template) if part
+    ]
+
+    prompts = np.full(len(test_data), None, dtype=object)
+    prompts[matched.to_numpy()] = list(map("".join, zip(*parts))) if parts else ""
+    return pd.Series(prompts, index=test_data.index, dtype=object)
+
+
+@dataclass
+class CompiledPrompts:
+    """Rendered prompts of a dataset and where they came from."""
+    prompts: pd.Series  # Aligned with the dataset, None for codes not in the codebook
+    cache_path: Optional[Path]
+    from_cache: bool
+    seconds: float
+
+    def select(self, test_data: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, int]]:
+        """
+        Attach the prompts to (a subset of) the compiled dataset.
+
+        Args:
+            test_data: Rows of the compiled dataset, e.g. after max_samples
+
+        Returns:
+            (samples whose code is in the codebook, with a 'prompt' column;
+             number of skipped samples per unknown code)
+        """
+        prompts = self.prompts.loc[test_data.index]
+        matched = prompts.notna()
+        unmatched = Counter(test_data.loc[~matched, 'kbli_code'].astype(str))
+        selected = test_data[matched].copy()
+        selected['prompt'] = prompts[matched]
+        return selected, dict(unmatched.most_common())
+
+
+class PromptCompiler:
+    """
+    Compiles every prompt of a dataset up front.
+
+    Compiled prompts are written to `cache_dir` under a key made from the
+    hashes of template, codebook and dataset, so any change to one of them
+    compiles afresh and a rerun of the same study reads the prompts back
+    instead of rendering them again. The cache is a Parquet file, so it
+    needs pyarrow (in requirements.txt); without it every run compiles
+    afresh.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        Initialize the compiler.
+
+        Args:
+            cache_dir: Directory of the prompt cache (None disables it)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+
+    def cache_path(self, template: str, test_data: pd.DataFrame,
+                   codebook: CodebookIndex) -> Optional[Path]:
+        """
+        Cache file of a template, codebook and dataset.
+
+        Args:
+            template: Prompt template
+            test_data: The dataset
+            codebook: Index of the hierarchical codebook
+
+        Returns:
+            Path of the cache file, or None if caching is disabled or
+            pyarrow is not installed
+        """
+        if self.cache_dir is None or not PARQUET_AVAILABLE:
+            return None
+        key = fingerprint_text(":".join([
+            fingerprint_text(template),
+            fingerprint_codebook(codebook),
+            fingerprint_dataset(test_data),
+        ]))
+        return self.cache_dir / f"prompts_{key[:32]}.parquet"
+
+    def compile(self, template: str, test_data: pd.DataFrame,
+                codebook: CodebookIndex) -> CompiledPrompts:
+        """
+        Render the prompts of a dataset, or read them from the cache.
+
+        Args:
+            template: Prompt template
+            test_data: The dataset (compile it whole and select rows later,
+                so subsets of the same dataset share one cache file)
+            codebook: Index of the hierarchical codebook
+
+        Returns:
+            CompiledPrompts aligned with test_data
+        """
+        start_time = time.perf_counter()
+        cache_path = self.cache_path(template, test_data, codebook)
+        if self.cache_dir is not None and not PARQUET_AVAILABLE:
+            print("⚠️  pyarrow is not installed, prompt cache disabled")
+
+        if cache_path is not None and cache_path.exists():
+            try:
+                prompts = self._read(cache_path)
+                if len(prompts) == len(test_data):
+                    prompts.index = test_data.index
+                    return CompiledPrompts(prompts, cache_path, True, time.perf_counter() - start_time)
+                print(f"⚠️  Prompt cache {cache_path.name} does not match the dataset, recompiling")
+            except Exception as e:
+                print(f"⚠️  Could not read prompt cache {cache_path.name} ({type(e).__name__}), recompiling")
+
+        prompts = render_prompts(template, test_data, codebook)
+        if cache_path is not None:
+            try:
+                self._write(prompts, cache_path)
+            except Exception as e:
+                print(f"⚠️  Could not write prompt cache {cache_path.name} ({type(e).__name__})")
+                cache_path = None
+        return CompiledPrompts(prompts, cache_path, False, time.perf_counter() - start_time)
+
+    @staticmethod
+    def _read(path: Path) -> pd.Series:
+        """Load the prompt column of a cache file."""
+        frame = pd.read_parquet(path)
+        return frame['prompt'].astype(object).where(frame['prompt'].notna(), None)
+
+    @staticmethod
+    def _write(prompts: pd.Series, path: Path) -> None:
+        """Write the prompt column to a cache file (atomically)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        frame = pd.DataFrame({'prompt': prompts.to_numpy()})
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        frame.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
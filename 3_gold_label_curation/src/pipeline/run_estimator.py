@@ -0,0 +1,161 @@
+"""
+Run Estimator
+Projects token usage, cost and wall-clock time of a pilot run before it is launched.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+# Fallbacks used until earlier results provide measured values
+DEFAULT_OUTPUT_TOKENS_PER_RESULT = 350
+DEFAULT_LATENCY_SECONDS = 3.0
+
+# Prompts sent to count_tokens to calibrate the offline chars-per-token estimate
+CALIBRATION_SAMPLES = 5
+
+
+def measured_averages(existing_results: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Average output tokens and latency of earlier successful records.
+
+    Args:
+        existing_results: Records loaded from the output JSONL file
+
+    Returns:
+        Dictionary with 'output_tokens' and 'latency_seconds' (defaults when
+        no earlier record carries the measurement)
+    """
+    output_tokens = [
+        r['output_tokens'] for r in existing_results
+        if r.get('success') and not r.get('cache_hit') and r.get('output_tokens')
+    ]
+    latencies = [
+        r['processing_time_seconds'] for r in existing_results
+        if r.get('success') and not r.get('cache_hit') and r.get('processing_time_seconds')
+    ]
+
+    return {
+        'output_tokens': sum(output_tokens) / len(output_tokens) if output_tokens else DEFAULT_OUTPUT_TOKENS_PER_RESULT,
+        'latency_seconds': sum(latencies) / len(latencies) if latencies else DEFAULT_LATENCY_SECONDS,
+    }
+
+
+def _measured_mean(results: List[Dict[str, Any]], field: str) -> Optional[float]:
+    """Mean of a measurement over successful, uncached records (None without any)."""
+    values = [r[field] for r in results if r.get('success') and not r.get('cache_hit') and r.get(field)]
+    return sum(values) / len(values) if values else None
+
+
+def response_format_savings(full_results: List[Dict[str, Any]],
+                            terse_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compare the measured cost of terse verdicts with that of full ones.
+
+    Latency is the API call time (api_latency_seconds), which excludes the
+    wait for rate-limit budget; older records without it fall back to
+    processing_time_seconds.
+
+    Args:
+        full_results: Records produced with the full response format
+        terse_results: Records of the same model produced in terse format
+
+    Returns:
+        Dictionary with per-result averages of both formats ('full' and
+        'terse': output_tokens, prompt_tokens, latency_seconds, results) and
+        the relative savings of terse ('output_tokens_saved',
+        'latency_saved'; None where a format has no measurement)
+    """
+    averages = {}
+    for name, results in (('full', full_results), ('terse', terse_results)):
+        averages[name] = {
+            'output_tokens': _measured_mean(results, 'output_tokens'),
+            'prompt_tokens': _measured_mean(results, 'prompt_tokens'),
+            'latency_seconds': (_measured_mean(results, 'api_latency_seconds')
+                                or _measured_mean(results, 'processing_time_seconds')),
+            'results': sum(1 for r in results if r.get('success')),
+        }
+
+    def saved(field: str) -> Optional[float]:
+        full, terse = averages['full'][field], averages['terse'][field]
+        if not full or terse is None:
+            return None
+        return 1.0 - terse / full
+
+    return {
+        **averages,
+        'output_tokens_saved': saved('output_tokens'),
+        'latency_saved': saved('latency_seconds'),
+    }
+
+
+def project_campaign(requests: int, input_tokens: int, output_tokens: int,
+                     model_config: Dict[str, Any], n_keys: int = 1, concurrency: int = 1,
+                     latency_seconds: float = DEFAULT_LATENCY_SECONDS,
+                     rate_buffer: float = 1.0) -> Dict[str, Any]:
+    """
+    Project cost and wall-clock time of a set of requests under the model's limits.
+
+    The run takes as long as its tightest constraint: the RPM budget, the
+    TPM budget, or request latency divided by concurrency. Runs that need
+    more requests than the daily quota allows spill over into further
+    quota days.
+
+    Args:
+        requests: Number of API requests
+        input_tokens: Total prompt tokens over all requests
+        output_tokens: Total output tokens over all requests
+        model_config: Entry of AVAILABLE_MODELS ('rpm', 'tpm', 'rpd', prices)
+        n_keys: API keys in the pool (limits are per key)
+        concurrency: Maximum number of requests in flight
+        latency_seconds: Average seconds per request
+        rate_buffer: Safety factor applied to the RPM limit
+
+    Returns:
+        Dictionary with token totals, cost, projected minutes, bottleneck and
+        the number of quota days the run spans
+    """
+    n_keys = max(1, n_keys)
+    rpm = model_config.get('rpm', 15) / rate_buffer * n_keys
+    tpm = model_config.get('tpm', 1_000_000) * n_keys
+    rpd = model_config.get('rpd', 1_500) * n_keys
+
+    minutes = {
+        'rpm': requests / rpm,
+        'tpm': (input_tokens + output_tokens) / tpm,
+        'latency': requests * latency_seconds / max(1, concurrency) / 60.0,
+    }
+    bottleneck = max(minutes, key=minutes.get)
+
+    cost = (
+        input_tokens / 1_000_000 * model_config.get('input_price', 0.0)
+        + output_tokens / 1_000_000 * model_config.get('output_price', 0.0)
+    )
+
+    return {
+        'requests': requests,
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'total_tokens': input_tokens + output_tokens,
+        'estimated_cost_usd': round(cost, 4),
+        'projected_minutes': round(minutes[bottleneck], 1),
+        'bottleneck': bottleneck,
+        'minutes_by_limit': {name: round(value, 1) for name, value in minutes.items()},
+        'quota_days': max(1, math.ceil(requests / rpd)) if requests else 0,
+    }
+
+
+def print_estimate(estimate: Dict[str, Any]) -> None:
+    """Print a projection produced by PilotRunner.estimate_pilot_study."""
+    print(f"\n🧮 Dry-run estimate (token counts: {estimate['token_source']})")
+    print(f"Requests to send: {estimate['requests']:,} for {estimate['pending_runs']:,} pending runs")
+    print(f"Input tokens: {estimate['input_tokens']:,}")
+    print(f"Output tokens: {estimate['output_tokens']:,} "
+          f"(~{estimate['output_tokens_per_result']:.0f} per result)")
+    print(f"Estimated cost: ${estimate['estimated_cost_usd']:.2f}")
+
+    by_limit = estimate['minutes_by_limit']
+    print(f"Projected time: {estimate['projected_minutes']:.1f} minutes "
+          f"(bound by {estimate['bottleneck'].upper()}; RPM {by_limit['rpm']:.1f}, "
+          f"TPM {by_limit['tpm']:.1f}, latency {by_limit['latency']:.1f})")
+    if estimate['quota_days'] > 1:
+        print(f"⚠️  Daily request quota is exceeded: the run spans {estimate['quota_days']} quota days")
@@ -0,0 +1,118 @@
+"""
+Task Scheduler
+Priority queue of pending (sample_id, run_number, model) tasks. Work is pulled
+by priority class, then by run number, so an interrupted run leaves every
+sample with its first run before any sample gets its second.
+"""
+
+import heapq
+import itertools
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# What a task is: a run never attempted, a run whose earlier attempt left
+# an error record, or a run of a sample escalated by an earlier cascade stage
+TASK_FRESH = 'fresh'
+TASK_RETRY = 'retry'
+TASK_ESCALATION = 'escalation'
+TASK_KINDS = (TASK_FRESH, TASK_RETRY, TASK_ESCALATION)
+
+# Lower runs first. Retries come first by default: they finish samples
+# whose other runs are already done
+DEFAULT_TASK_PRIORITIES = {TASK_RETRY: 0, TASK_FRESH: 1, TASK_ESCALATION: 1}
+
+
+def parse_task_priorities(spec: str) -> Dict[str, int]:
+    """
+    Parse task priorities given as 'kind=priority,...'.
+
+    Args:
+        spec: e.g. "retry=2,fresh=0" (kinds left out keep their default)
+
+    Returns:
+        Priority of every task kind
+
+    Raises:
+        ValueError: If a kind is unknown or a priority is not an integer
+    """
+    priorities = dict(DEFAULT_TASK_PRIORITIES)
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        kind, _, value = item.partition("=")
+        kind = kind.strip()
+        if kind not in TASK_KINDS:
+            raise ValueError(f"Unknown task kind '{kind}' (expected one of {', '.join(TASK_KINDS)})")
+        try:
+            priorities[kind] = int(value)
+        except ValueError:
+            raise ValueError(f"Priority of '{kind}' must be an integer, got '{value.strip()}'")
+    return priorities
+
+
+@dataclass
+class Task:
+    """One unit of work: a run of a sample (or several runs / samples sent together)."""
+    sample_id: str
+    run_number: int
+    model_name: str
+    kind: str = TASK_FRESH
+    sample: Any = None
+    prompt: Optional[str] = None
+    run_numbers: Optional[List[int]] = None  # Runs requested together (multi-candidate)
+    batch: Optional[List[Tuple[str, Any]]] = None  # (sample_id, sample) pairs sent together
+    sequence: Optional[int] = field(default=None, repr=False)  # Arrival order, set on first push
+
+
+class TaskScheduler:
+    """
+    Heap of pending tasks ordered by (priority of kind, run number, arrival).
+
+    Workers pop the most urgent task; a task parked on a quota error is
+    pushed back and keeps its place relative to the others.
+    """
+
+    def __init__(self, priorities: Optional[Dict[str, int]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            priorities: Priority per task kind (lower runs first); kinds
+                left out keep DEFAULT_TASK_PRIORITIES
+        """
+        self.priorities = {**DEFAULT_TASK_PRIORITIES, **(priorities or {})}
+        self._heap: List[Tuple[int, int, int, Task]] = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def push(self, task: Task) -> None:
+        """Queue a task (a pushed-back task keeps its original arrival order)."""
+        if task.sequence is None:
+            task.sequence = next(self._sequence)
+        heapq.heappush(self._heap, (self.priorities[task.kind], task.run_number, task.sequence, task))
+
+    def pop(self) -> Optional[Task]:
+        """Take the most urgent task, or None if the queue is empty."""
+        if not self._heap:
+            return None
+        return heapq.heappop(self._heap)[-1]
+
+    def pending_samples(self) -> Set[str]:
+        """Samples with at least one queued task."""
+        samples = set()
+        for _, _, _, task in self._heap:
+            if task.batch is not None:
+                samples.update(sample_id for sample_id, _ in task.batch)
+            else:
+                samples.add(task.sample_id)
+        return samples
+
+    def kind_counts(self) -> Dict[str, int]:
+        """Queued tasks per kind."""
+        return dict(Counter(task.kind for _, _, _, task in self._heap))
@@ -6,19 +6,39 @@ Utility modules for ACSES pipeline
 from .common import setup_logging, generate_uuid, load_env_file
 from .json_parser import (
     extract_json_from_response,
+    extract_json_array_from_response,
+    parse_json_response,
+    parse_json_array_response,
+    RESULT_SCHEMA,
+    BATCH_RESULT_SCHEMA,
+    TERSE_RESULT_SCHEMA,
+    TERSE_BATCH_RESULT_SCHEMA,
+    expand_terse_result,
+    is_valid_result,
     save_result_to_jsonl,
     load_existing_results,
     calculate_success_rate,
     validate_jsonl_file
 )
+from .resume_index import ResumeIndex
 
 __all__ = [
     'setup_logging',
     'generate_uuid', 
     'load_env_file',
     'extract_json_from_response',
+    'extract_json_array_from_response',
+    'parse_json_response',
+    'parse_json_array_response',
+    'RESULT_SCHEMA',
+    'BATCH_RESULT_SCHEMA',
+    'TERSE_RESULT_SCHEMA',
+    'TERSE_BATCH_RESULT_SCHEMA',
+    'expand_terse_result',
+    'is_valid_result',
     'save_result_to_jsonl',
     'load_existing_results',
     'calculate_success_rate',
-    'validate_jsonl_file'
+    'validate_jsonl_file',
+    'ResumeIndex'
 ]
@@ -6,9 +6,11 @@ Handles JSON extraction, parsing, and JSONL file operations.
 import json
 import re
 import os
-from typing import Dict, Any, List, Tuple, Set, Optional
+from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 
+from .resume_index import ResumeIndex
+
 
 def extract_json_from_response(text: str) -> Dict[str, Any]:
     """
@@ -42,6 +44,188 @@ def extract_json_from_response(text: str) -> Dict[str, Any]:
         raise ValueError(f"Invalid JSON format: {e}\nJSON string: {json_str[:200]}...")
 
 
+# Fields every model verdict must contain
+REQUIRED_RESULT_FIELDS = (
+    'is_correct',
+    'confidence_score',
+    'reasoning',
+    'alternative_codes',
+    'alternative_reasoning',
+)
+
+# Terse verdicts leave out the explanation, which is most of the output tokens
+TERSE_RESULT_FIELDS = (
+    'is_correct',
+    'confidence_score',
+    'alternative_codes',
+)
+
+
+# Response schema of one verdict for the API's structured output mode
+# (OpenAPI subset understood by Gemini's response_schema)
+RESULT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'is_correct': {'type': 'BOOLEAN'},
+        'confidence_score': {'type': 'NUMBER'},
+        'reasoning': {'type': 'STRING'},
+        'alternative_codes': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'alternative_reasoning': {'type': 'STRING'},
+    },
+    'required': list(REQUIRED_RESULT_FIELDS),
+}
+
+# Batched prompts answer with one verdict per sample, keyed by sample_id
+BATCH_RESULT_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {'sample_id': {'type': 'STRING'}, **RESULT_SCHEMA['properties']},
+        'required': ['sample_id', *REQUIRED_RESULT_FIELDS],
+    },
+}
+
+TERSE_RESULT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {field: RESULT_SCHEMA['properties'][field] for field in TERSE_RESULT_FIELDS},
+    'required': list(TERSE_RESULT_FIELDS),
+}
+
+TERSE_BATCH_RESULT_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {'sample_id': {'type': 'STRING'}, **TERSE_RESULT_SCHEMA['properties']},
+        'required': ['sample_id', *TERSE_RESULT_FIELDS],
+    },
+}
+
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """
+    Parse a response produced in structured output mode.
+
+    With a response schema the API returns bare JSON, so no searching for
+    code fences or braces is needed.
+
+    Args:
+        text: Raw response text from the API
+
+    Returns:
+        Parsed JSON dictionary
+
+    Raises:
+        ValueError: If the text is not a JSON object
+    """
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format: {e}\nJSON string: {text[:200]}...")
+
+    if not isinstance(parsed, dict):
+        raise ValueError(f"Expected a JSON object, got {type(parsed).__name__}")
+
+    return parsed
+
+
+def parse_json_array_response(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse a batched response produced in structured output mode.
+
+    Args:
+        text: Raw response text from the API
+
+    Returns:
+        List of parsed JSON objects
+
+    Raises:
+        ValueError: If the text is not a JSON array
+    """
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format: {e}\nJSON string: {text[:200]}...")
+
+    if not isinstance(parsed, list):
+        raise ValueError(f"Expected a JSON array, got {type(parsed).__name__}")
+
+    return [item for item in parsed if isinstance(item, dict)]
+
+
+def extract_json_array_from_response(text: str) -> List[Dict[str, Any]]:
+    """
+    Extract and parse a JSON array from a batched API response.
+    
+    Args:
+        text: Raw response text from the API
+        
+    Returns:
+        List of parsed JSON objects
+        
+    Raises:
+        ValueError: If no valid JSON array found or parsing fails
+    """
+    # Try to find JSON block marked with ```json
+    json_match = re.search(r'```json\s*(\[.*?\])\s*```', text, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(1)
+    else:
+        # Try to find any JSON array in the text
+        json_match = re.search(r'\[.*\]', text, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(0)
+        else:
+            raise ValueError(f"No JSON array found in response: {text[:200]}...")
+    
+    try:
+        parsed = json.loads(json_str)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format: {e}\nJSON string: {json_str[:200]}...")
+    
+    if not isinstance(parsed, list):
+        raise ValueError(f"Expected a JSON array, got {type(parsed).__name__}")
+    
+    return [item for item in parsed if isinstance(item, dict)]
+
+
+def expand_terse_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Give a terse verdict the explanation fields of a full one.
+    
+    The fields are None (not requested), so terse and full records share
+    one schema and an empty explanation is never mistaken for a real one.
+    
+    Args:
+        result: Parsed terse verdict
+        
+    Returns:
+        The verdict with every field of REQUIRED_RESULT_FIELDS
+    """
+    return {'reasoning': None, 'alternative_reasoning': None, **result}
+
+
+def is_valid_result(result: Dict[str, Any],
+                    required_fields: Tuple[str, ...] = REQUIRED_RESULT_FIELDS) -> bool:
+    """
+    Check that a parsed verdict has every required field with a usable type.
+    
+    Args:
+        result: Parsed JSON object from the model
+        required_fields: Fields the verdict must contain (TERSE_RESULT_FIELDS
+            for terse verdicts)
+        
+    Returns:
+        True if the verdict can be stored as a successful record
+    """
+    if not all(field in result for field in required_fields):
+        return False
+    if not isinstance(result['is_correct'], bool):
+        return False
+    if not isinstance(result['confidence_score'], (int, float)) or isinstance(result['confidence_score'], bool):
+        return False
+    return isinstance(result['alternative_codes'], list)
+
+
 def save_result_to_jsonl(result: Dict[str, Any], output_path: str) -> bool:
     """
     Append a single result to JSONL file immediately.
@@ -64,7 +248,7 @@ def save_result_to_jsonl(result: Dict[str, Any], output_path: str) -> bool:
         return False
 
 
-def load_existing_results(output_path: str) -> Tuple[List[Dict[str, Any]], Set[Tuple[str, int]]]:
+def load_existing_results(output_path: str) -> Tuple[List[Dict[str, Any]], ResumeIndex]:
     """
     Load existing results from JSONL file to enable resumption.
     
@@ -72,10 +256,11 @@ def load_existing_results(output_path: str) -> Tuple[List[Dict[str, Any]], Set[T
         output_path: Path to the JSONL results file
         
     Returns:
-        Tuple of (list of existing results, set of completed sample_run combinations)
+        Tuple of (list of existing results, ResumeIndex of completed sample_run
+        combinations, built in the same pass)
     """
     existing_results = []
-    completed_runs = set()
+    completed_runs = ResumeIndex()
     
     if not os.path.exists(output_path):
         return existing_results, completed_runs
@@ -112,7 +297,7 @@ def load_existing_results(output_path: str) -> Tuple[List[Dict[str, Any]], Set[T
         
     except Exception as e:
         print(f"⚠️  Warning: Could not load existing results: {e}")
-        return [], set()
+        return [], ResumeIndex()
     
     return existing_results, completed_runs
 
@@ -0,0 +1,113 @@
+"""
+Resume Index
+Completed (sample_id, run_number) pairs of a results file, kept per sample
+as a bitmap over run numbers so resuming never scans every record per sample.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class ResumeIndex:
+    """
+    Completed runs keyed by sample.
+
+    Behaves like the set of (sample_id, run_number) pairs it replaces
+    (add, `in`, len, iteration), but the completed runs of a sample are one
+    dict lookup away: bit n of a sample's bitmap is set once run n has
+    succeeded. Run numbers that are not positive integers (e.g. the -1 of a
+    record without one) are kept aside so they still count as completed.
+    """
+
+    def __init__(self, runs: Iterable[Tuple[Any, Any]] = ()):
+        """
+        Build the index in one pass.
+
+        Args:
+            runs: (sample_id, run_number) pairs of successful records
+        """
+        self._bitmaps: Dict[Any, int] = {}
+        self._irregular: Set[Tuple[Any, Any]] = set()
+        self._size = 0
+        for run in runs:
+            self.add(run)
+
+    def add(self, run: Tuple[Any, Any]) -> None:
+        """Mark a (sample_id, run_number) pair as completed."""
+        sample_id, run_number = run
+        if not isinstance(run_number, int) or isinstance(run_number, bool) or run_number < 1:
+            if run not in self._irregular:
+                self._irregular.add(run)
+                self._size += 1
+            return
+
+        bitmap = self._bitmaps.get(sample_id, 0)
+        bit = 1 << run_number
+        if not bitmap & bit:
+            self._bitmaps[sample_id] = bitmap | bit
+            self._size += 1
+
+    def __contains__(self, run: object) -> bool:
+        try:
+            sample_id, run_number = run
+        except (TypeError, ValueError):
+            return False
+        if isinstance(run_number, int) and not isinstance(run_number, bool) and run_number >= 1:
+            return bool(self._bitmaps.get(sample_id, 0) >> run_number & 1)
+        return run in self._irregular
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        for sample_id, bitmap in self._bitmaps.items():
+            for run_number in self._run_numbers(bitmap):
+                yield sample_id, run_number
+        yield from self._irregular
+
+    @staticmethod
+    def _run_numbers(bitmap: int) -> Iterator[int]:
+        """Set bits of a bitmap, lowest first."""
+        while bitmap:
+            lowest = bitmap & -bitmap
+            yield lowest.bit_length() - 1
+            bitmap ^= lowest
+
+    def completed(self, sample_id: Any) -> List[int]:
+        """Completed run numbers of a sample, in order."""
+        return list(self._run_numbers(self._bitmaps.get(sample_id, 0)))
+
+    def remaining(self, sample_id: Any, n_runs: int) -> List[int]:
+        """
+        Run numbers 1..n_runs not completed for a sample.
+
+        Args:
+            sample_id: The sample
+            n_runs: Number of runs per sample
+
+        Returns:
+            Missing run numbers in ascending order
+        """
+        bitmap = self._bitmaps.get(sample_id, 0)
+        return [run_number for run_number in range(1, n_runs + 1) if not bitmap >> run_number & 1]
+
+    def restrict(self, sample_ids: Iterable[Any]) -> 'ResumeIndex':
+        """
+        Completed runs of some samples only.
+
+        Args:
+            sample_ids: Samples to keep (compared as strings)
+
+        Returns:
+            A new ResumeIndex over the kept samples
+        """
+        keep = {str(sample_id) for sample_id in sample_ids}
+        restricted = ResumeIndex()
+        for sample_id, bitmap in self._bitmaps.items():
+            if str(sample_id) in keep:
+                restricted._bitmaps[sample_id] = bitmap
+                restricted._size += bin(bitmap).count("1")
+        for run in self._irregular:
+            if str(run[0]) in keep:
+                restricted._irregular.add(run)
+                restricted._size += 1
+        return restricted
@@ -0,0 +1,7 @@
+"""Shared pytest setup: make the src/ package importable from the project root."""
+
+import sys
+from pathlib import Path
+
+# Add project root to path for imports, as the scripts do
+sys.path.insert(0, str(Path(__file__).parent.parent))
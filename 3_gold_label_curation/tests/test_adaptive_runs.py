@@ -0,0 +1,92 @@
+"""Tests for src.pipeline.adaptive_runs."""
+
+from src.pipeline.adaptive_runs import AdaptiveRunPolicy, AdaptiveRunTracker
+
+
+def record(is_correct=True, confidence=0.9):
+    return {'success': True, 'is_correct': is_correct, 'confidence_score': confidence}
+
+
+def make_tracker(sample_ids=("a", "b"), existing_records=()):
+    return AdaptiveRunTracker(AdaptiveRunPolicy(min_runs=2), n_runs=3, sample_ids=sample_ids,
+                              existing_records=existing_records)
+
+
+def run(tracker, sample_id, run_num, result):
+    assert tracker.dispatch(sample_id, run_num)
+    tracker.finish(sample_id, run_num, result)
+
+
+def test_policy_settles_on_agreeing_confident_runs():
+    policy = AdaptiveRunPolicy(min_runs=2)
+    assert not policy.settled([record()])
+    assert policy.settled([record(), record()])
+    assert not policy.settled([record(True), record(False)])
+    assert not policy.settled([record(confidence=0.5), record(confidence=0.6)])
+    assert policy.max_runs_for(3) == 5
+    assert AdaptiveRunPolicy.from_metadata(policy.metadata(3)).max_runs == 5
+
+
+def test_settled_samples_stop_and_unsettled_ones_get_extra_runs_within_budget():
+    tracker = make_tracker()
+    assert tracker.next_runs("a") == [1, 2]
+    assert tracker.next_runs("b") == [1, 2]
+    assert (tracker.budget, tracker.reserved) == (6, 6)
+
+    run(tracker, "a", 1, record())
+    run(tracker, "a", 2, record())
+    assert tracker.take_ready("a") == []
+    assert tracker.reserved == 3  # Only b's runs: a's third run is no longer owed
+
+    run(tracker, "b", 1, record(True))
+    run(tracker, "b", 2, record(False))
+    assert tracker.take_ready("b") == [3]
+    run(tracker, "b", 3, record(True))
+    # Beyond n_runs: paid for by the run a did not need
+    assert tracker.take_ready("b") == [4]
+    run(tracker, "b", 4, record(False))
+    assert tracker.take_ready("b") == [5]
+    assert not tracker.dispatch("b", 5)
+
+    assert tracker.stats() == {
+        'settled_samples': 1,
+        'run_counts': {2: 1, 4: 1},
+        'calls_spent': 6,
+        'call_budget': 6,
+        'extra_runs_dropped': 1,
+    }
+
+
+def test_extra_runs_never_take_calls_owed_to_other_samples():
+    tracker = make_tracker()
+    tracker.next_runs("a")
+    tracker.next_runs("b")
+    run(tracker, "a", 1, record(True))
+    run(tracker, "a", 2, record(False))
+    assert tracker.take_ready("a") == [3]
+    run(tracker, "a", 3, record(True))
+    assert tracker.take_ready("a") == [4]
+    # b has not sent any of its runs yet, so all three stay reserved
+    assert not tracker.dispatch("a", 4)
+    assert tracker.stats()['extra_runs_dropped'] == 1
+    assert tracker.spent + tracker.reserved == tracker.budget
+
+
+def test_undispatch_gives_the_call_back():
+    tracker = make_tracker()
+    tracker.next_runs("a")
+    before = (tracker.spent, tracker.reserved)
+    assert tracker.dispatch("a", 1)
+    tracker.undispatch("a", 1)
+    assert (tracker.spent, tracker.reserved) == before
+
+
+def test_existing_records_count_as_spent():
+    existing = [dict(record(), sample_id="a", run_number=1), dict(record(), sample_id="a", run_number=2),
+                dict(record(), sample_id="b", run_number=1), {'sample_id': "b", 'run_number': 2, 'success': False}]
+    tracker = make_tracker(existing_records=existing)
+    assert tracker.spent == 3
+    assert tracker.owed == {"a": 0, "b": 2}
+    assert tracker.next_runs("a") == []
+    # b already has one successful run, so one more brings it to min_runs
+    assert tracker.next_runs("b") == [2]
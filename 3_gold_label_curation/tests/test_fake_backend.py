@@ -0,0 +1,52 @@
+"""Tests for src.api.fake_backend."""
+
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from src.api.fake_backend import FakeGeminiBackend, ResourceExhausted
+from src.api.gemini_client import AVAILABLE_MODELS, RATE_LIMIT_BUFFER
+from src.api.key_pool import classify_quota_error
+from src.pipeline.pilot_runner import PilotRunner
+
+MODEL = "models/gemini-2.5-flash-lite"
+
+
+def initialized_runner(backend: FakeGeminiBackend, tmp_path) -> PilotRunner:
+    runner = PilotRunner()
+    with redirect_stdout(io.StringIO()):
+        runner.initialize_api(backend=backend, model_limits_path=str(tmp_path / "none.json"))
+    return runner
+
+
+def test_from_spec_parses_cli_settings():
+    backend = FakeGeminiBackend.from_spec("latency_mean=0.2,rpm=600,rpd=50,malformed_rate=0.05")
+    assert backend.config.latency_mean == 0.2
+    assert backend.config.rpm == 600
+    assert backend.config.rpd == 50
+    assert backend.config.malformed_rate == 0.05
+
+
+def test_client_paces_to_the_fake_rpm(tmp_path):
+    runner = initialized_runner(FakeGeminiBackend(rpm=600, rpd=50), tmp_path)
+    config = runner.gemini_client.get_model_config(MODEL)
+    assert (config['rpm'], config['rpd']) == (600, 50)
+    assert runner.gemini_client.get_rate_limit_delay(MODEL) == pytest.approx(0.1 * RATE_LIMIT_BUFFER)
+
+    key = runner.gemini_client.key_pool.keys[0]
+    limiter = runner.gemini_client.key_pool.get_limiter(key, MODEL)
+    assert limiter.requests_per_minute == pytest.approx(600 / RATE_LIMIT_BUFFER)
+
+
+def test_unlimited_fake_is_not_paced_to_published_limits(tmp_path):
+    runner = initialized_runner(FakeGeminiBackend(), tmp_path)
+    assert runner.gemini_client.get_model_config(MODEL)['rpm'] > AVAILABLE_MODELS[MODEL]['rpm']
+
+
+def test_rate_limits_raise_classified_429s():
+    model = FakeGeminiBackend(latency_mean=0.0, latency_sigma=0.0, rpm=1).model(MODEL)
+    model.generate_content("prompt")
+    with pytest.raises(ResourceExhausted) as excinfo:
+        model.generate_content("prompt")
+    assert classify_quota_error(excinfo.value) == 'minute'
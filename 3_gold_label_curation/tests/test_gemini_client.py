@@ -0,0 +1,23 @@
+"""Tests for the module-level helpers of src.api.gemini_client."""
+
+import pytest
+
+from src.api.gemini_client import AVAILABLE_MODELS, RATE_LIMIT_BUFFER, GeminiClient, get_rate_limit_delay
+
+
+def test_get_rate_limit_delay_uses_published_rpm():
+    model_name = "models/gemini-2.5-flash-lite"
+    expected = 60.0 / AVAILABLE_MODELS[model_name]["rpm"] * RATE_LIMIT_BUFFER
+    assert get_rate_limit_delay(model_name) == pytest.approx(expected)
+
+
+def test_get_rate_limit_delay_accepts_name_without_prefix():
+    assert get_rate_limit_delay("gemini-1.5-pro-latest") == get_rate_limit_delay("models/gemini-1.5-pro-latest")
+
+
+def test_get_rate_limit_delay_defaults_for_unknown_model():
+    assert get_rate_limit_delay("gemini-2.5-flash") == pytest.approx(60.0 / 15 * RATE_LIMIT_BUFFER)
+
+
+def test_rate_limit_delay_from_limits():
+    assert GeminiClient.rate_limit_delay({"rpm": 60}) == pytest.approx(RATE_LIMIT_BUFFER)
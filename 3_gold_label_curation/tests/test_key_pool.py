@@ -0,0 +1,102 @@
+"""Tests for src.api.key_pool."""
+
+import pytest
+
+from src.api.fake_backend import ResourceExhausted
+from src.api.key_pool import APIKeyPool, QuotaExhaustedError, classify_quota_error, parse_api_keys
+from src.api.openai_backend import EndpointError
+
+MODEL = "models/test-model"
+
+
+def make_pool(keys=("key-aaaa", "key-bbbb"), rpm=60, rpd=1000, tpm=1_000_000) -> APIKeyPool:
+    return APIKeyPool(list(keys), model_limits={MODEL: {'rpm': rpm, 'rpd': rpd, 'tpm': tpm}})
+
+
+def test_parse_api_keys_accepts_mixed_separators():
+    assert parse_api_keys("a, b;c\nd  e") == ["a", "b", "c", "d", "e"]
+    assert parse_api_keys("") == []
+
+
+def test_duplicate_keys_are_pooled_once():
+    assert len(make_pool(keys=("same", "same", "other"))) == 2
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        APIKeyPool([])
+
+
+def test_requests_rotate_to_the_key_with_budget_left():
+    pool = make_pool()
+    first = pool.try_acquire(MODEL)
+    second = pool.try_acquire(MODEL)
+    assert {first.api_key, second.api_key} == {"key-aaaa", "key-bbbb"}
+    # Both buckets are empty until the next token refills
+    assert pool.try_acquire(MODEL) is None
+
+
+def test_quarantined_key_is_skipped():
+    pool = make_pool()
+    pool.quarantine(pool.keys[0], 60)
+    assert pool.try_acquire(MODEL).api_key == "key-bbbb"
+    assert pool.try_acquire(MODEL) is None
+
+
+def test_daily_exhaustion_takes_keys_out_of_rotation():
+    pool = make_pool(rpm=6000, rpd=2)
+    used = [pool.acquire(MODEL).api_key for _ in range(4)]
+    assert sorted(used) == ["key-aaaa", "key-aaaa", "key-bbbb", "key-bbbb"]
+    assert not pool.has_daily_quota(MODEL)
+    with pytest.raises(QuotaExhaustedError) as excinfo:
+        pool.acquire(MODEL)
+    assert excinfo.value.model_name == MODEL
+
+
+def test_mark_daily_exhausted_leaves_other_keys():
+    pool = make_pool()
+    pool.mark_daily_exhausted(pool.keys[0], MODEL)
+    assert pool.has_daily_quota(MODEL)
+    assert pool.try_acquire(MODEL).api_key == "key-bbbb"
+
+    pool.mark_daily_exhausted(pool.keys[1], MODEL)
+    assert not pool.has_daily_quota(MODEL)
+    assert pool.try_acquire(MODEL) is None
+
+
+def test_daily_quota_is_per_model():
+    pool = make_pool()
+    for key in pool.keys:
+        pool.mark_daily_exhausted(key, MODEL)
+    assert pool.has_daily_quota("models/other-model")
+
+
+def test_usage_is_charged_to_the_key():
+    pool = make_pool()
+    key = pool.acquire(MODEL, tokens=100)
+    pool.record_usage(key, MODEL, 20)
+    assert key.total_requests == 1
+    assert key.total_tokens == 120
+    assert key.daily_requests[MODEL] == 1
+
+
+def test_minute_and_daily_429s_are_told_apart():
+    minute = ResourceExhausted('Resource has been exhausted. quota_id: "GenerateRequestsPerMinutePerProjectPerModel"')
+    daily = ResourceExhausted('Resource has been exhausted. quota_id: "GenerateRequestsPerDayPerProjectPerModel"')
+    assert classify_quota_error(minute) == 'minute'
+    assert classify_quota_error(daily) == 'daily'
+    assert classify_quota_error(QuotaExhaustedError("all keys exhausted")) == 'daily'
+
+
+def test_http_status_429_is_a_rate_limit():
+    assert classify_quota_error(EndpointError(429, "Too Many Requests")) == 'minute'
+    assert classify_quota_error(EndpointError(500, "quota service unavailable")) is None
+
+
+@pytest.mark.parametrize("error", [
+    ValueError('Invalid JSON format: {"alasan": "kode 42911 cocok"'),
+    ValueError("Empty response: the model used its whole quota of output tokens"),
+    RuntimeError("ResourceExhausted mentioned in a response"),
+])
+def test_messages_mentioning_429_or_quota_are_not_rate_limits(error):
+    assert classify_quota_error(error) is None
@@ -0,0 +1,117 @@
+"""Tests for the execution modes of src.pipeline.pilot_runner.PilotRunner."""
+
+import io
+import json
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import pytest
+
+from src.api.fake_backend import FakeGeminiBackend, ResourceExhausted
+from src.api.gemini_client import AVAILABLE_MODELS
+from src.pipeline import pilot_runner
+from src.pipeline.pilot_runner import PilotRunner
+
+MODEL = "models/gemini-2.5-flash-lite"
+DATASET = "mini_test_with_ids.csv"
+
+
+def make_runner(backend: FakeGeminiBackend) -> PilotRunner:
+    """Pilot runner on the fake backend, paced far above the published RPM."""
+    runner = PilotRunner()
+    runner.prompt_compiler.cache_dir = None
+    with redirect_stdout(io.StringIO()):
+        runner.initialize_api(backend=backend)
+    runner.gemini_client.key_pool.model_limits = {
+        **AVAILABLE_MODELS, MODEL: {**AVAILABLE_MODELS[MODEL], 'rpm': 60000}
+    }
+    return runner
+
+
+def run_study(runner: PilotRunner, output_dir, **options):
+    with redirect_stdout(io.StringIO()):
+        stats = runner.run_pilot_study(MODEL, DATASET, n_runs=3, output_dir=str(output_dir),
+                                       max_samples=6, **options)
+    output_path = Path(stats['output_path'])
+    if not output_path.exists():
+        return stats, []
+    with open(output_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    return stats, records
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_every_run_gets_one_record(tmp_path, concurrency):
+    backend = FakeGeminiBackend(latency_mean=0.01)
+    stats, records = run_study(make_runner(backend), tmp_path, concurrency=concurrency)
+
+    runs = [(record['sample_id'], record['run_number']) for record in records]
+    assert len(runs) == len(set(runs)) == 18
+    assert stats['new_results_generated'] == backend.stats()['requests'] == 18
+    assert all(record['success'] for record in records)
+
+
+def test_concurrent_run_resumes_only_failed_runs(tmp_path):
+    stats, records = run_study(make_runner(FakeGeminiBackend(latency_mean=0.01, malformed_rate=0.5)),
+                               tmp_path, concurrency=4)
+    failed = sum(1 for record in records if not record['success'])
+    assert failed > 0
+
+    backend = FakeGeminiBackend(latency_mean=0.01, seed=1)
+    stats, records = run_study(make_runner(backend), tmp_path, concurrency=4)
+    assert backend.stats()['requests'] == failed
+    assert {(r['sample_id'], r['run_number']) for r in records if r['success']} == {
+        (r['sample_id'], r['run_number']) for r in records
+    }
+
+
+def rate_limit_every_other_call(runner: PilotRunner, always: bool = False) -> None:
+    """Make the client raise a minute-level 429 before every successful call (or on every call)."""
+    generate_content = runner.gemini_client.generate_content
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if always or len(calls) % 2:
+            raise ResourceExhausted('quota_id: "GenerateRequestsPerMinutePerProjectPerModel"')
+        return generate_content(*args, **kwargs)
+
+    runner.gemini_client.generate_content = flaky
+
+
+@pytest.fixture
+def fast_parks(monkeypatch):
+    monkeypatch.setattr(pilot_runner, "RATE_LIMIT_PARK_SECONDS", 0)
+    monkeypatch.setattr(pilot_runner, "MAX_RATE_LIMIT_PARKS", 2)
+
+
+def test_scattered_rate_limits_never_stop_the_run(tmp_path, fast_parks):
+    runner = make_runner(FakeGeminiBackend(latency_mean=0.01))
+    rate_limit_every_other_call(runner)
+    stats, records = run_study(runner, tmp_path)
+    assert stats['new_results_generated'] == 18
+    assert all(record['success'] for record in records)
+
+
+def test_consecutive_rate_limits_stop_the_run(tmp_path, fast_parks):
+    runner = make_runner(FakeGeminiBackend(latency_mean=0.01))
+    rate_limit_every_other_call(runner, always=True)
+    stats, records = run_study(runner, tmp_path)
+    assert stats['new_results_generated'] == 0
+    assert records == []
+
+
+@pytest.mark.parametrize("options", [
+    dict(concurrency=4),
+    dict(concurrency=4, batch_size=3),
+    dict(concurrency=4, multi_candidate=True),
+])
+def test_non_quota_errors_in_workers_are_not_parked(tmp_path, monkeypatch, options):
+    def save_fails(result, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pilot_runner, "save_result_to_jsonl", save_fails)
+    monkeypatch.setattr(pilot_runner, "RATE_LIMIT_PARK_SECONDS", 60)
+    runner = make_runner(FakeGeminiBackend(latency_mean=0.01))
+    with pytest.raises(OSError, match="disk full"):
+        run_study(runner, tmp_path, **options)
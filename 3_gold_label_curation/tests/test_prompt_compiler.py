@@ -0,0 +1,51 @@
+"""Tests for src.pipeline.prompt_compiler."""
+
+import pandas as pd
+import pytest
+
+from src.data.codebook_index import CodebookIndex
+from src.pipeline import prompt_compiler
+from src.pipeline.prompt_compiler import PromptCompiler, render_prompts
+
+
+def make_codebook() -> CodebookIndex:
+    row = {f'code_{level}': code for level, code in enumerate(['A', '01', '011', '0111', '01111'], 1)}
+    row.update({f'title_{level}': f'Title {level}' for level in range(1, 6)})
+    row['desc_5'] = 'Usaha pertanian jagung'
+    return CodebookIndex(pd.DataFrame([row]))
+
+
+def make_samples() -> pd.DataFrame:
+    return pd.DataFrame({'text': ['petani jagung', 'nelayan', 'buruh tani'],
+                         'kbli_code': ['01111', '99999', '01111']})
+
+
+def test_render_prompts_fills_placeholders():
+    codebook = make_codebook()
+    hierarchy = dict(codebook.hierarchies())['01111']
+    prompts = render_prompts("{job_description} -> {code_to_check}\n{hierarchy_context}", make_samples(), codebook)
+    assert prompts.tolist() == [f"petani jagung -> 01111\n{hierarchy}", None, f"buruh tani -> 01111\n{hierarchy}"]
+
+
+def test_render_prompts_without_placeholders():
+    prompts = render_prompts("static prompt", make_samples(), make_codebook())
+    assert prompts.tolist() == ["static prompt", None, "static prompt"]
+
+
+def test_prompt_cache_is_disabled_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(prompt_compiler, 'PARQUET_AVAILABLE', False)
+    compiler = PromptCompiler(tmp_path)
+    compiled = compiler.compile("static prompt", make_samples(), make_codebook())
+    assert compiled.cache_path is None
+    assert compiled.prompts.tolist() == ["static prompt", None, "static prompt"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_prompt_cache_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    compiler = PromptCompiler(tmp_path)
+    first = compiler.compile("{job_description}", make_samples(), make_codebook())
+    second = compiler.compile("{job_description}", make_samples(), make_codebook())
+    assert first.cache_path.suffix == ".parquet"
+    assert not first.from_cache and second.from_cache
+    assert second.prompts.tolist() == first.prompts.tolist() == ["petani jagung", None, "buruh tani"]
@@ -0,0 +1,80 @@
+"""Tests for src.api.rate_limiter."""
+
+import pytest
+
+from src.api import rate_limiter
+from src.api.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake)
+    return fake
+
+
+def test_burst_is_admitted_back_to_back(clock):
+    limiter = RateLimiter(60, burst=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_tokens_refill_at_the_sustained_rate(clock):
+    limiter = RateLimiter(60, burst=1)
+    assert limiter.try_acquire()
+    assert limiter.time_until_available() == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert not limiter.try_acquire()
+    assert limiter.time_until_available() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert limiter.try_acquire()
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = RateLimiter(60, burst=2)
+    clock.now += 3600
+    assert [limiter.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_pause_blocks_and_drains_the_bucket(clock):
+    limiter = RateLimiter(60, burst=5)
+    limiter.pause(10)
+    assert not limiter.try_acquire()
+
+    # After the pause the bucket refills from empty instead of bursting
+    clock.now += 10
+    assert not limiter.try_acquire()
+    clock.now += 1
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_set_rate_keeps_earned_tokens(clock):
+    limiter = RateLimiter(60, burst=1)
+    assert limiter.try_acquire()
+    limiter.set_rate(120)
+    assert limiter.time_until_available() == pytest.approx(0.5)
+
+
+def test_acquire_waits_for_the_next_token(clock, monkeypatch):
+    def sleep(seconds):
+        clock.now += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    limiter = RateLimiter(30, burst=1)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(2.0)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
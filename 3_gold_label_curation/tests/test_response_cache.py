@@ -0,0 +1,108 @@
+"""Tests for src.api.response_cache."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.api import response_cache
+from src.api.response_cache import ResponseCache
+
+MODEL = "models/test-model"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_key_is_stable_and_ignores_param_order():
+    first = ResponseCache.make_key("prompt", MODEL, 1, temperature=0.7, max_output_tokens=256)
+    second = ResponseCache.make_key("prompt", MODEL, 1, max_output_tokens=256, temperature=0.7)
+    assert first == second
+    assert len(first) == 64
+
+
+@pytest.mark.parametrize("change", [
+    dict(prompt="other prompt"),
+    dict(model_name="models/other-model"),
+    dict(run_number=2),
+    dict(temperature=0.2),
+])
+def test_key_covers_everything_that_shapes_the_output(change):
+    request = dict(prompt="prompt", model_name=MODEL, run_number=1, temperature=0.7)
+    assert ResponseCache.make_key(**request) != ResponseCache.make_key(**{**request, **change})
+
+
+def test_miss_then_hit(cache):
+    key = ResponseCache.make_key("prompt", MODEL, 1)
+    assert cache.get(key) is None
+    cache.put(key, MODEL, '{"is_correct": true}')
+    assert cache.get(key) == '{"is_correct": true}'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_invalidate_removes_the_entry(cache):
+    cache.put("key", MODEL, "response")
+    cache.invalidate("key")
+    assert cache.get("key") is None
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_age_days=1)
+    cache.put("key", MODEL, "response")
+    real_time = response_cache.time.time
+    monkeypatch.setattr(response_cache.time, "time", lambda: real_time() + 2 * 86400)
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_size_mb=1.5 / 1024)
+    cache.put("old", MODEL, "x" * 1000)
+    cache.put("new", MODEL, "y" * 1000)
+    assert cache.evict() == 1
+    assert cache.get("old") is None
+    assert cache.get("new") == "y" * 1000
+    cache.close()
+
+
+def test_database_runs_in_wal_mode(cache):
+    conn = sqlite3.connect(str(cache.path))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_concurrent_writers_and_readers_share_the_store(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    caches = [ResponseCache(path) for _ in range(2)]
+    errors = []
+
+    def write(cache, prefix):
+        try:
+            for i in range(50):
+                key = f"{prefix}-{i}"
+                cache.put(key, MODEL, f"response {key}")
+                assert cache.get(key) == f"response {key}"
+        except Exception as e:  # Surface failures from worker threads
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(cache, f"{n}-{t}"))
+               for n, cache in enumerate(caches) for t in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    # Each connection sees what the other one wrote
+    assert caches[0].get("1-0-49") == "response 1-0-49"
+    assert caches[1].get("0-2-0") == "response 0-2-0"
+    assert caches[0].stats()['entries'] == 300
+    for cache in caches:
+        cache.close()
@@ -0,0 +1,58 @@
+"""Tests for src.analysis.results_analyzer."""
+
+import json
+
+from src.analysis.results_analyzer import ResultsAnalyzer
+from src.pipeline.adaptive_runs import AdaptiveRunPolicy
+
+MODEL = "gemini-test"
+ADAPTIVE = AdaptiveRunPolicy(min_runs=2).metadata(3)
+
+
+def record(sample_id, run_number, is_correct=True, confidence=0.9, success=True, adaptive=True):
+    result = {'sample_id': sample_id, 'run_number': run_number, 'success': success}
+    if success:
+        result.update(is_correct=is_correct, confidence_score=confidence)
+        if adaptive:
+            result['adaptive_runs'] = ADAPTIVE
+    else:
+        result['error_type'] = 'ValueError'
+    return result
+
+
+def analyze(tmp_path, records):
+    output_dir = tmp_path / "data" / "output" / "pilot_results_models"
+    output_dir.mkdir(parents=True)
+    with open(output_dir / f"models_{MODEL}_mini_test_with_ids.jsonl", 'w', encoding='utf-8') as f:
+        for result in records:
+            f.write(json.dumps(result) + "\n")
+    return ResultsAnalyzer(project_root=tmp_path).analyze_model_results(MODEL, n_runs=3)
+
+
+def test_adaptive_samples_are_complete_once_settled_or_fully_run(tmp_path):
+    analysis = analyze(tmp_path, [
+        # Settled after min_runs
+        record("settled", 1), record("settled", 2),
+        # Disagreeing runs, extra run beyond n_runs
+        record("extra", 1, True), record("extra", 2, False), record("extra", 3, True), record("extra", 4, False),
+        # One success and one failure: not settled yet
+        record("pending", 1), record("pending", 2, success=False),
+        # Fixed-runs study on the same file
+        record("fixed", 1, adaptive=False), record("fixed", 2, adaptive=False), record("fixed", 3, adaptive=False),
+    ])
+    assert analysis['adaptive_samples'] == 3
+    assert analysis['complete_samples'] == 3
+    assert analysis['incomplete_details'] == [("pending", {2, 3})]
+    assert analysis['run_count_distribution'] == {1: 1, 2: 1, 3: 1, 4: 1}
+    assert analysis['mean_runs_per_sample'] == 2.5
+    assert analysis['error_analysis'] == {'ValueError': 1}
+
+
+def test_fixed_runs_samples_need_every_run(tmp_path):
+    analysis = analyze(tmp_path, [
+        record("a", 1, adaptive=False), record("a", 2, adaptive=False),
+        record("b", 1, adaptive=False), record("b", 2, adaptive=False), record("b", 3, adaptive=False),
+    ])
+    assert analysis['adaptive_samples'] == 0
+    assert analysis['complete_samples'] == 1
+    assert analysis['incomplete_details'] == [("a", {3})]
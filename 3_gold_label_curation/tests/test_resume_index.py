@@ -0,0 +1,63 @@
+"""Tests for src.utils.resume_index."""
+
+import random
+
+from src.utils.resume_index import ResumeIndex
+
+RUNS = [("s1", 1), ("s1", 3), ("s2", 2), ("s1", 1), ("s3", 70), ("s4", -1), ("s4", None), ("s4", "2")]
+
+
+def test_behaves_like_a_set_of_pairs():
+    index = ResumeIndex(RUNS)
+    expected = set(RUNS)
+    assert len(index) == len(expected)
+    assert sorted(index, key=repr) == sorted(expected, key=repr)
+    for run in expected:
+        assert run in index
+    for run in [("s1", 2), ("s2", 1), ("s5", 1), ("s4", 1), ("s4", 2), ("s1", True)]:
+        assert run not in index
+
+
+def test_matches_a_set_under_random_adds():
+    rng = random.Random(0)
+    index, expected = ResumeIndex(), set()
+    for _ in range(500):
+        run = (f"s{rng.randrange(20)}", rng.randrange(-1, 12))
+        index.add(run)
+        expected.add(run)
+        assert len(index) == len(expected)
+    assert set(index) == expected
+
+
+def test_malformed_lookups_are_not_completed():
+    index = ResumeIndex(RUNS)
+    assert "s1" not in index
+    assert ("s1", 1, 2) not in index
+    assert None not in index
+
+
+def test_completed_and_remaining_runs_of_a_sample():
+    index = ResumeIndex(RUNS)
+    assert index.completed("s1") == [1, 3]
+    assert index.remaining("s1", 3) == [2]
+    assert index.remaining("s2", 3) == [1, 3]
+    assert index.remaining("s3", 3) == [1, 2, 3]
+    assert index.completed("unknown") == []
+    # Irregular run numbers never stand for one of the runs 1..n
+    assert index.remaining("s4", 2) == [1, 2]
+
+
+def test_restrict_keeps_only_the_given_samples():
+    index = ResumeIndex(RUNS)
+    restricted = index.restrict(["s1", "s4"])
+    expected = {run for run in RUNS if run[0] in ("s1", "s4")}
+    assert set(restricted) == expected
+    assert len(restricted) == len(expected)
+    assert ("s2", 2) not in restricted
+    # The original index is left alone
+    assert len(index) == len(set(RUNS))
+
+
+def test_restrict_compares_sample_ids_as_strings():
+    index = ResumeIndex([(101, 1), (102, 2)])
+    assert set(index.restrict(["101"])) == {(101, 1)}
@@ -0,0 +1,149 @@
+"""Tests for src.api.retry_policy."""
+
+import io
+import random
+from contextlib import redirect_stdout
+
+import pytest
+
+from src.api.fake_backend import DeadlineExceeded, FakeGeminiBackend, ResourceExhausted
+from src.api.gemini_client import AVAILABLE_MODELS, GeminiClient
+from src.api.key_pool import QuotaExhaustedError
+from src.api.openai_backend import EndpointError
+from src.api.response_cache import ResponseCache
+from src.api.retry_policy import (
+    DEFAULT_RULES,
+    BackoffRule,
+    ErrorCategory,
+    MalformedResponseError,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+)
+
+MODEL = "models/gemini-2.5-flash-lite"
+
+
+@pytest.mark.parametrize("error, category", [
+    (ResourceExhausted('quota_id: "GenerateRequestsPerMinutePerProjectPerModel"'), ErrorCategory.RATE_LIMIT),
+    (ResourceExhausted('quota_id: "GenerateRequestsPerDayPerProjectPerModel"'), ErrorCategory.DAILY_QUOTA),
+    (QuotaExhaustedError("all keys exhausted"), ErrorCategory.DAILY_QUOTA),
+    (EndpointError(429, "Too Many Requests"), ErrorCategory.RATE_LIMIT),
+    (DeadlineExceeded("504 Deadline Exceeded"), ErrorCategory.TRANSIENT),
+    (TimeoutError(), ErrorCategory.TRANSIENT),
+    (ConnectionResetError("Connection reset by peer"), ErrorCategory.TRANSIENT),
+    (EndpointError(503, "ServiceUnavailable"), ErrorCategory.SERVER),
+    (RuntimeError("400 API key not valid"), ErrorCategory.INVALID),
+    (RuntimeError("response was blocked, block_reason: SAFETY"), ErrorCategory.SAFETY),
+    (ValueError("Empty response from API"), ErrorCategory.MALFORMED),
+    (RuntimeError("something odd"), ErrorCategory.UNKNOWN),
+])
+def test_classify_error(error, category):
+    assert classify_error(error) is category
+
+
+def test_unparseable_responses_are_malformed_whatever_they_mention():
+    # Parse errors quote the response, which may contain "429", "quota" or a status line
+    assert classify_error(ValueError('Invalid JSON format: {"kode": "42911"')) is ErrorCategory.MALFORMED
+    error = MalformedResponseError("Response failed validation: 400 words of quota talk")
+    assert classify_error(error) is ErrorCategory.MALFORMED
+
+
+@pytest.mark.parametrize("category", list(ErrorCategory))
+def test_backoff_uses_full_jitter_below_the_capped_exponential(category):
+    policy = RetryPolicy(rng=random.Random(0))
+    rule = policy.rule(category)
+    for attempt in range(8):
+        ceiling = min(rule.max_delay, rule.base_delay * 2 ** attempt)
+        delays = [policy.backoff(category, attempt) for _ in range(200)]
+        assert all(0.0 <= delay <= ceiling for delay in delays)
+        if ceiling > 0:
+            # Full jitter spreads retries over the whole window
+            assert min(delays) < ceiling * 0.1 and max(delays) > ceiling * 0.9
+
+
+def test_non_retryable_categories_get_no_delay():
+    policy = RetryPolicy()
+    assert policy.next_delay(ErrorCategory.SAFETY, 0) is None
+    assert policy.next_delay(ErrorCategory.INVALID, 0) is None
+    assert policy.budget.tokens == policy.budget.capacity
+
+
+def test_budget_stops_retries_until_successes_refill_it():
+    policy = RetryPolicy(budget=RetryBudget(capacity=2, refill=0.5))
+    assert policy.next_delay(ErrorCategory.SERVER, 0) is not None
+    assert policy.next_delay(ErrorCategory.MALFORMED, 0) is not None
+    assert policy.next_delay(ErrorCategory.TRANSIENT, 0) is None
+    assert policy.stats['budget_exhausted'] == 1
+
+    policy.record_success()
+    assert policy.next_delay(ErrorCategory.SERVER, 0) is None
+    policy.record_success()
+    assert policy.next_delay(ErrorCategory.SERVER, 0) is not None
+
+
+def test_budget_never_grows_past_capacity():
+    budget = RetryBudget(capacity=1, refill=0.5)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 1
+    assert budget.try_spend() and not budget.try_spend()
+
+
+def test_rate_limits_do_not_draw_from_the_budget():
+    policy = RetryPolicy(budget=RetryBudget(capacity=0))
+    assert policy.next_delay(ErrorCategory.RATE_LIMIT, 3) == 0.0
+    assert policy.next_delay(ErrorCategory.DAILY_QUOTA, 3) == 0.0
+    assert policy.next_delay(ErrorCategory.SERVER, 0) is None
+
+
+def make_client(backend: FakeGeminiBackend, cache: ResponseCache = None) -> GeminiClient:
+    """Client on the fake backend that retries malformed responses without waiting."""
+    rules = {**DEFAULT_RULES, ErrorCategory.MALFORMED: BackoffRule(base_delay=0.0, max_delay=0.0)}
+    client = GeminiClient(backend=backend, cache=cache, retry_policy=RetryPolicy(rules=rules))
+    client.key_pool.model_limits = {**AVAILABLE_MODELS, MODEL: {**AVAILABLE_MODELS[MODEL], 'rpm': 60000}}
+    return client
+
+
+def rejecting_first(seen):
+    def validate(text):
+        seen.append(text)
+        if len(seen) == 1:
+            raise ValueError("not the JSON we asked for")
+    return validate
+
+
+def test_generate_content_retries_responses_that_fail_validation():
+    backend = FakeGeminiBackend(latency_mean=0.01)
+    client = make_client(backend)
+    seen = []
+    with redirect_stdout(io.StringIO()):
+        client.generate_content("prompt", MODEL, run_number=1, validate=rejecting_first(seen))
+    assert len(seen) == 2
+    assert backend.stats()['requests'] == 2
+    assert client.retry_policy.stats['malformed'] == 1
+
+
+def test_generate_content_raises_malformed_after_the_last_attempt():
+    client = make_client(FakeGeminiBackend(latency_mean=0.01))
+
+    def reject(text):
+        raise ValueError("never good enough")
+
+    with redirect_stdout(io.StringIO()), pytest.raises(MalformedResponseError):
+        client.generate_content("prompt", MODEL, validate=reject)
+    assert client.retry_policy.stats['malformed'] == client.max_retries
+
+
+def test_candidates_are_not_retried_for_one_bad_candidate(tmp_path):
+    # The caller handles bad candidates one by one, so the good ones are kept
+    backend = FakeGeminiBackend(latency_mean=0.01)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    client = make_client(backend, cache)
+    seen = []
+    with redirect_stdout(io.StringIO()):
+        candidates = client.generate_candidates("prompt", MODEL, 3, validate=rejecting_first(seen))
+    assert len(candidates) == 3
+    assert backend.stats()['requests'] == 1
+    # The rejected set is still kept out of the cache
+    assert len(seen) == 1 and cache.stats()['entries'] == 0
@@ -0,0 +1,86 @@
+"""Tests for src.pipeline.scheduler."""
+
+import pytest
+
+from src.pipeline.scheduler import (
+    DEFAULT_TASK_PRIORITIES,
+    TASK_ESCALATION,
+    TASK_FRESH,
+    TASK_RETRY,
+    Task,
+    TaskScheduler,
+    parse_task_priorities,
+)
+
+MODEL = "models/test-model"
+
+
+def task(sample_id, run_number, kind=TASK_FRESH, **fields):
+    return Task(sample_id, run_number, MODEL, kind, **fields)
+
+
+def drain(scheduler):
+    order = []
+    while scheduler:
+        popped = scheduler.pop()
+        order.append((popped.sample_id, popped.run_number, popped.kind))
+    return order
+
+
+def test_tasks_come_out_by_priority_then_run_then_arrival():
+    scheduler = TaskScheduler()
+    for queued in [task("b", 2), task("a", 1), task("c", 2, TASK_RETRY), task("b", 1), task("a", 2)]:
+        scheduler.push(queued)
+    assert drain(scheduler) == [
+        ("c", 2, TASK_RETRY),
+        ("a", 1, TASK_FRESH),
+        ("b", 1, TASK_FRESH),
+        ("b", 2, TASK_FRESH),
+        ("a", 2, TASK_FRESH),
+    ]
+    assert scheduler.pop() is None
+
+
+def test_custom_priorities_override_the_defaults():
+    scheduler = TaskScheduler({TASK_RETRY: 5})
+    assert scheduler.priorities[TASK_FRESH] == DEFAULT_TASK_PRIORITIES[TASK_FRESH]
+    scheduler.push(task("a", 1, TASK_RETRY))
+    scheduler.push(task("b", 3))
+    assert drain(scheduler) == [("b", 3, TASK_FRESH), ("a", 1, TASK_RETRY)]
+
+
+def test_pushed_back_task_keeps_its_place():
+    scheduler = TaskScheduler()
+    for sample_id in "abc":
+        scheduler.push(task(sample_id, 1))
+    first = scheduler.pop()
+    scheduler.push(task("d", 1))
+    # Parked on a quota error and queued again
+    scheduler.push(first)
+    assert [sample_id for sample_id, _, _ in drain(scheduler)] == ["a", "b", "c", "d"]
+
+
+def test_pending_samples_and_kind_counts():
+    scheduler = TaskScheduler()
+    scheduler.push(task("a", 1))
+    scheduler.push(task("a", 2, TASK_RETRY))
+    scheduler.push(task("b-c", 1, batch=[("b", None), ("c", None)]))
+    scheduler.push(task("e", 1, TASK_ESCALATION))
+    assert len(scheduler) == 4
+    assert scheduler.pending_samples() == {"a", "b", "c", "e"}
+    assert scheduler.kind_counts() == {TASK_FRESH: 2, TASK_RETRY: 1, TASK_ESCALATION: 1}
+
+
+def test_parse_task_priorities():
+    assert parse_task_priorities("retry=2, fresh=0") == {**DEFAULT_TASK_PRIORITIES, TASK_RETRY: 2, TASK_FRESH: 0}
+    assert parse_task_priorities("") == DEFAULT_TASK_PRIORITIES
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("urgent=0", "Unknown task kind 'urgent'"),
+    ("retry=high", "must be an integer, got 'high'"),
+    ("retry", "must be an integer"),
+])
+def test_parse_task_priorities_rejects_bad_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_task_priorities(spec)